@@ -0,0 +1,73 @@
+"""Times the ingestion of many small daily batches into a DataManager.
+
+Run from the repository root with `python -m benchmarks.append_buffer`.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.common import enums
+from src.data import source
+
+METER_NAMES = ['CHP_electricity', 'CHP_heat', 'CHP_gas']
+BATCH_COUNTS = [125, 250, 500, 1000]
+
+
+def make_daily_batches(number_of_days: int) -> list[pd.DataFrame]:
+  """Create one half-hourly dataframe per day with a column per meter.
+
+  Args:
+      number_of_days (int): Number of daily batches to create.
+
+  Returns:
+      list[pd.DataFrame]: The daily batches, oldest first.
+  """
+  rng = np.random.default_rng(0)
+  index = pd.date_range('2023-01-01',
+                        periods=number_of_days * 48,
+                        freq='30min')
+  values = rng.random((len(index), len(METER_NAMES)))
+  dataf = pd.DataFrame(values, index=index, columns=METER_NAMES)
+  return [dataf.iloc[day * 48:(day + 1) * 48] for day in range(number_of_days)]
+
+
+def time_ingestion(batches: list[pd.DataFrame],
+                   storage_mode: enums.StorageMode,
+                   read_after_each_batch: bool) -> float:
+  """Load the batches one by one and return the elapsed time in seconds.
+
+  Args:
+      batches (list[pd.DataFrame]): The daily batches to load.
+      storage_mode (enums.StorageMode): Storage mode of the data manager.
+      read_after_each_batch (bool): Read after every batch, forcing a consolidation each time \
+        as the previous concat-per-append behaviour did.
+
+  Returns:
+      float: Elapsed wall time in seconds.
+  """
+  data_manager = source.DataManager('benchmark', storage_mode)
+  start = time.perf_counter()
+  for batch in batches:
+    data_manager.load_new_data(batch)
+    if read_after_each_batch:
+      _ = data_manager.all_profile_ids
+  data_manager.filter_data()
+  return time.perf_counter() - start
+
+
+def main():
+  print(f"{'mode':<6}{'batches':>9}{'buffered [s]':>14}{'us/batch':>10}"
+        f"{'eager [s]':>12}{'us/batch':>10}")
+  for storage_mode in enums.StorageMode:
+    for batch_count in BATCH_COUNTS:
+      batches = make_daily_batches(batch_count)
+      buffered = time_ingestion(batches, storage_mode, False)
+      eager = time_ingestion(batches, storage_mode, True)
+      print(f'{storage_mode:<6}{batch_count:>9}{buffered:>14.3f}'
+            f'{buffered / batch_count * 1e6:>10.0f}{eager:>12.3f}'
+            f'{eager / batch_count * 1e6:>10.0f}')
+
+
+if __name__ == '__main__':
+  main()
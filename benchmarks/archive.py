@@ -0,0 +1,73 @@
+"""Times opening a saved multi-year site and querying one month of a few of its meters.
+
+Run from the repository root with `python -m benchmarks.archive`, see `--help` for the size of \
+the site. The site is saved to a temporary folder, which is deleted at the end.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from src.common import enums
+from src.data import source
+
+from . import synthetic
+
+
+def get_folder_size(folder: Path) -> int:
+  return sum(path.stat().st_size for path in folder.rglob('*')
+             if path.is_file())
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--chps', type=int, default=10)
+  parser.add_argument('--boilers', type=int, default=5)
+  parser.add_argument('--years', type=int, default=5)
+  parser.add_argument('--month', default='2023-01')
+  parser.add_argument('--repeat', type=int, default=5)
+  args = parser.parse_args()
+
+  site = synthetic.generate_site(0, args.chps, args.boilers, args.years)
+  unit = site.list_units[0]
+  meter_names = [unit.gas_meter, *unit.output_meters.values()]
+  start_time = pd.Timestamp(args.month)
+  end_time = start_time + pd.offsets.MonthEnd(1) + pd.Timedelta(hours=23.5)
+
+  with tempfile.TemporaryDirectory() as folder:
+    data_source = source.DataManager(site.site_name, enums.StorageMode.WIDE)
+    data_source.load_new_data(site.dataf)
+    start = time.perf_counter()
+    site_folder = data_source.save(folder)
+    print(f'{len(site.dataf.columns)} meters x {args.years} years saved in '
+          f'{time.perf_counter() - start:.2f} s, '
+          f'{get_folder_size(site_folder) / 2**20:.1f} MiB')
+    month_folder = site_folder / f'month={start_time:%Y%m}'
+    print(f'Partition of {args.month}: '
+          f'{get_folder_size(month_folder) / 2**20:.2f} MiB, of which '
+          f'{len(meter_names)}/{len(site.dataf.columns)} columns are read')
+
+    open_times, query_times = [], []
+    for _ in range(args.repeat):
+      start = time.perf_counter()
+      opened_source = source.DataManager.open(folder, site.site_name)
+      open_times.append(time.perf_counter() - start)
+      profile_ids = [
+          opened_source.profile_lookup[meter_name]
+          for meter_name in meter_names
+      ]
+      start = time.perf_counter()
+      dataf = opened_source.filter_data(start_time,
+                                        end_time,
+                                        profile_ids=profile_ids,
+                                        wide=True)
+      query_times.append(time.perf_counter() - start)
+    print(f'open: {min(open_times) * 1e3:.1f} ms, one month of '
+          f'{len(profile_ids)} meters ({len(dataf)} rows): '
+          f'{min(query_times) * 1e3:.1f} ms')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,113 @@
+"""Measures the memory and throughput of the compact and float32 data manager layouts.
+
+Run from the repository root with `python -m benchmarks.compact`, see `--help` for the size of \
+the site. For every layout the memory held by the data manager once the readings are loaded is \
+measured with tracemalloc, then loading and a report at the chosen resolution are timed.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any
+
+import numpy as np
+
+from src.common import enums
+from src.data import source
+
+from . import synthetic
+
+LAYOUTS: dict[str, dict[str, Any]] = {
+    'long': {
+        'storage_mode': enums.StorageMode.LONG
+    },
+    'long float32': {
+        'storage_mode': enums.StorageMode.LONG,
+        'value_dtype': np.float32
+    },
+    'long compact': {
+        'storage_mode': enums.StorageMode.LONG,
+        'compact': True
+    },
+    'long compact float32': {
+        'storage_mode': enums.StorageMode.LONG,
+        'compact': True,
+        'value_dtype': np.float32
+    },
+    'wide': {
+        'storage_mode': enums.StorageMode.WIDE
+    },
+    'wide float32': {
+        'storage_mode': enums.StorageMode.WIDE,
+        'value_dtype': np.float32
+    },
+}
+
+
+def load_site(site: synthetic.SyntheticSite,
+              layout: dict[str, Any]) -> source.DataManager:
+  data_source = source.DataManager(site.site_name, **layout)
+  data_source.load_new_data(site.dataf)
+  # The appended batches are consolidated by the first read.
+  data_source.filter_data(profile_ids=[])
+  return data_source
+
+
+def measure_memory(site: synthetic.SyntheticSite, layout: dict[str,
+                                                               Any]) -> int:
+  """Get the bytes held by a data manager once the readings of a site are loaded.
+
+  Args:
+      site (synthetic.SyntheticSite): The site.
+      layout (dict[str, Any]): The DataManager attributes.
+
+  Returns:
+      int: The traced bytes still allocated after loading, the data manager being alive.
+  """
+  gc.collect()
+  tracemalloc.start()
+  try:
+    data_source = load_site(site, layout)
+    gc.collect()
+    held_bytes, _ = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  del data_source
+  return held_bytes
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--chps', type=int, default=10)
+  parser.add_argument('--boilers', type=int, default=5)
+  parser.add_argument('--years', type=int, default=3)
+  parser.add_argument('--resolution',
+                      default=enums.Resolution.MONTHLY.name,
+                      choices=enums.Resolution.__members__)
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  site = synthetic.generate_site(0, args.chps, args.boilers, args.years)
+  resolution = enums.Resolution[args.resolution]
+  print(f'{site.dataf.size} readings, {args.resolution} report')
+  baseline_bytes = None
+  for layout_name, layout in LAYOUTS.items():
+    held_bytes = measure_memory(site, layout)
+    baseline_bytes = baseline_bytes or held_bytes
+    load_times, report_times = [], []
+    for _ in range(args.repeat):
+      start = time.perf_counter()
+      data_source = load_site(site, layout)
+      load_times.append(time.perf_counter() - start)
+      report_obj = site.create_report(data_source, resolution)
+      start = time.perf_counter()
+      report_obj.calculate_qualifying_outputs()
+      report_times.append(time.perf_counter() - start)
+    print(f'{layout_name:>22}: {held_bytes / 2**20:7.1f} MiB '
+          f'({held_bytes / baseline_bytes:.2f}x), '
+          f'{held_bytes / site.dataf.size:5.1f} B/reading, '
+          f'load {min(load_times):.3f} s, report {min(report_times):.3f} s')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,61 @@
+"""Times the process-pool report runner for an increasing number of workers, on two years of \
+synthetic one-CHP sites.
+
+Run from the repository root with `python -m benchmarks.parallel_runner`.
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from src.common import enums
+from src.models import runner, technology
+
+from . import synthetic
+
+SITE_COUNT = 16
+SCHEME_YEARS = [2021, 2022]
+RESOLUTIONS = [enums.Resolution.MONTHLY, enums.Resolution.DAILY]
+
+
+def write_site(site: synthetic.SyntheticSite,
+               folder: Path) -> tuple[Path, list[technology.Technology]]:
+  """Write the readings of a synthetic site to a csv file.
+
+  Args:
+      site (synthetic.SyntheticSite): The site.
+      folder (Path): Folder where the csv file is written.
+
+  Returns:
+      tuple[Path, list[technology.Technology]]: The csv path and the units of the site.
+  """
+  data_path = folder / f'{site.site_name}.csv'
+  site.dataf.to_csv(data_path)
+  # The ids are remapped by meter name in the workers.
+  return data_path, site.create_units(dict.fromkeys(site.dataf.columns, 0))
+
+
+def main():
+  with tempfile.TemporaryDirectory() as folder:
+    jobs = []
+    for site in synthetic.generate_sites(SITE_COUNT, number_of_years=2):
+      data_path, list_units = write_site(site, Path(folder))
+      jobs += [
+          runner.ReportJob(site.site_name, data_path, list_units, resolution,
+                           scheme_year) for scheme_year in SCHEME_YEARS
+          for resolution in RESOLUTIONS
+      ]
+
+    reference_time = None
+    for max_workers in range(1, (os.cpu_count() or 1) + 1):
+      start = time.perf_counter()
+      result_count = sum(1 for _ in runner.run_reports(
+          jobs, max_workers=max_workers, chunk_size=len(RESOLUTIONS)))
+      elapsed = time.perf_counter() - start
+      reference_time = reference_time or elapsed
+      print(f'{max_workers} workers: {result_count} reports in '
+            f'{elapsed:.2f} s, speedup {reference_time / elapsed:.2f}x')
+
+
+if __name__ == '__main__':
+  main()
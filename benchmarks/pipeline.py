@@ -0,0 +1,225 @@
+"""Times and memory-profiles every stage of the report pipeline over a grid of synthetic sizes.
+
+Run from the repository root with `python -m benchmarks.pipeline`, see `--help` for the grid. \
+The results are written as JSON, one record per (size, stage), so that runs on different \
+versions can be compared.
+"""
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from src.common import enums
+from src.data import source
+from src.models import report
+
+from . import synthetic
+
+RESULTS_FOLDER = Path(__file__).parent / 'results'
+STAGES = [
+    'load_new_data', 'filter_data', 'get_data_and_pivot',
+    'calculate_qualifying_outputs'
+]
+
+
+def run_pipeline(sites: list[synthetic.SyntheticSite],
+                 storage_mode: enums.StorageMode,
+                 measure: Callable[[str, Callable[[], Any]], Any]) -> None:
+  """Run every stage once on fresh objects, measuring each with measure(stage, function).
+
+  Args:
+      sites (list[synthetic.SyntheticSite]): The sites, all loaded into one data source.
+      storage_mode (enums.StorageMode): The layout of the data source.
+      measure (Callable[[str, Callable[[], Any]], Any]): Runs and measures a stage.
+  """
+  data_source = source.DataManager('benchmark', storage_mode)
+
+  def load_sites() -> list[report.CHPQA_report]:
+    list_reports = [site.create_report(data_source) for site in sites]
+    # The appended batches are consolidated by the first read.
+    data_source.filter_data(profile_ids=[])
+    return list_reports
+
+  list_reports = measure('load_new_data', load_sites)
+  list_ids = [
+      profile_id for unit in list_reports[0].list_all_units
+      for profile_id in unit.get_technology_ids()
+  ]
+  measure('filter_data', lambda: data_source.filter_data(profile_ids=list_ids))
+  measure('get_data_and_pivot',
+          lambda: list_reports[0].get_data_and_pivot(list_ids))
+  measure(
+      'calculate_qualifying_outputs', lambda: [
+          report_obj.calculate_qualifying_outputs()
+          for report_obj in list_reports
+      ])
+
+
+def benchmark_size(sites: list[synthetic.SyntheticSite],
+                   storage_mode: enums.StorageMode,
+                   repeat: int) -> dict[str, dict[str, float]]:
+  """Time every stage over several runs, then measure their peak memory in one traced run.
+
+  Args:
+      sites (list[synthetic.SyntheticSite]): The sites.
+      storage_mode (enums.StorageMode): The layout of the data source.
+      repeat (int): The number of timed runs.
+
+  Returns:
+      dict[str, dict[str, float]]: The min and median seconds and the peak MiB of every stage.
+  """
+  timings: dict[str, list[float]] = {stage: [] for stage in STAGES}
+  peaks: dict[str, float] = {}
+
+  def time_stage(stage: str, function: Callable[[], Any]) -> Any:
+    start = time.perf_counter()
+    result = function()
+    timings[stage].append(time.perf_counter() - start)
+    return result
+
+  def trace_stage(stage: str, function: Callable[[], Any]) -> Any:
+    tracemalloc.reset_peak()
+    start_size, _ = tracemalloc.get_traced_memory()
+    result = function()
+    _, peak_size = tracemalloc.get_traced_memory()
+    peaks[stage] = (peak_size - start_size) / 2**20
+    return result
+
+  for _ in range(repeat):
+    run_pipeline(sites, storage_mode, time_stage)
+  tracemalloc.start()
+  try:
+    run_pipeline(sites, storage_mode, trace_stage)
+  finally:
+    tracemalloc.stop()
+  return {
+      stage: {
+          'seconds_min': min(timings[stage]),
+          'seconds_median': statistics.median(timings[stage]),
+          'peak_mib': peaks[stage],
+      }
+      for stage in STAGES
+  }
+
+
+def get_metadata() -> dict[str, Any]:
+  """Describe the code and machine the benchmark ran on.
+
+  Returns:
+      dict[str, Any]: The metadata of the run.
+  """
+  try:
+    commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                            capture_output=True,
+                            text=True,
+                            check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    commit = None
+  return {
+      'timestamp': datetime.now().isoformat(timespec='seconds'),
+      'git_commit': commit,
+      'python': platform.python_version(),
+      'numpy': np.__version__,
+      'pandas': pd.__version__,
+      'platform': platform.platform(),
+      'processor': platform.processor(),
+  }
+
+
+def get_result_key(result: dict[str, Any]) -> tuple:
+  return tuple(result[key] for key in
+               ['sites', 'chps', 'boilers', 'years', 'storage_mode', 'stage'])
+
+
+def compare_results(baseline: list[dict[str, Any]],
+                    results: list[dict[str, Any]]) -> None:
+  """Print the time and memory ratio of every (size, stage) found in both runs.
+
+  Args:
+      baseline (list[dict[str, Any]]): The results of the reference run.
+      results (list[dict[str, Any]]): The results of the current run.
+  """
+  baseline_by_key = {get_result_key(result): result for result in baseline}
+  for result in results:
+    reference = baseline_by_key.get(get_result_key(result))
+    if reference is None:
+      continue
+    print(f"{get_result_key(result)}: time x"
+          f"{result['seconds_min'] / reference['seconds_min']:.2f}, memory x"
+          f"{result['peak_mib'] / max(reference['peak_mib'], 1e-9):.2f}")
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--sites', type=int, nargs='+', default=[1, 10])
+  parser.add_argument('--chps', type=int, nargs='+', default=[1])
+  parser.add_argument('--boilers', type=int, nargs='+', default=[0, 2])
+  parser.add_argument('--years', type=int, nargs='+', default=[1, 3])
+  parser.add_argument('--storage',
+                      nargs='+',
+                      default=[enums.StorageMode.LONG.value],
+                      choices=[mode.value for mode in enums.StorageMode])
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--output', type=Path, default=None)
+  parser.add_argument('--baseline',
+                      type=Path,
+                      default=None,
+                      help='results file of a previous run to compare with')
+  args = parser.parse_args()
+
+  results = []
+  grid = itertools.product(args.sites, args.chps, args.boilers, args.years,
+                           args.storage)
+  for number_of_sites, number_of_chps, number_of_boilers, number_of_years, storage in grid:
+    sites = synthetic.generate_sites(number_of_sites, number_of_chps,
+                                     number_of_boilers, number_of_years,
+                                     args.seed)
+    size = {
+        'sites': number_of_sites,
+        'chps': number_of_chps,
+        'boilers': number_of_boilers,
+        'meters': sum(len(site.dataf.columns) for site in sites),
+        'years': number_of_years,
+        'readings': int(sum(site.dataf.size for site in sites)),
+        'storage_mode': storage,
+    }
+    stage_results = benchmark_size(sites, enums.StorageMode(storage),
+                                   args.repeat)
+    for stage, measures in stage_results.items():
+      results.append(size | {'stage': stage} | measures)
+      print(
+          f"{number_of_sites} sites x {size['meters'] // number_of_sites} meters "
+          f"x {number_of_years} years ({storage}) {stage}: "
+          f"{measures['seconds_min']:.3f} s, {measures['peak_mib']:.1f} MiB")
+
+  output = args.output or RESULTS_FOLDER / (
+      f'pipeline_{datetime.now():%Y%m%d_%H%M%S}.json')
+  output.parent.mkdir(parents=True, exist_ok=True)
+  output.write_text(
+      json.dumps(
+          {
+              'metadata': get_metadata() | {
+                  'seed': args.seed,
+                  'repeat': args.repeat
+              },
+              'results': results
+          },
+          indent=2))
+  print(f'Results written to {output}')
+  if args.baseline is not None:
+    compare_results(json.loads(args.baseline.read_text())['results'], results)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,39 @@
+"""Times a portfolio run against a loop of per-site reports, on a year of synthetic one-CHP sites.
+
+Run from the repository root with `python -m benchmarks.portfolio`.
+"""
+import time
+
+from src.common import enums
+from src.data import source
+from src.models import portfolio
+
+from . import synthetic
+
+SITE_COUNT = 150
+
+
+def main():
+  list_sites = [
+      site.create_report(
+          source.DataManager(site.site_name, enums.StorageMode.WIDE))
+      for site in synthetic.generate_sites(SITE_COUNT)
+  ]
+  for site in list_sites:
+    site.data_source.filter_data()
+
+  start = time.perf_counter()
+  for site in list_sites:
+    site.calculate_qualifying_outputs()
+  loop_time = time.perf_counter() - start
+
+  start = time.perf_counter()
+  portfolio.CHPQA_portfolio(
+      list_sites, enums.Resolution.MONTHLY).calculate_qualifying_outputs()
+  portfolio_time = time.perf_counter() - start
+  print(f'{SITE_COUNT} sites, monthly: per-site loop {loop_time:.3f} s, '
+        f'portfolio {portfolio_time:.3f} s')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,88 @@
+"""Compares a worker's warm start from a memory-mapped snapshot with rebuilding its data manager.
+
+Run from the repository root with `python -m benchmarks.snapshot`. Each worker process opens the \
+snapshot and reads every reading; on Linux the report shows how much of its resident memory is \
+shared through the page cache rather than private to the worker.
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from src.common import enums
+from src.data import source
+
+from . import synthetic
+
+MEMORY_FILE = Path('/proc/self/smaps_rollup')
+
+
+def get_memory_mib() -> Optional[dict[str, float]]:
+  """Get the resident, shared and private memory of the process from /proc, in MiB.
+
+  Returns:
+      Optional[dict[str, float]]: The memory of the process, None when /proc is not available.
+  """
+  if not MEMORY_FILE.exists():
+    return None
+  fields = {}
+  for line in MEMORY_FILE.read_text().splitlines()[1:]:
+    key, value = line.split(':')
+    fields[key] = int(value.split()[0]) / 1024
+  return {
+      'rss': fields['Rss'],
+      'shared': fields['Shared_Clean'] + fields['Shared_Dirty'],
+      'private': fields['Private_Clean'] + fields['Private_Dirty'],
+  }
+
+
+def open_in_worker(folder: Path) -> tuple[float, Optional[dict[str, float]]]:
+  start = time.perf_counter()
+  data_source = source.DataManager.open_snapshot(folder)
+  open_seconds = time.perf_counter() - start
+  data_source.filter_data(wide=True).sum()
+  return open_seconds, get_memory_mib()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--chps', type=int, default=10)
+  parser.add_argument('--boilers', type=int, default=5)
+  parser.add_argument('--years', type=int, default=3)
+  parser.add_argument('--storage',
+                      default=enums.StorageMode.WIDE.value,
+                      choices=[mode.value for mode in enums.StorageMode])
+  parser.add_argument('--workers', type=int, default=4)
+  args = parser.parse_args()
+
+  site = synthetic.generate_site(0, args.chps, args.boilers, args.years)
+  storage_mode = enums.StorageMode(args.storage)
+  start = time.perf_counter()
+  data_source = source.DataManager(site.site_name, storage_mode)
+  data_source.load_new_data(site.dataf)
+  data_source.filter_data(profile_ids=[])
+  print(f'{site.dataf.size} readings ({args.storage}) rebuilt in '
+        f'{time.perf_counter() - start:.3f} s')
+
+  with tempfile.TemporaryDirectory() as folder:
+    snapshot_folder = data_source.save_snapshot(Path(folder) / 'snapshot')
+    start = time.perf_counter()
+    source.DataManager.open_snapshot(snapshot_folder)
+    print(f'Snapshot opened in {(time.perf_counter() - start) * 1e3:.2f} ms')
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(args.workers, mp_context=context) as executor:
+      for worker, (open_seconds, memory) in enumerate(
+          executor.map(open_in_worker, [snapshot_folder] * args.workers)):
+        report = f'Worker {worker}: opened in {open_seconds * 1e3:.2f} ms'
+        if memory is not None:
+          report += (f", {memory['rss']:.0f} MiB resident of which "
+                     f"{memory['shared']:.0f} MiB shared")
+        print(report)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,220 @@
+"""Deterministic synthetic half-hourly data of CHP and boiler sites.
+
+Every site is seeded from (seed, site number), so a site's data does not depend on how many \
+other sites are generated. Profiles are in MWh per half hour:
+  - CHPs follow a daily and seasonal load pattern, with noise and a few whole-day outages. \
+    Gas is derived from the power through a drifting electrical efficiency, heat from the gas \
+    through a drifting heat efficiency.
+  - Boilers top up the heat demand, higher in winter, at a fixed 85% efficiency.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.common import enums
+from src.data import metering, source
+from src.models import report, technology
+
+START_DATE = '2021-04-01'
+PERIODS_PER_YEAR = 17_520
+CHP_CAPACITIES = [0.8, 1.5, 5.0, 12.0, 30.0]
+BOILER_EFFICIENCY = 0.85
+
+
+@dataclass
+class SyntheticUnit:
+  """A unit of a synthetic site and the names of its meters.
+
+  Attributes:
+    name (str): The name of the unit.
+    technology_type (enums.TechnologyType): CHPPLANT or BOILERPLANT.
+    gas_meter (str): The name of the input gas meter.
+    output_meters (dict[enums.EnergyCarrier, str]): The name of each output meter.
+    capacity (float): The electrical capacity of a CHP, the heat capacity of a boiler.
+  """
+  name: str
+  technology_type: enums.TechnologyType
+  gas_meter: str
+  output_meters: dict[enums.EnergyCarrier, str]
+  capacity: float
+
+
+@dataclass
+class SyntheticSite:
+  """The readings and units of a synthetic site.
+
+  Attributes:
+    site_name (str): The name of the site.
+    dataf (pd.DataFrame): The readings, with index=datetime and column=[name of each meter].
+    list_units (list[SyntheticUnit]): The units of the site.
+
+  Methods:
+    create_units: Create the technology objects, given the ids of the meters.
+    create_report: Load the readings into a data source and create the report of the site.
+  """
+  site_name: str
+  dataf: pd.DataFrame
+  list_units: list[SyntheticUnit]
+
+  def create_units(
+      self, meter_id_dict: dict[str, int]) -> list[technology.Technology]:
+    """Create the technology objects, given the ids of the meters.
+
+    Args:
+        meter_id_dict (dict[str, int]): The id of every meter name.
+
+    Returns:
+        list[technology.Technology]: The units of the site.
+    """
+    list_units = []
+    for unit in self.list_units:
+      gas_meter = metering.MeterReader(unit.gas_meter,
+                                       enums.EnergyCarrier.NATURALGAS,
+                                       meter_id_dict[unit.gas_meter])
+      output_meters = [
+          metering.MeterReader(meter_name, energy_carrier,
+                               meter_id_dict[meter_name])
+          for energy_carrier, meter_name in unit.output_meters.items()
+      ]
+      if unit.technology_type is enums.TechnologyType.CHPPLANT:
+        capacity_carrier = enums.EnergyCarrier.ELECTRICITY
+      else:
+        capacity_carrier = enums.EnergyCarrier.HEATING
+      list_units.append(
+          technology.Technology(unit.name, gas_meter, output_meters,
+                                {capacity_carrier: unit.capacity},
+                                unit.technology_type))
+    return list_units
+
+  def create_report(
+      self,
+      data_source: source.DataManager,
+      resolution: enums.Resolution = enums.Resolution.MONTHLY
+  ) -> report.CHPQA_report:
+    """Load the readings into a data source and create the report of the site.
+
+    Args:
+        data_source (source.DataManager): The data source, possibly shared with other sites.
+        resolution (enums.Resolution): The resolution of the report.
+
+    Returns:
+        report.CHPQA_report: The report of the site.
+    """
+    meter_id_dict = data_source.load_new_data(self.dataf)
+    return report.CHPQA_report(self.site_name,
+                               enums.SystemType.COMPLEX,
+                               data_source,
+                               self.create_units(meter_id_dict),
+                               resolution=resolution)
+
+
+def get_load_pattern(index: pd.DatetimeIndex) -> tuple[np.ndarray, np.ndarray]:
+  """Get the daily and seasonal shapes of an index.
+
+  Args:
+      index (pd.DatetimeIndex): The timestamps.
+
+  Returns:
+      tuple[np.ndarray, np.ndarray]: The daily shape, peaking in the afternoon, and the \
+        seasonal shape, 1 in mid-winter and 0 in mid-summer.
+  """
+  hours = index.hour.to_numpy() + index.minute.to_numpy() / 60
+  daily = 0.5 - 0.5 * np.cos(2 * np.pi * (hours - 3) / 24)
+  seasonal = 0.5 + 0.5 * np.cos(2 * np.pi *
+                                (index.dayofyear.to_numpy() - 15) / 365.25)
+  return daily, seasonal
+
+
+def generate_site(site_number: int,
+                  number_of_chps: int = 1,
+                  number_of_boilers: int = 0,
+                  number_of_years: int = 1,
+                  seed: int = 0) -> SyntheticSite:
+  """Generate the half-hourly readings of a site.
+
+  The site has 3 meters per CHP (gas, electricity and heat) and 2 per boiler (gas and heat).
+
+  Args:
+      site_number (int): The number of the site, used in its name and seed.
+      number_of_chps (int): The number of CHPs.
+      number_of_boilers (int): The number of boilers.
+      number_of_years (int): The number of years of readings, from START_DATE.
+      seed (int): The seed shared by all the sites.
+
+  Returns:
+      SyntheticSite: The site.
+  """
+  rng = np.random.default_rng([seed, site_number])
+  site_name = f'site_{site_number}'
+  index = pd.date_range(START_DATE,
+                        periods=PERIODS_PER_YEAR * number_of_years,
+                        freq='30min')
+  daily, seasonal = get_load_pattern(index)
+  days = (index.normalize() - index[0]).days.to_numpy()
+  readings: dict[str, np.ndarray] = {}
+  list_units = []
+
+  for chp_number in range(number_of_chps):
+    name = f'{site_name}_CHP_{chp_number + 1}'
+    capacity = float(rng.choice(CHP_CAPACITIES))
+    load = np.clip(
+        0.55 + 0.25 * daily + 0.15 * seasonal +
+        rng.normal(0, 0.05, len(index)), 0, 1)
+    outage_days = rng.choice(days[-1] + 1,
+                             size=max(1, number_of_years * 6),
+                             replace=False)
+    load[np.isin(days, outage_days)] = 0
+    n_power = 0.35 + 0.02 * np.sin(2 * np.pi * days / 365.25 +
+                                   rng.uniform(0, 2 * np.pi))
+    n_heat = rng.uniform(0.38, 0.5) - 0.06 * (1 - seasonal)
+    power = capacity * load / 2
+    gas = power / n_power
+    readings[f'{name}_gas'] = gas
+    readings[f'{name}_electricity'] = power
+    readings[f'{name}_heat'] = gas * n_heat
+    list_units.append(
+        SyntheticUnit(
+            name, enums.TechnologyType.CHPPLANT, f'{name}_gas', {
+                enums.EnergyCarrier.ELECTRICITY: f'{name}_electricity',
+                enums.EnergyCarrier.HEATING: f'{name}_heat'
+            }, capacity))
+
+  for boiler_number in range(number_of_boilers):
+    name = f'{site_name}_Boiler_{boiler_number + 1}'
+    capacity = float(rng.uniform(1, 10))
+    heat = capacity * np.clip(
+        0.1 + 0.6 * seasonal *
+        (0.5 + daily) + rng.normal(0, 0.05, len(index)), 0, 1) / 2
+    readings[f'{name}_gas'] = heat / BOILER_EFFICIENCY
+    readings[f'{name}_heat'] = heat
+    list_units.append(
+        SyntheticUnit(name, enums.TechnologyType.BOILERPLANT, f'{name}_gas',
+                      {enums.EnergyCarrier.HEATING: f'{name}_heat'}, capacity))
+
+  return SyntheticSite(site_name, pd.DataFrame(readings, index=index),
+                       list_units)
+
+
+def generate_sites(number_of_sites: int,
+                   number_of_chps: int = 1,
+                   number_of_boilers: int = 0,
+                   number_of_years: int = 1,
+                   seed: int = 0) -> list[SyntheticSite]:
+  """Generate the half-hourly readings of several sites, see generate_site.
+
+  Args:
+      number_of_sites (int): The number of sites.
+      number_of_chps (int): The number of CHPs per site.
+      number_of_boilers (int): The number of boilers per site.
+      number_of_years (int): The number of years of readings, from START_DATE.
+      seed (int): The seed shared by all the sites.
+
+  Returns:
+      list[SyntheticSite]: The sites.
+  """
+  return [
+      generate_site(site_number, number_of_chps, number_of_boilers,
+                    number_of_years, seed)
+      for site_number in range(number_of_sites)
+  ]
@@ -0,0 +1,120 @@
+"""Times VerifyToken.verify against a local stub JWKS server, with and without the verified-token cache.
+
+Run from the repository root with `python -m benchmarks.token_verification`.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.security import HTTPAuthorizationCredentials, SecurityScopes
+
+REQUEST_COUNT = 2_000
+TOKEN_COUNT = 20
+KEY_ID = 'benchmark-key'
+AUDIENCE = 'https://chpqa.benchmark/api'
+ISSUER = 'https://chpqa.benchmark/'
+
+
+def start_jwks_server(
+    private_key: rsa.RSAPrivateKey) -> tuple[ThreadingHTTPServer, list[int]]:
+  """Serve the public key as a JWKS on a free local port.
+
+  Args:
+      private_key (rsa.RSAPrivateKey): The signing key.
+
+  Returns:
+      tuple[ThreadingHTTPServer, list[int]]: The server and a one item list counting the JWKS requests.
+  """
+  jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(
+      private_key.public_key()))
+  body = json.dumps({
+      'keys': [jwk | {
+          'kid': KEY_ID,
+          'use': 'sig',
+          'alg': 'RS256'
+      }]
+  }).encode()
+  request_count = [0]
+
+  class JWKSHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+      request_count[0] += 1
+      self.send_response(200)
+      self.send_header('Content-Type', 'application/json')
+      self.send_header('Content-Length', str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+    def log_message(self, *args):
+      pass
+
+  server = ThreadingHTTPServer(('127.0.0.1', 0), JWKSHandler)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server, request_count
+
+
+def time_verify(auth, tokens: list[str]) -> float:
+  """Verify REQUEST_COUNT requests cycling over the tokens.
+
+  Args:
+      auth (VerifyToken): The verifier.
+      tokens (list[str]): The encoded tokens.
+
+  Returns:
+      float: The mean time per request in microseconds.
+  """
+
+  async def run():
+    for request in range(REQUEST_COUNT):
+      await auth.verify(
+          SecurityScopes([]),
+          HTTPAuthorizationCredentials(scheme='Bearer',
+                                       credentials=tokens[request %
+                                                          len(tokens)]))
+
+  start = time.perf_counter()
+  asyncio.run(run())
+  return (time.perf_counter() - start) / REQUEST_COUNT * 1e6
+
+
+def main():
+  private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+  server, jwks_requests = start_jwks_server(private_key)
+  os.environ['AUTH0_DOMAIN'] = f'http://127.0.0.1:{server.server_port}'
+  os.environ['AUTH0_API_AUDIENCE'] = AUDIENCE
+  os.environ['AUTH0_ISSUER'] = ISSUER
+  os.environ['AUTH0_ALGORITHMS'] = 'RS256'
+  # The settings are read from the environment when the module is imported.
+  from src.backend.verification import VerifyToken
+
+  tokens = [
+      jwt.encode(
+          {
+              'sub': f'user_{user}',
+              'aud': AUDIENCE,
+              'iss': ISSUER,
+              'exp': int(time.time()) + 3_600
+          },
+          private_key,
+          algorithm='RS256',
+          headers={'kid': KEY_ID}) for user in range(TOKEN_COUNT)
+  ]
+  for label, max_cached_tokens in [('signature every request', 0),
+                                   ('verified-token cache', 1_024)]:
+    jwks_requests[0] = 0
+    auth = VerifyToken(max_cached_tokens=max_cached_tokens)
+    mean_us = time_verify(auth, tokens)
+    print(f'{label}: {mean_us:.1f} us per request, '
+          f'{jwks_requests[0]} JWKS fetches, '
+          f'{auth.token_cache.hits} cache hits')
+  server.shutdown()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,65 @@
+"""Times upserting an overlapping export into sites holding more and more years of readings.
+
+Run from the repository root with `python -m benchmarks.upsert`, see `--help` for the size of \
+the sites. The export re-sends the last week already held, a few of its readings corrected, and \
+adds a new week, as BMS exports do. The upsert itself should stay flat as the stored years grow. \
+The next read merges the new week into the store as for append_new_data: only the week is \
+sorted and the stored readings are copied once, so it grows linearly with the stored years.
+"""
+import argparse
+import time
+
+from src.common import enums
+from src.data import source
+
+from . import synthetic
+
+PERIODS_PER_WEEK = 7 * 48
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--chps', type=int, default=10)
+  parser.add_argument('--boilers', type=int, default=5)
+  parser.add_argument('--years', type=int, nargs='+', default=[1, 3, 5])
+  parser.add_argument('--storage',
+                      default=enums.StorageMode.LONG.value,
+                      choices=[mode.value for mode in enums.StorageMode])
+  parser.add_argument('--repeat', type=int, default=5)
+  args = parser.parse_args()
+  storage_mode = enums.StorageMode(args.storage)
+
+  for number_of_years in args.years:
+    site = synthetic.generate_site(0, args.chps, args.boilers, number_of_years)
+    stored = site.dataf.iloc[:-PERIODS_PER_WEEK]
+    export = site.dataf.iloc[-2 * PERIODS_PER_WEEK:].copy()
+    export.iloc[:48] *= 1.01
+
+    upsert_times, read_times = [], []
+    for _ in range(args.repeat):
+      data_source = source.DataManager(site.site_name, storage_mode)
+      data_source.load_new_data(stored)
+      data_source.filter_data(profile_ids=[])
+      start = time.perf_counter()
+      result = data_source.upsert_new_data(export)
+      upsert_times.append(time.perf_counter() - start)
+      start = time.perf_counter()
+      # The inserted readings are consolidated by the first read.
+      data_source.filter_data(profile_ids=[])
+      read_times.append(time.perf_counter() - start)
+    print(f'{number_of_years} years, {stored.size} readings stored: upsert '
+          f'{min(upsert_times) * 1e3:.1f} ms, next read '
+          f'{min(read_times) * 1e3:.1f} ms, {result}')
+
+  # Appended instead, the re-sent week of the LONG layout is averaged by the pivot.
+  data_source = source.DataManager(site.site_name, storage_mode)
+  data_source.load_new_data(stored)
+  data_source.load_new_data(export)
+  profile_id = data_source.profile_lookup[export.columns[0]]
+  dataf = data_source.filter_data(profile_ids=[profile_id])
+  print(f'Appended instead: {dataf.duplicated(dataf.columns[:2]).sum()} '
+        'duplicated readings of one meter')
+
+
+if __name__ == '__main__':
+  main()
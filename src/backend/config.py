@@ -11,6 +11,8 @@ class Settings():
   auth0_api_audience: str = os.getenv("AUTH0_API_AUDIENCE")
   auth0_issuer: str = os.getenv("AUTH0_ISSUER")
   auth0_algorithms: str = os.getenv("AUTH0_ALGORITHMS")
+  report_workers: int = int(os.getenv("REPORT_WORKERS", "1"))
+  report_max_pending_jobs: int = int(os.getenv("REPORT_MAX_PENDING_JOBS", "8"))
 
 
 @lru_cache()
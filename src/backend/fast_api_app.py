@@ -1,20 +1,36 @@
 import os
+from contextlib import asynccontextmanager
 from typing import Annotated
 
 import uvicorn
 from auth0.authentication import GetToken
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, Security
+from fastapi import Depends, FastAPI, Request, Security, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 
+from src.backend.config import get_settings
+from src.backend.jobs import (JobStatus, ReportJobManager,
+                              parse_report_request)
 from src.backend.verification import VerifyToken
 
 load_dotenv()
 # Scheme for the Authorization header
 token_auth_scheme = HTTPBearer()
+# Worker processes running the CHPQA reports off the event loop
+job_manager = ReportJobManager(get_settings().report_workers,
+                               get_settings().report_max_pending_jobs)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  """Stops the report workers when the app shuts down."""
+  yield
+  job_manager.shutdown()
+
 
 # Creates app instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 auth = VerifyToken()
 
 # @app.get("/")
@@ -86,6 +102,45 @@ async def verification(
   return 'Approved'
 
 
+@app.post("/reports", status_code=status.HTTP_202_ACCEPTED)
+async def submit_report(
+    request: Request,
+    auth_result: Annotated[str, Depends(check_permission)]) -> JobStatus:
+  """Queues a CHPQA report of the submitted meter data and site configuration.
+  The body, a ReportRequest, is parsed and validated in a thread so that large uploads do not \
+    block the event loop. Answers 422 for an invalid body, and 429 with a Retry-After header \
+    when too many jobs are already queued.
+
+  Args:
+      request (Request): The request, its body being a ReportRequest with the meter readings \
+        and configuration of the site.
+      auth_result (str): The access token.
+
+  Returns:
+      JobStatus: The id of the job, to poll at /reports/{job_id}."""
+  body = await request.body()
+  report_request = await run_in_threadpool(parse_report_request, body)
+  job_id = job_manager.submit(report_request)
+  return JobStatus(job_id=job_id, status='queued')
+
+
+@app.get("/reports/{job_id}")
+async def get_report(job_id: str,
+                     auth_result: Annotated[str,
+                                            Depends(check_permission)],
+                     wait: float = 0) -> JobStatus:
+  """Gets the state of a report job, and its results once done.
+
+  Args:
+      job_id (str): The id of the job.
+      auth_result (str): The access token.
+      wait (float): Seconds to wait for the job to finish before answering, 0 to poll.
+
+  Returns:
+      JobStatus: The state of the job."""
+  return await job_manager.get_status(job_id, min(wait, 60))
+
+
 ### Example of how to use scopes ###
 
 # @app.get("/streamlit/verify_with_scopes")
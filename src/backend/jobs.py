@@ -0,0 +1,291 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import (BaseModel, ValidationError, field_validator,
+                      model_validator)
+
+from src.common import enums
+from src.data import metering, source
+from src.models import report, technology
+
+# Finished jobs whose results are kept, the oldest being dropped first.
+MAX_FINISHED_JOBS = 256
+# Seconds a client is asked to wait before submitting again when the queue is full.
+RETRY_AFTER_SECONDS = 5
+
+
+class MeterConfig(BaseModel):
+  """A meter of the site, its readings being readings[name]."""
+  name: str
+  energy_carrier: str
+
+  @field_validator('energy_carrier')
+  @classmethod
+  def check_energy_carrier(cls, value: str) -> str:
+    if value not in enums.EnergyCarrier.__members__:
+      raise ValueError(
+          f'Unknown energy carrier, expected one of {list(enums.EnergyCarrier.__members__)}'
+      )
+    return value
+
+
+class UnitConfig(BaseModel):
+  """A unit of the site, for example a CHP or a boiler."""
+  name: str
+  technology_type: str = enums.TechnologyType.CHPPLANT.name
+  input_meter: MeterConfig
+  output_meters: list[MeterConfig]
+  electrical_capacity: float = 0.0
+
+  @field_validator('technology_type')
+  @classmethod
+  def check_technology_type(cls, value: str) -> str:
+    if value not in enums.TechnologyType.__members__:
+      raise ValueError(
+          f'Unknown technology type, expected one of {list(enums.TechnologyType.__members__)}'
+      )
+    return value
+
+
+class ReportRequest(BaseModel):
+  """The meter readings and configuration of a site to report on.
+
+  readings maps every meter name to its values, aligned with timestamps, null for a missing reading."""
+  site_name: str
+  units: list[UnitConfig]
+  timestamps: list[datetime]
+  readings: dict[str, list[Optional[float]]]
+  resolution: enums.Resolution = enums.Resolution.MONTHLY
+  type_of_system: enums.SystemType = enums.SystemType.COMPLEX
+
+  @model_validator(mode='after')
+  def check_readings(self) -> 'ReportRequest':
+    for meter_name, values in self.readings.items():
+      if len(values) != len(self.timestamps):
+        raise ValueError(
+            f'readings[{meter_name}] has {len(values)} values for {len(self.timestamps)} timestamps'
+        )
+    for unit in self.units:
+      for meter in [unit.input_meter, *unit.output_meters]:
+        if meter.name not in self.readings:
+          raise ValueError(f'No readings for meter {meter.name}')
+    return self
+
+
+class JobStatus(BaseModel):
+  """The state of a report job: queued, running, done, failed or cancelled.
+
+  result is set once the job is done, error once it failed or was cancelled."""
+  job_id: str
+  status: str
+  result: Optional[dict[str, Any]] = None
+  error: Optional[str] = None
+
+
+def parse_report_request(body: bytes) -> dict[str, Any]:
+  """Validate a raw ReportRequest body and dump it for a worker process.
+
+  Large uploads take a noticeable time to parse and validate, so this is meant to run in a \
+    thread rather than on the event loop.
+
+  Args:
+      body (bytes): The JSON body of the request.
+
+  Returns:
+      dict[str, Any]: The ReportRequest dumped with model_dump.
+
+  Raises:
+      RequestValidationError: If the body is not a valid ReportRequest, answered with 422.
+  """
+  try:
+    report_request = ReportRequest.model_validate_json(body)
+  except ValidationError as error:
+    raise RequestValidationError([{
+        **details, 'loc': ('body', *details['loc'])
+    } for details in error.errors(include_url=False)]) from error
+  return report_request.model_dump()
+
+
+def compute_report(report_request: dict[str, Any]) -> dict[str, Any]:
+  """Run the CHPQA report of a site, in a worker process.
+
+  Args:
+      report_request (dict[str, Any]): A ReportRequest dumped with model_dump.
+
+  Returns:
+      dict[str, Any]: The calculate_qualifying_outputs dataframe in the 'split' orient, \
+        the index as ISO timestamps and the non-finite values as None.
+  """
+  readings = pd.DataFrame(report_request['readings'],
+                          index=pd.DatetimeIndex(report_request['timestamps']),
+                          dtype=np.float64)
+  data_source = source.DataManager(report_request['site_name'],
+                                   enums.StorageMode.WIDE)
+  meter_id_dict = data_source.load_new_data(readings)
+
+  def create_meter(meter_config: dict[str, str]) -> metering.MeterReader:
+    return metering.MeterReader(
+        meter_config['name'],
+        enums.EnergyCarrier[meter_config['energy_carrier']],
+        meter_id_dict[meter_config['name']])
+
+  list_units = [
+      technology.Technology(
+          unit['name'], create_meter(unit['input_meter']),
+          [create_meter(meter) for meter in unit['output_meters']],
+          {enums.EnergyCarrier.ELECTRICITY: unit['electrical_capacity']},
+          enums.TechnologyType[unit['technology_type']])
+      for unit in report_request['units']
+  ]
+  report_obj = report.CHPQA_report(report_request['site_name'],
+                                   report_request['type_of_system'],
+                                   data_source,
+                                   list_units,
+                                   resolution=report_request['resolution'])
+  results = report_obj.calculate_qualifying_outputs()
+  values = results.to_numpy(dtype=np.float64)
+  return {
+      'index': [timestamp.isoformat() for timestamp in results.index],
+      'columns': list(results.columns),
+      'data': np.where(np.isfinite(values), values, None).tolist(),
+  }
+
+
+@dataclass
+class ReportJobManager:
+  """Runs report jobs in a bounded process pool, off the event loop.
+
+  Submissions are refused with HTTP 429 once max_pending_jobs are queued or running, so a burst \
+    of uploads cannot grow the queue without bound and the CPU heavy work never runs in the \
+    process serving the auth endpoints.
+
+  Attributes:
+    max_workers (int): Number of worker processes.
+    max_pending_jobs (int): Number of queued or running jobs accepted.
+
+  Methods:
+    submit: Queue a report job and return its id.
+    get_status: Get the state of a job, optionally waiting for it to finish.
+    shutdown: Stop the worker processes.
+  """
+  max_workers: int = 1
+  max_pending_jobs: int = 8
+  _executor: Optional[ProcessPoolExecutor] = field(init=False,
+                                                   default=None,
+                                                   repr=False)
+  _jobs: OrderedDict[str, Future] = field(init=False,
+                                          default_factory=OrderedDict,
+                                          repr=False)
+
+  @property
+  def pending_count(self) -> int:
+    """Get the number of queued or running jobs."""
+    return sum(1 for future in self._jobs.values() if not future.done())
+
+  def submit(self, report_request: dict[str, Any]) -> str:
+    """Queue a report job and return its id.
+
+    A worker process that dies, for example killed for its memory, breaks the whole pool: the \
+      jobs it held are then reported as failed and a new pool takes the job.
+
+    Args:
+        report_request (dict[str, Any]): The site to report on, see parse_report_request.
+
+    Returns:
+        str: The id of the job.
+    """
+    if self.pending_count >= self.max_pending_jobs:
+      raise HTTPException(status.HTTP_429_TOO_MANY_REQUESTS,
+                          detail='Too many report jobs queued, retry later.',
+                          headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+    job_id = uuid.uuid4().hex
+    try:
+      future = self._get_executor().submit(compute_report, report_request)
+    except BrokenProcessPool:
+      self._replace_broken_executor()
+      future = self._get_executor().submit(compute_report, report_request)
+    self._jobs[job_id] = future
+    self._drop_finished_jobs()
+    return job_id
+
+  def _get_executor(self) -> ProcessPoolExecutor:
+    if self._executor is None:
+      self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+    return self._executor
+
+  def _replace_broken_executor(self) -> None:
+    """Fail the jobs lost with a broken pool and drop it, the next submission starting a new one."""
+    lost_job_error = BrokenProcessPool(
+        'A worker process died before finishing the job.')
+    for future in self._jobs.values():
+      try:
+        future.set_exception(lost_job_error)
+      except InvalidStateError:
+        # Finished, or already failed by the pool itself.
+        pass
+    self.shutdown()
+
+  def _drop_finished_jobs(self) -> None:
+    finished = [
+        job_id for job_id, future in self._jobs.items() if future.done()
+    ]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+      del self._jobs[job_id]
+
+  async def get_status(self, job_id: str, wait: float = 0) -> JobStatus:
+    """Get the state of a job, optionally waiting for it to finish.
+
+    Args:
+        job_id (str): The id of the job.
+        wait (float): Seconds to wait for the job to finish before answering.
+
+    Returns:
+        JobStatus: The state of the job.
+    """
+    future = self._jobs.get(job_id)
+    if future is None:
+      raise HTTPException(status.HTTP_404_NOT_FOUND,
+                          detail=f'Unknown report job {job_id}')
+    if wait > 0 and not future.done():
+      try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                               wait)
+      except asyncio.CancelledError:
+        if not future.cancelled():
+          raise
+      except Exception:
+        # Timeouts and job failures are both reported from the future below.
+        pass
+    if future.cancelled():
+      return JobStatus(
+          job_id=job_id,
+          status='cancelled',
+          error='The job was cancelled when the server shut down.')
+    if not future.done():
+      return JobStatus(job_id=job_id,
+                       status='running' if future.running() else 'queued')
+    if future.exception() is not None:
+      return JobStatus(job_id=job_id,
+                       status='failed',
+                       error=str(future.exception()))
+    return JobStatus(job_id=job_id, status='done', result=future.result())
+
+  def shutdown(self) -> None:
+    """Stop the worker processes, cancelling the queued jobs."""
+    # Cancelled here rather than by cancel_futures alone, which the pool only applies if it is
+    # still referenced when its management thread wakes up.
+    for future in self._jobs.values():
+      future.cancel()
+    if self._executor is not None:
+      self._executor.shutdown(wait=False, cancel_futures=True)
+      self._executor = None
@@ -1,4 +1,8 @@
-from typing import Optional
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
 
 import jwt
 from fastapi import Depends, HTTPException, status
@@ -7,6 +11,13 @@ from fastapi.security import (HTTPAuthorizationCredentials, HTTPBearer,
 
 from src.backend.config import get_settings
 
+# Seconds the JWKS signing keys are used before being fetched again.
+JWKS_CACHE_TTL = 300
+# Minimum seconds between two fetches triggered by tokens naming an unknown key id.
+JWKS_MIN_REFRESH_INTERVAL = 10
+# Number of verified tokens kept, the least recently used being evicted first.
+MAX_CACHED_TOKENS = 1024
+
 
 class UnauthorizedException(HTTPException):
 
@@ -22,23 +33,179 @@ class UnauthenticatedException(HTTPException):
                      detail="Requires authentication")
 
 
+class JWKSCache:
+  """Parsed signing keys of a JWKS endpoint, keyed by key id.
+  
+  The keys are fetched again once they are older than the TTL, or when a token names a key id \
+    that is not cached (e.g. after a key rotation), at most once per min_refresh_interval.
+
+  Attributes:
+    jwks_client PyJWKClient: The client fetching the JWKS.  
+    ttl float: Seconds the keys are used before being fetched again.  
+    min_refresh_interval float: Minimum seconds between two fetches for unknown key ids.  
+    fetch_count int: Number of times the JWKS was fetched.  
+
+  Methods:
+    refresh: Fetch and parse the signing keys.
+    get_signing_key: Get the signing key of a key id.
+  """
+
+  def __init__(self,
+               jwks_client: jwt.PyJWKClient,
+               ttl: float = JWKS_CACHE_TTL,
+               min_refresh_interval: float = JWKS_MIN_REFRESH_INTERVAL):
+    self.jwks_client = jwks_client
+    self.ttl = ttl
+    self.min_refresh_interval = min_refresh_interval
+    self.fetch_count = 0
+    self._keys: dict[str, Any] = {}
+    self._fetched_at = float('-inf')
+    self._lock = threading.Lock()
+
+  def refresh(self) -> None:
+    """Fetch and parse the signing keys."""
+    self._keys = {
+        jwk.key_id: jwk.key
+        for jwk in self.jwks_client.get_signing_keys(refresh=True)
+    }
+    self._fetched_at = time.monotonic()
+    self.fetch_count += 1
+
+  def get_signing_key(self, kid: Optional[str]) -> Any:
+    """Get the signing key of a key id, fetching the keys if they expired or the key id is unknown.
+    
+    Args:
+        kid (Optional[str]): The key id of the token header.  
+    
+    Returns:
+        Any: The public key.
+    """
+    with self._lock:
+      age = time.monotonic() - self._fetched_at
+      if age >= self.ttl or (kid not in self._keys
+                             and age >= self.min_refresh_interval):
+        self.refresh()
+      if kid not in self._keys:
+        raise jwt.exceptions.PyJWKClientError(
+            f'Unable to find a signing key that matches: "{kid}"')
+      return self._keys[kid]
+
+
+class VerifiedTokenCache:
+  """LRU of the payloads of already verified tokens, keyed by the sha256 of the token.
+  
+  A payload is only served until the token's exp claim, tokens without exp are not cached.
+
+  Attributes:
+    max_size int: Number of tokens kept, 0 to disable the cache.  
+    hits int: Number of payloads served from the cache.  
+    misses int: Number of tokens that had to be verified.  
+
+  Methods:
+    get: Get the payload of a verified token that has not expired.
+    put: Store the payload of a verified token.
+  """
+
+  def __init__(self, max_size: int = MAX_CACHED_TOKENS):
+    self.max_size = max_size
+    self.hits = 0
+    self.misses = 0
+    self._payloads: OrderedDict[str, dict[str, Any]] = OrderedDict()
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def _get_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+  def get(self, token: str) -> Optional[dict[str, Any]]:
+    """Get the payload of a verified token that has not expired.
+    
+    Args:
+        token (str): The encoded token.  
+    
+    Returns:
+        Optional[dict[str, Any]]: A copy of the payload, None if the token has to be verified.
+    """
+    key = self._get_key(token)
+    with self._lock:
+      payload = self._payloads.get(key)
+      if payload is not None and payload['exp'] > time.time():
+        self._payloads.move_to_end(key)
+        self.hits += 1
+        return dict(payload)
+      if payload is not None:
+        del self._payloads[key]
+      self.misses += 1
+      return None
+
+  def put(self, token: str, payload: dict[str, Any]) -> None:
+    """Store the payload of a verified token.
+    
+    Args:
+        token (str): The encoded token.  
+        payload (dict[str, Any]): The decoded payload.
+    """
+    if self.max_size <= 0 or not isinstance(payload.get('exp'), (int, float)):
+      return
+    key = self._get_key(token)
+    with self._lock:
+      self._payloads[key] = dict(payload)
+      self._payloads.move_to_end(key)
+      while len(self._payloads) > self.max_size:
+        self._payloads.popitem(last=False)
+
+
 class VerifyToken:
   """Does all the token verification using PyJWT
   
   Attributes:
     config Settings: The settings object.  
     jwks_client PyJWKClient: The PyJWKClient object.  
+    jwks_cache JWKSCache: The parsed signing keys.  
+    token_cache VerifiedTokenCache: The payloads of the tokens already verified.  
   
   Methods:
     verify: Takes the users bearer token, decodes it and verifies it using PyJWT. \
       If the token is valid it then checks if the user has the required permissions (scopes).
+    decode: Verifies the signature and claims of a token and returns its payload.
   """
 
-  def __init__(self):
+  def __init__(self,
+               jwks_cache_ttl: float = JWKS_CACHE_TTL,
+               max_cached_tokens: int = MAX_CACHED_TOKENS):
     self.config = get_settings()
 
     jwks_url = f'{self.config.auth0_domain}/.well-known/jwks.json'
-    self.jwks_client = jwt.PyJWKClient(jwks_url)
+    self.jwks_client = jwt.PyJWKClient(jwks_url, cache_jwk_set=False)
+    self.jwks_cache = JWKSCache(self.jwks_client, jwks_cache_ttl)
+    self.token_cache = VerifiedTokenCache(max_cached_tokens)
+
+  def decode(self, encoded_token: str) -> dict[str, Any]:
+    """ Verifies the signature and claims of a token and returns its payload.
+    
+    Args:
+        encoded_token (str): The encoded token.  
+    
+    Returns:
+        dict[str, Any]: The decoded token payload.
+    """
+    try:
+      signing_key = self.jwks_cache.get_signing_key(
+          jwt.get_unverified_header(encoded_token).get('kid'))
+    except jwt.exceptions.PyJWKClientError as error:
+      raise UnauthorizedException(str(error))
+    except jwt.exceptions.DecodeError as error:
+      raise UnauthorizedException(str(error))
+    try:
+      return jwt.decode(
+          encoded_token,
+          signing_key,
+          algorithms=[self.config.auth0_algorithms],
+          audience=self.config.auth0_api_audience,
+          issuer=self.config.auth0_issuer,
+      )
+    except Exception as error:
+      raise UnauthorizedException(str(error))
 
   async def verify(
       self,
@@ -46,7 +213,8 @@ class VerifyToken:
       token: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer())
   ) -> dict[str, str]:
     """ Takes the users bearer token, decodes it and verifies it using PyJWT. \
-          If the token is valid it then checks if the user has the required permissions (scopes).
+          If the token is valid it then checks if the user has the required permissions (scopes). \
+          Tokens verified before and not expired skip the signature verification.
     
     Args:
         security_scopes (SecurityScopes): The required permissions (scopes).  
@@ -57,21 +225,11 @@ class VerifyToken:
     """
     if token is None:
       raise UnauthenticatedException
+    payload = self.token_cache.get(token.credentials)
+    if payload is None:
+      payload = self.decode(token.credentials)
+      self.token_cache.put(token.credentials, payload)
     try:
-      signing_key = self.jwks_client.get_signing_key_from_jwt(
-          token.credentials).key
-    except jwt.exceptions.PyJWKClientError as error:
-      raise UnauthorizedException(str(error))
-    except jwt.exceptions.DecodeError as error:
-      raise UnauthorizedException(str(error))
-    try:
-      payload = jwt.decode(
-          token.credentials,
-          signing_key,
-          algorithms=[self.config.auth0_algorithms],
-          audience=self.config.auth0_api_audience,
-          issuer=self.config.auth0_issuer,
-      )
       if security_scopes.scopes:
         if not payload['permissions'] in security_scopes.scopes:
           raise UnauthorizedException(
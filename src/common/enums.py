@@ -8,10 +8,24 @@ class SystemType(StrEnum):
   COMPLEX = auto()
 
 
+class StorageMode(StrEnum):
+  """Layout used by the DataManager to hold the readings"""
+  LONG = auto()
+  WIDE = auto()
+
+
 class Resolution(Enum):
+  """Time resolutions, the values are the matching pandas offset aliases.
+
+  CHPQA scheme years are calendar years, so SCHEMEYEAR has the periods of YEARLY and is \
+    kept as its own member for the reports which are labelled by scheme year.
+  """
   YEARLY = 'y'
+  SCHEMEYEAR = 'A-DEC'  # January to December, labelled by the 31st of December
+  QUARTERLY = 'Q'
   MONTHLY = 'm'
   WEEKLY = 'w'
+  DAILY = 'D'
   HOURLY = 'H'
   HALFHOURLY = '30min'
 
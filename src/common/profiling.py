@@ -0,0 +1,184 @@
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Optional
+
+# Key of the stage summary in the attrs of an instrumented result dataframe.
+SUMMARY_ATTRS_KEY = 'instrumentation'
+
+
+@dataclass(frozen=True)
+class StageRecord:
+  """The measurements of one run of a stage.
+
+  Attributes:
+    component (str): The class running the stage, e.g. DataManager or CHPQA_report.
+    name (str): The name of the object running the stage, its site or data manager name.
+    stage (str): The name of the stage, e.g. filter_data.
+    seconds (float): The wall time of the stage.
+    rows (Optional[int]): The number of rows the stage produced, None if not reported.
+    peak_bytes (Optional[int]): The peak traced allocations of the stage above the memory \
+      held when it started, None unless memory is traced.
+    depth (int): The number of enclosing stages, 0 for a stage called from outside.
+  """
+  component: str
+  name: str
+  stage: str
+  seconds: float
+  rows: Optional[int]
+  peak_bytes: Optional[int]
+  depth: int
+
+
+class NullStage:
+  """The stage returned when instrumentation is disabled, ignoring everything set on it."""
+  rows = None
+
+  def __enter__(self) -> 'NullStage':
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    return None
+
+  def __setattr__(self, name: str, value: Any) -> None:
+    pass
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage:
+  """A running stage, set rows on it to report how many rows the stage produced."""
+  __slots__ = ('instrumentation', 'component', 'name', 'stage', 'rows',
+               'start_time', 'start_bytes', 'peak_bytes')
+
+  def __init__(self, instrumentation: 'Instrumentation', component: str,
+               name: str, stage: str) -> None:
+    self.instrumentation = instrumentation
+    self.component = component
+    self.name = name
+    self.stage = stage
+    self.rows: Optional[int] = None
+    self.start_bytes = 0
+    self.peak_bytes = 0
+
+  def __enter__(self) -> 'Stage':
+    self.instrumentation._enter(self)
+    self.start_time = time.perf_counter()
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    seconds = time.perf_counter() - self.start_time
+    self.instrumentation._exit(self, seconds)
+
+
+@dataclass
+class Instrumentation:
+  """Records the wall time, row count and peak allocations of every stage run by the objects \
+    it is attached to, through their instrumentation attribute.
+
+  Stages nest, a stage's time and memory including the stages it calls. Memory is traced \
+    with tracemalloc, which is started if it is not already running and slows the traced \
+    code down noticeably, so it is off by default. An instance is not thread safe, attach \
+    one per thread.
+
+  Attributes:
+    trace_memory (bool): Measure the peak allocations of every stage.
+    hooks (list[Callable[[StageRecord], None]]): Called with every record as soon as its stage ends.
+    records (list[StageRecord]): Every record, in the order the stages ended.
+
+  Methods:
+    stage: Measure a stage, used as a context manager.
+    summary: Get the records as dictionaries.
+    clear: Drop the records.
+    close: Stop tracemalloc if it was started by this object.
+  """
+  trace_memory: bool = False
+  hooks: list[Callable[[StageRecord], None]] = field(default_factory=list)
+  records: list[StageRecord] = field(init=False, default_factory=list)
+  _active: list[Stage] = field(init=False, default_factory=list, repr=False)
+  _started_tracing: bool = field(init=False, default=False, repr=False)
+
+  def __post_init__(self) -> None:
+    if self.trace_memory and not tracemalloc.is_tracing():
+      tracemalloc.start()
+      self._started_tracing = True
+
+  def stage(self, component: str, name: str, stage: str) -> Stage:
+    """Measure a stage, used as a context manager.
+
+    Args:
+        component (str): The class running the stage.
+        name (str): The name of the object running the stage.
+        stage (str): The name of the stage.
+
+    Returns:
+        Stage: The running stage, set its rows attribute to record a row count.
+    """
+    return Stage(self, component, name, stage)
+
+  def _enter(self, stage: Stage) -> None:
+    if self.trace_memory:
+      # The peak is global, so it is handed to the enclosing stages before being reset.
+      current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+      for active in self._active:
+        active.peak_bytes = max(active.peak_bytes, peak_bytes)
+      tracemalloc.reset_peak()
+      stage.start_bytes = stage.peak_bytes = current_bytes
+    self._active.append(stage)
+
+  def _exit(self, stage: Stage, seconds: float) -> None:
+    self._active.remove(stage)
+    peak_bytes = None
+    if self.trace_memory:
+      stage.peak_bytes = max(stage.peak_bytes,
+                             tracemalloc.get_traced_memory()[1])
+      for active in self._active:
+        active.peak_bytes = max(active.peak_bytes, stage.peak_bytes)
+      tracemalloc.reset_peak()
+      peak_bytes = stage.peak_bytes - stage.start_bytes
+    record = StageRecord(stage.component, stage.name, stage.stage, seconds,
+                         stage.rows, peak_bytes, len(self._active))
+    self.records.append(record)
+    for hook in self.hooks:
+      hook(record)
+
+  def summary(self, since: int = 0) -> list[dict[str, Any]]:
+    """Get the records as dictionaries.
+
+    Args:
+        since (int): The number of records to skip, len(records) taken before a call \
+          gives the records of that call.
+
+    Returns:
+        list[dict[str, Any]]: One dictionary per record, with the StageRecord fields as keys.
+    """
+    return [asdict(record) for record in self.records[since:]]
+
+  def clear(self) -> None:
+    """Drop the records."""
+    self.records.clear()
+
+  def close(self) -> None:
+    """Stop tracemalloc if it was started by this object."""
+    if self._started_tracing:
+      tracemalloc.stop()
+      self._started_tracing = False
+
+
+def measure(instrumentation: Optional[Instrumentation], component: str,
+            name: str, stage: str) -> Stage | NullStage:
+  """Measure a stage if instrumentation is attached, at the cost of a function call otherwise.
+
+  Args:
+      instrumentation (Optional[Instrumentation]): The instrumentation, None when disabled.
+      component (str): The class running the stage.
+      name (str): The name of the object running the stage.
+      stage (str): The name of the stage.
+
+  Returns:
+      Stage | NullStage: A context manager whose rows attribute can be set.
+  """
+  if instrumentation is None:
+    return NULL_STAGE
+  return instrumentation.stage(component, name, stage)
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from . import schema
+
+X_Y_SHEET_PATH = Path(__file__).parent / "x_y_coeff_vals - Sheet1.csv"
+
+
+@dataclass(frozen=True)
+class XYCoefficientTable:
+  """The X and Y coefficients used in the Quality Index, one row per capacity band.
+
+  Attributes:
+    upper_bounds (np.ndarray): Inclusive upper capacity bound in MWe of every band except the last, open ended, one.
+    x_coeffs (np.ndarray): X coefficient of each band.
+    y_coeffs (np.ndarray): Y coefficient of each band.
+
+  Methods:
+    lookup: Get the X and Y coefficients for one or many capacities.
+  """
+  upper_bounds: np.ndarray
+  x_coeffs: np.ndarray
+  y_coeffs: np.ndarray
+
+  def lookup(
+      self, capacities: Union[float, np.ndarray]
+  ) -> tuple[Union[float, np.ndarray], Union[float, np.ndarray]]:
+    """Get the X and Y coefficients for one or many capacities by bisection over the band bounds.
+
+    Args:
+        capacities (Union[float, np.ndarray]): Maximum electrical capacity in MWe, a scalar or an array.
+
+    Returns:
+        tuple[Union[float, np.ndarray], Union[float, np.ndarray]]: The X and Y coefficients, \
+          in the same shape as capacities.
+    """
+    band = np.searchsorted(self.upper_bounds, capacities, side='left')
+    return self.x_coeffs[band], self.y_coeffs[band]
+
+
+@lru_cache()
+def load_x_y_table(sheet_path: Path = X_Y_SHEET_PATH) -> XYCoefficientTable:
+  """Read the X and Y coefficient sheet once per process.
+
+  Args:
+      sheet_path (Path): Path to the coefficient csv, defaults to the copy shipped in src/data.
+
+  Returns:
+      XYCoefficientTable: The coefficient table ordered by capacity band.
+  """
+  table = pd.read_csv(sheet_path).sort_values(schema.xyvalSchema.key)
+  return XYCoefficientTable(
+      upper_bounds=table[schema.xyvalSchema.key].to_numpy()[:-1],
+      x_coeffs=table[schema.xyvalSchema.X_coef].to_numpy(),
+      y_coeffs=table[schema.xyvalSchema.Y_coef].to_numpy())
@@ -1,43 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Optional
 
+import numpy as np
 import pandas as pd
 
 from . import schema
 
+SM3_TO_MWH = (39.3 / 3.6) / 1000  #MWh/m3
+KWH_TO_MWH = 1 / 1000
+# Reduces a block of raw rows while reading, e.g. transform_raw_dataf with a column mapping.
+BlockTransform = Callable[[pd.DataFrame], pd.DataFrame]
 
-def read_data(file_path: Path) -> pd.DataFrame:
+
+@dataclass
+class ColumnMapping:
+  """
+  An output column, as the sum of raw columns each multiplied by its conversion factor.
+
+  Attributes:
+    output (str): The name of the output column.
+    inputs (dict[str, float]): The conversion factor of each raw column.
+    missing_as_zero (bool): Count missing readings as 0, as for totals, instead of leaving \
+      the output missing where none of its raw columns has a reading.
+  """
+  output: str
+  inputs: dict[str, float]
+  missing_as_zero: bool = False
+
+
+@dataclass
+class UnitColumns:
+  """
+  The raw columns metering a unit of the site.
+
+  Attributes:
+    name (str): The name of the unit, used as prefix of its output columns (e.g. CHP, Boiler_1).
+    gas (list[str]): The input gas columns, in Sm3.
+    heat (list[str]): The heat output columns, in MWh.
+    electricity (list[str]): The electricity output columns, in kWh (e.g. day and night registers).
+  """
+  name: str
+  gas: list[str]
+  heat: list[str]
+  electricity: list[str] = field(default_factory=list)
+
+
+def read_data(file_path: Path,
+              usecols: Optional[list[str]] = None,
+              dtype: Optional[dict[str, Any]] = None,
+              parse_dates: Optional[list[str]] = None,
+              engine: Optional[str] = None,
+              chunksize: Optional[int] = None,
+              transform: Optional[BlockTransform] = None) -> pd.DataFrame:
   """
   Read data from a csv file and return a pandas dataframe.
+  With a chunksize the file is read in blocks of rows and the transform is applied to each block \
+    before they are concatenated, e.g. transform_raw_dataf with the column mapping of the site, \
+    so that a single raw block is held at a time next to the reduced ones.
 
   Args:
       file_path (str): Path to the csv file.
+      usecols (Optional[list[str]]): The columns to keep, None for all of them.
+      dtype (Optional[dict[str, Any]]): The dtype of each column, inferred if not given.
+      parse_dates (Optional[list[str]]): The columns to parse as timestamps while reading.
+      engine (Optional[str]): The pandas csv engine, 'pyarrow' for the multithreaded arrow parser.
+      chunksize (Optional[int]): Number of rows per block, None to read the file at once.
+      transform (Optional[BlockTransform]): Applied to every block, or \
+        to the whole file without a chunksize. The index of its results is kept.
   
   Returns:
       pd.DataFrame: A pandas dataframe.
   """
-  return pd.read_csv(file_path)
+  if chunksize is not None and engine == 'pyarrow':
+    raise ValueError("The 'pyarrow' engine does not support chunked reading.")
+  read_kwargs: dict[str, Any] = {
+      'usecols': usecols,
+      'dtype': dtype,
+      'parse_dates': parse_dates or False,
+  }
+  if engine == 'pyarrow':
+    # Arrow already infers timestamp columns, which pandas fails to parse a second time.
+    read_kwargs['parse_dates'] = False
+    dataf = pd.read_csv(file_path, engine=engine, **read_kwargs)
+    for column in parse_dates or []:
+      dataf[column] = pd.to_datetime(dataf[column])
+    return dataf if transform is None else transform(dataf)
+  if engine is not None:
+    read_kwargs['engine'] = engine
+  if chunksize is None:
+    dataf = pd.read_csv(file_path, **read_kwargs)
+    return dataf if transform is None else transform(dataf)
+  with pd.read_csv(file_path, chunksize=chunksize, **read_kwargs) as reader:
+    if transform is None:
+      return pd.concat(list(reader), ignore_index=True)
+    return pd.concat([transform(block) for block in reader])
 
 
-def compile_data(folder_path: Path) -> pd.DataFrame:
+def compile_data(folder_path: Path,
+                 usecols: Optional[list[str]] = None,
+                 dtype: Optional[dict[str, Any]] = None,
+                 parse_dates: Optional[list[str]] = None,
+                 engine: Optional[str] = None,
+                 chunksize: Optional[int] = None,
+                 transform: Optional[BlockTransform] = None,
+                 max_workers: Optional[int] = 1) -> pd.DataFrame:
   """
   Read data from a csv file and return a pandas dataframe.
+  Files are parsed concurrently when max_workers is not 1, pandas and pyarrow releasing the GIL \
+    while parsing, and are concatenated in folder order.
 
   Args:
       folder_path (str): Path to the folder containing the csv files.
+      usecols (Optional[list[str]]): The columns to keep, None for all of them.
+      dtype (Optional[dict[str, Any]]): The dtype of each column, inferred if not given.
+      parse_dates (Optional[list[str]]): The columns to parse as timestamps while reading.
+      engine (Optional[str]): The pandas csv engine, 'pyarrow' for the multithreaded arrow parser.
+      chunksize (Optional[int]): Number of rows per block, None to read each file at once.
+      transform (Optional[BlockTransform]): Applied to every block or \
+        file before concatenating, see read_data.
+      max_workers (Optional[int]): Number of reading threads, None for the ThreadPoolExecutor default.
 
   Returns:
       pd.DataFrame: A pandas dataframe.
   """
-  appended_data = []
+  read_file = partial(read_data,
+                      usecols=usecols,
+                      dtype=dtype,
+                      parse_dates=parse_dates,
+                      engine=engine,
+                      chunksize=chunksize,
+                      transform=transform)
+  list_filepaths = list(folder_path.glob('*.csv'))
 
-  for filepath in folder_path.glob(
-      '*.csv'
-  ):  # Loop to run through each invoice and append to the final outputs.
-    raw_data = read_data(filepath)
-    appended_data.append(raw_data)
+  if max_workers == 1:
+    appended_data = [read_file(filepath) for filepath in list_filepaths]
+  else:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      appended_data = list(executor.map(read_file, list_filepaths))
 
-  all_raw_data = pd.concat(appended_data, ignore_index=True)
+  all_raw_data = pd.concat(appended_data, ignore_index=transform is None)
 
   return all_raw_data
 
@@ -45,6 +149,7 @@ def compile_data(folder_path: Path) -> pd.DataFrame:
 def clean_data(dataf: pd.DataFrame) -> pd.DataFrame:
   """
   Clean the raw data and return a pandas dataframe.
+  The empty numeric columns are found with a single reduction over the numeric block.
 
   Args:
       dataf (pd.DataFrame): A pandas dataframe.
@@ -55,66 +160,118 @@ def clean_data(dataf: pd.DataFrame) -> pd.DataFrame:
 
   dataf.dropna(axis=1, inplace=True)
 
-  empty_col = []
-  for column in dataf.columns:
-    if dataf[column].max() == 0 and dataf[column].mean() == 0:
-      empty_col.append(column)
-
-  dataf.drop(empty_col, axis=1, inplace=True)
+  if len(dataf):
+    numeric_dataf = dataf.select_dtypes(include=['number', 'bool'])
+    empty_col = numeric_dataf.columns[(numeric_dataf.to_numpy() == 0).all(
+        axis=0)]
+    dataf.drop(empty_col, axis=1, inplace=True)
 
   return dataf
 
 
-def transform_raw_dataf(dataf: pd.DataFrame) -> pd.DataFrame:
+def build_column_mapping(list_units: list[UnitColumns]) -> list[ColumnMapping]:
+  """
+  Build the column mapping of a site with any number of units, followed by the heat and gas totals.
+  Every unit gives a [name]_heat and [name]_gas column, and a [name]_electricity and \
+    [name]_total_heat column if it has power meters, as CHP_total_heat.
+
+  Args:
+      list_units (list[UnitColumns]): The raw columns of every unit of the site.
+
+  Returns:
+      list[ColumnMapping]: The mapping of every output column.
+  """
+  column_mapping = []
+  for unit in list_units:
+    if unit.electricity:
+      column_mapping.append(
+          ColumnMapping(f'{unit.name}_electricity',
+                        {column: KWH_TO_MWH
+                         for column in unit.electricity}))
+      column_mapping.append(
+          ColumnMapping(f'{unit.name}_total_heat',
+                        {column: 1.0
+                         for column in unit.heat}))
+    column_mapping.append(
+        ColumnMapping(f'{unit.name}_heat',
+                      {column: 1.0
+                       for column in unit.heat}))
+    column_mapping.append(
+        ColumnMapping(f'{unit.name}_gas',
+                      {column: SM3_TO_MWH
+                       for column in unit.gas}))
+  column_mapping.append(
+      ColumnMapping(
+          schema.outputSchema.Total_heat,
+          {column: 1.0
+           for unit in list_units for column in unit.heat},
+          missing_as_zero=True))
+  column_mapping.append(
+      ColumnMapping(
+          schema.outputSchema.Total_gas,
+          {column: SM3_TO_MWH
+           for unit in list_units for column in unit.gas},
+          missing_as_zero=True))
+  return column_mapping
+
+
+def get_conversion_matrix(
+    column_mapping: list[ColumnMapping]) -> tuple[list[str], np.ndarray]:
+  """
+  Get the matrix turning the raw columns into the output columns.
+
+  Args:
+      column_mapping (list[ColumnMapping]): The mapping of every output column.
+
+  Returns:
+      tuple[list[str], np.ndarray]: The raw columns used and the (raw columns, output columns) matrix of factors.
+  """
+  input_columns = list(
+      dict.fromkeys(column for mapping in column_mapping
+                    for column in mapping.inputs))
+  input_positions = {
+      column: position
+      for position, column in enumerate(input_columns)
+  }
+  conversion_matrix = np.zeros((len(input_columns), len(column_mapping)))
+  for output_position, mapping in enumerate(column_mapping):
+    for column, factor in mapping.inputs.items():
+      conversion_matrix[input_positions[column], output_position] += factor
+  return input_columns, conversion_matrix
+
+
+def transform_raw_dataf(
+    dataf: pd.DataFrame,
+    column_mapping: list[ColumnMapping],
+    timestamp_column: str = 'From Timestamp') -> pd.DataFrame:
   """
   Transform the raw data and return a pandas dataframe.
+  Every output column is computed in one matrix product of the raw numeric block with the \
+    conversion matrix. Missing readings count as 0 in the totals, the other columns are left \
+    missing where none of their raw columns has a reading.
 
   Args:
       dataf (pd.DataFrame): A pandas dataframe.
+      column_mapping (list[ColumnMapping]): The mapping of every output column, see build_column_mapping.
+      timestamp_column (str): The raw column holding the timestamps.
     
   Returns:
       pd.DataFrame: The transformed data. All columns are in MWh.
   """
+  input_columns, conversion_matrix = get_conversion_matrix(column_mapping)
+  values = dataf[input_columns].to_numpy(dtype=np.float64)
+  outputs = np.nan_to_num(values) @ conversion_matrix
+  keeps_gaps = [not mapping.missing_as_zero for mapping in column_mapping]
+  # A boolean product: whether any raw column of each output has a reading.
+  has_reading = ~np.isnan(values) @ (conversion_matrix[:, keeps_gaps] != 0)
+  outputs[:, keeps_gaps] = np.where(has_reading, outputs[:, keeps_gaps],
+                                    np.nan)
+  chpqa = pd.DataFrame(outputs,
+                       index=pd.DatetimeIndex(
+                           pd.to_datetime(dataf[timestamp_column]),
+                           name=schema.outputSchema.Datetime),
+                       columns=[mapping.output for mapping in column_mapping])
 
-  sm3_to_MWh = (39.3 / 3.6) / 1000  #MWh/m3
-  chpqa = pd.DataFrame()
-
-  chpqa[schema.outputSchema.Datetime] = pd.to_datetime(
-      dataf['From Timestamp'])  #, format='%d/%m/%Y %H:%M:%S')
-  chpqa[schema.outputSchema.CHP_elec] = dataf[[
-      schema.inputSchema.CHP_elec_day, schema.inputSchema.CHP_elec_night
-  ]].sum(axis=1) / 1000
-  #,schema.inputSchema.CHP_par_elec_day, schema.inputSchema.CHP_par_elec_night
-  chpqa[schema.outputSchema.CHP_heat_total] = dataf[
-      schema.inputSchema.CHP_heat]
-  #chpqa[schema.outputSchema.CHP_dump_heat] = -dataf[schema.inputSchema.CHP_dump_heat]/1000
-  chpqa[schema.outputSchema.CHP_heat] = dataf[
-      schema.inputSchema.
-      CHP_heat]  #-(dataf[schema.inputSchema.CHP_dump_heat]/1000)
-  chpqa[schema.outputSchema.
-        CHP_gas] = dataf[schema.inputSchema.CHP_gas] * sm3_to_MWh
-  chpqa[schema.outputSchema.Boiler_1_heat] = dataf[
-      schema.inputSchema.Boiler_1_heat]
-  chpqa[schema.outputSchema.Boiler_2_heat] = dataf[
-      schema.inputSchema.Boiler_2_heat]
-  chpqa[schema.outputSchema.Boiler_3_heat] = dataf[
-      schema.inputSchema.Boiler_3_heat]
-  chpqa[schema.outputSchema.
-        Boiler_1_gas] = dataf[schema.inputSchema.Boiler_1_gas] * sm3_to_MWh
-  chpqa[schema.outputSchema.
-        Boiler_2_gas] = dataf[schema.inputSchema.Boiler_2_gas] * sm3_to_MWh
-  chpqa[schema.outputSchema.
-        Boiler_3_gas] = dataf[schema.inputSchema.Boiler_3_gas] * sm3_to_MWh
-  chpqa[schema.outputSchema.Total_heat] = (chpqa[[
-      schema.outputSchema.CHP_heat, schema.outputSchema.Boiler_1_heat,
-      schema.outputSchema.Boiler_2_heat, schema.outputSchema.Boiler_3_heat
-  ]].sum(axis=1))
-  chpqa[schema.outputSchema.Total_gas] = chpqa[[
-      schema.outputSchema.CHP_gas, schema.outputSchema.Boiler_1_gas,
-      schema.outputSchema.Boiler_2_gas, schema.outputSchema.Boiler_3_gas
-  ]].sum(axis=1)
-
-  chpqa.set_index('Datetime', drop=True, inplace=True)
   chpqa.sort_index(ascending=True, inplace=True)
 
   return chpqa
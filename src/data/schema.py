@@ -76,7 +76,12 @@ class xyvalSchema:
   MWe = 'MWe'
   X_coef = 'X_coeff'
   Y_coef = 'Y_coeff'
-  key = 'Key_col'
+  key = 'key_col'
+
+
+class portfolioSchema:
+  site = 'Site_name'
+  period = DataSchema.DATE
 
 
 class qualifyingSchema:
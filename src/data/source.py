@@ -1,11 +1,118 @@
+import hashlib
+import json
+import shutil
 from dataclasses import dataclass, field
 from datetime import datetime
+from pathlib import Path
 from typing import Optional
+from urllib.parse import quote
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.common import enums, profiling
 
 from . import schema
 
+# File describing a saved site, next to its month partitions. Files starting with '_' are
+# skipped by the pyarrow dataset discovery.
+CATALOGUE_FILE = '_catalogue.json'
+# Partitioning of a saved site, one folder per calendar month, e.g. month=202104.
+MONTH_PARTITIONING = ds.partitioning(pa.schema([('month', pa.int32())]),
+                                     flavor='hive')
+# Bytes of the blake2b digest of a profile name used as its id. A digest rather than a counter
+# gives every process the same id without sharing a registry. 48 bits keep the id exact as a
+# float64 or a JSON number, and make a collision unlikely (about 2e-7 for 10,000 meters); a
+# collision within a data manager raises instead of merging the readings. The memory layouts
+# store dense codes or int64 ids whatever the width.
+PROFILE_ID_BYTES = 6
+# Origin of the int32 half-hour offsets that replace the timestamps in the compact LONG layout.
+COMPACT_EPOCH = pd.Timestamp('2000-01-01')
+# Nanoseconds in a half hour, the step of the compact LONG offsets.
+HALF_HOUR_NS = 30 * 60 * 10**9
+# Version of the snapshot layout written by save_snapshot.
+SNAPSHOT_FORMAT_VERSION = 2
+# File describing a snapshot, next to its arrays.
+SNAPSHOT_CATALOGUE_FILE = 'catalogue.json'
+# Arrays of a snapshot, each stored contiguously and little-endian in <name>.bin.
+SNAPSHOT_ARRAYS = ('timestamps', 'ids', 'values')
+
+
+def get_profile_id(profile_name: str) -> int:
+  """Get the id of a profile name, a digest of the name so that it is the same in every \
+    process and run, unlike the salted built-in hash.
+
+  Args:
+      profile_name (str): The name of the profile, i.e. of its meter.
+
+  Returns:
+      int: A non-negative id below 2**(8 * PROFILE_ID_BYTES).
+  """
+  digest = hashlib.blake2b(str(profile_name).encode(),
+                           digest_size=PROFILE_ID_BYTES).digest()
+  return int.from_bytes(digest, 'big')
+
+
+def get_site_folder(path: str | Path, name: str) -> Path:
+  """Get the folder of a site in a saved dataset.
+
+  Args:
+      path (str | Path): The root folder of the dataset.
+      name (str): The name of the site, i.e. of its data manager.
+
+  Returns:
+      Path: The site=<name> folder, the name being percent-encoded.
+  """
+  return Path(path) / f"site={quote(name, safe='')}"
+
+
+def get_month_keys(timestamps: pd.DatetimeIndex) -> np.ndarray:
+  """Get the month partition of every timestamp, as year * 100 + month.
+
+  Args:
+      timestamps (pd.DatetimeIndex): The timestamps.
+
+  Returns:
+      np.ndarray: The int32 month keys.
+  """
+  return (timestamps.year * 100 + timestamps.month).to_numpy(dtype=np.int32)
+
+
+def stack_wide_data(wide_dataf: pd.DataFrame) -> pd.DataFrame:
+  """Turn a dataframe with index=datetime and columns=profile ids into the tidy format.
+
+  Args:
+      wide_dataf (pd.DataFrame): A pandas dataframe with one column per profile id.
+
+  Returns:
+      pd.DataFrame: A pandas dataframe with the (Datetime, ID, Value) columns.
+  """
+  long_dataf = wide_dataf.stack().to_frame().reset_index()
+  long_dataf.columns = [
+      schema.DataSchema.DATE, schema.DataSchema.ID, schema.DataSchema.VALUE
+  ]
+  return long_dataf
+
+
+@dataclass(frozen=True)
+class UpsertResult:
+  """The number of readings of an upserted batch by outcome.
+
+  Attributes:
+    inserted (int): Readings of a (profile id, datetime) that had no reading, neither in memory \
+      nor in the opened Parquet site.
+    updated (int): Readings that replaced a different stored or saved value.
+    unchanged (int): Readings equal to the stored value.
+    duplicates (int): Readings dropped as a later reading of the batch had the same \
+      (profile id, datetime).
+  """
+  inserted: int
+  updated: int
+  unchanged: int
+  duplicates: int
+
 
 @dataclass
 class DataManager:
@@ -13,6 +120,20 @@ class DataManager:
   
   Attributes:
     name (str): Name for the data manager object
+    storage_mode (enums.StorageMode): LONG keeps one (Datetime, ID, Value) row per reading, \
+      WIDE keeps one contiguous float array per profile id over a shared sorted DatetimeIndex.
+    append_buffer_rows (int): Minimum number of buffered rows before appended batches are \
+      consolidated without waiting for a read.
+    compact (bool): In the LONG layout, store int32 half-hour offsets from COMPACT_EPOCH and \
+      int16/int32 codes of the profile ids instead of datetime64 timestamps and int64 ids, \
+      which requires half-hourly timestamps. No effect in the WIDE layout.
+    value_dtype (type): np.float64, or np.float32 to halve the memory of the stored values. \
+      The readings are returned as float64 whatever the stored precision.
+    instrumentation (Optional[profiling.Instrumentation]): Records the time, rows and memory \
+      of every stage when set, see profiling.Instrumentation.
+  
+  A data manager can be saved as Parquet and opened again, the saved readings then being read \
+    lazily: filter_data only reads the month partitions and profile columns it asks for.
   
   Methods:
     transform_new_data: Transform the new data into a tidy dataframe.
@@ -21,10 +142,40 @@ class DataManager:
     load_new_data: Load new data. input_dataf is is in the format column=[name of each meter] and index=datetime
     append_new_data: Append new data to the existing database
     filter_data: Filter the data based on the start and end time and the profile ids
+    time_bounds: Get the first and last timestamp held
+    data_version: Get a counter that changes whenever the stored data changes
+    profile_lookup: Get the id of every profile name loaded
+    save: Save the data as Parquet, partitioned by site and month
+    open: Open a site saved with save, without reading its readings
+    upsert_new_data: Insert or replace data in the format of load_new_data
+    upsert_data: Insert or replace tidy data, keyed on (profile id, datetime)
+    save_snapshot: Save the readings held in memory as a binary snapshot
+    open_snapshot: Memory-map a snapshot saved with save_snapshot
     
   """
   name: str
+  storage_mode: enums.StorageMode = enums.StorageMode.LONG
+  append_buffer_rows: int = 100_000
+  compact: bool = False
+  value_dtype: type = np.float64
+  instrumentation: Optional[profiling.Instrumentation] = field(default=None,
+                                                               repr=False)
   _data: pd.DataFrame = field(init=False)
+  _pending_batches: list[pd.DataFrame] = field(init=False)
+  _pending_rows: int = field(init=False)
+  _data_version: int = field(init=False, default=0)
+  _id_offsets: dict[int, tuple[int, int]] = field(init=False)
+  _time_bounds: tuple[Optional[pd.Timestamp],
+                      Optional[pd.Timestamp]] = field(init=False)
+  _wide_index: pd.DatetimeIndex = field(init=False)
+  _wide_values: dict[int, np.ndarray] = field(init=False)
+  _profile_lookup: dict[str, int] = field(init=False)
+  _profile_codes: dict[int, int] = field(init=False)
+  _archive: Optional[ds.Dataset] = field(init=False)
+  _archive_folder: Optional[Path] = field(init=False)
+  _archive_ids: dict[int, None] = field(init=False)
+  _archive_bounds: tuple[Optional[pd.Timestamp],
+                         Optional[pd.Timestamp]] = field(init=False)
 
   def __post_init__(self) -> None:
     self.create_empty_database()
@@ -55,69 +206,1010 @@ class DataManager:
     Returns:
         list[int]: A list of all the profile ids.
     """
-    return self._data[schema.DataSchema.ID].unique().tolist()
+    self._consolidate()
+    if self.storage_mode is enums.StorageMode.WIDE:
+      profile_ids = dict.fromkeys(self._wide_values)
+    else:
+      profile_ids = dict.fromkeys(self._id_offsets)
+    return list(profile_ids | self._archive_ids)
+
+  @property
+  def time_bounds(
+      self) -> tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    """Get the first and last timestamp held
+
+    Returns:
+        tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]: The first and last timestamp, None if empty.
+    """
+    if self.storage_mode is enums.StorageMode.WIDE:
+      self._consolidate()
+      if len(self._wide_index) == 0:
+        bounds = (None, None)
+      else:
+        bounds = (self._wide_index[0], self._wide_index[-1])
+    else:
+      bounds = self._time_bounds
+    starts = [
+        bound for bound in (bounds[0], self._archive_bounds[0])
+        if bound is not None
+    ]
+    ends = [
+        bound for bound in (bounds[1], self._archive_bounds[1])
+        if bound is not None
+    ]
+    return min(starts, default=None), max(ends, default=None)
+
+  @property
+  def data_version(self) -> int:
+    """Get a counter that changes whenever the stored data changes
+
+    Returns:
+        int: The current data version.
+    """
+    return self._data_version
+
+  @property
+  def profile_lookup(self) -> dict[str, int]:
+    """Get the id of every profile name loaded
+
+    Returns:
+        dict[str, int]: The mapping of the profile names to the profile ids, including \
+          those of an opened site.
+    """
+    return dict(self._profile_lookup)
 
   def create_empty_database(self) -> None:
     """Create an empty database.
     """
-    columns = [(schema.DataSchema.DATE, "datetime64[ns]"),
-               (schema.DataSchema.ID, int), (schema.DataSchema.VALUE, float)]
+    self._data_version += 1
+    if self.compact:
+      columns = [(schema.DataSchema.DATE, np.int32),
+                 (schema.DataSchema.ID, np.int16),
+                 (schema.DataSchema.VALUE, self.value_dtype)]
+    else:
+      columns = [(schema.DataSchema.DATE, "datetime64[ns]"),
+                 (schema.DataSchema.ID, int),
+                 (schema.DataSchema.VALUE, self.value_dtype)]
     self._data = pd.DataFrame({
         col_name: pd.Series(dtype=col_type)
         for col_name, col_type in columns
     })
+    self._pending_batches = []
+    self._pending_rows = 0
+    self._id_offsets = {}
+    self._time_bounds = (None, None)
+    self._wide_index = pd.DatetimeIndex([], name=schema.DataSchema.DATE)
+    self._wide_values = {}
+    self._profile_lookup = {}
+    self._profile_codes = {}
+    self._archive = None
+    self._archive_folder = None
+    self._archive_ids = {}
+    self._archive_bounds = (None, None)
 
   def load_new_data(self, input_dataf: pd.DataFrame) -> dict[str, int]:
     """Load new data. input_dataf is in the format column=[name of each meter] and index=datetime
     
+    A name already loaded keeps its id, a new name gets the stable id of get_profile_id, so \
+      the ids of a meter match across processes, runs, saved sites and snapshots.
+    
     Args:
         input_dataf (pd.DataFrame): A pandas dataframe.
     
+    Returns:
+        dict[str, int]: A dictionary with the mapping of the profile names to the profile ids.
+    """
+    with self._measure('load_new_data') as stage:
+      stage.rows = len(input_dataf)
+      profile_ID_lookup = self._register_profiles(input_dataf.columns)
+
+      if self.storage_mode is enums.StorageMode.WIDE:
+        self._buffer_batch(input_dataf.rename(columns=profile_ID_lookup))
+        return profile_ID_lookup
+
+      new_data_to_append = self.transform_new_data(input_dataf,
+                                                   profile_ID_lookup)
+      self.append_new_data(new_data_to_append)
+    return profile_ID_lookup
+
+  def _register_profiles(self, profile_names: pd.Index) -> dict[str, int]:
+    """Get the id of every profile name, registering the new names.
+
+    Args:
+        profile_names (pd.Index): The names of the profiles.
+
     Returns:
         dict[str, int]: A dictionary with the mapping of the profile names to the profile ids.
     """
     profile_ID_lookup: dict[str, int] = {}
+    known_names = {
+        profile_id: profile_name
+        for profile_name, profile_id in self._profile_lookup.items()
+    }
 
-    for column_name in input_dataf.columns:
-      temp_profile_ID = hash(column_name)
+    for column_name in profile_names:
+      temp_profile_ID = self._profile_lookup.get(column_name)
+      if temp_profile_ID is None:
+        temp_profile_ID = get_profile_id(column_name)
+        if known_names.setdefault(temp_profile_ID, column_name) != column_name:
+          raise ValueError(
+              f'The profiles {known_names[temp_profile_ID]} and {column_name} '
+              f'have the same id {temp_profile_ID}, rename one of them.')
       profile_ID_lookup[column_name] = temp_profile_ID
-
-    new_data_to_append = self.transform_new_data(input_dataf,
-                                                 profile_ID_lookup)
-    self.append_new_data(new_data_to_append)
+    self._profile_lookup.update(profile_ID_lookup)
     return profile_ID_lookup
 
+  def upsert_new_data(self, input_dataf: pd.DataFrame) -> UpsertResult:
+    """Insert or replace data in the format of load_new_data, see upsert_data.
+
+    The ids of the profile names are available from profile_lookup.
+
+    Args:
+        input_dataf (pd.DataFrame): A pandas dataframe with column=[name of each meter] and index=datetime.
+
+    Returns:
+        UpsertResult: The number of readings inserted, updated and unchanged.
+    """
+    profile_ID_lookup = self._register_profiles(input_dataf.columns)
+    return self.upsert_data(
+        self.transform_new_data(input_dataf, profile_ID_lookup))
+
+  def upsert_data(self, new_data: pd.DataFrame) -> UpsertResult:
+    """Insert or replace tidy data, keyed on (profile id, datetime).
+
+    Unlike append_new_data, a reading of a (profile id, datetime) already held replaces the \
+      stored value in place instead of being added next to it, so overlapping exports are not \
+      averaged by the pivot. For a batch of k readings and a store of n:
+      - the readings held in memory are located by binary search, in O(k log n);
+      - for an opened Parquet site, the saved readings of the batch's meters are read over \
+        the batch's time range only, a corrected reading being kept in memory over the saved one;
+      - the new readings go through the append buffer. The next read sorts them, in \
+        O(k log k), and merges them into the store, which copies its n rows once.
+    Missing (NaN) readings are ignored.
+
+    Args:
+        new_data (pd.DataFrame): A pandas dataframe with the (Datetime, ID, Value) columns.
+
+    Returns:
+        UpsertResult: The number of readings inserted, updated and unchanged, and of the \
+          readings dropped as duplicates within the batch.
+    """
+    with self._measure('upsert_data') as stage:
+      stage.rows = len(new_data)
+      new_data = new_data.dropna(subset=[schema.DataSchema.VALUE])
+      batch = new_data.drop_duplicates(
+          [schema.DataSchema.ID, schema.DataSchema.DATE], keep='last')
+      self._consolidate()
+      if self.storage_mode is enums.StorageMode.WIDE:
+        is_new, is_updated = self._upsert_wide_data(batch)
+      else:
+        is_new, is_updated = self._upsert_long_data(batch)
+      if is_updated.any():
+        self._data_version += 1
+      is_appended = is_new.copy()
+      if self._archive is not None and is_new.any():
+        new_rows = np.flatnonzero(is_new)
+        is_saved, is_changed = self._find_archived_data(batch.iloc[new_rows])
+        is_new[new_rows[is_saved]] = False
+        is_updated[new_rows[is_changed]] = True
+        is_appended[new_rows[is_saved & ~is_changed]] = False
+      if is_appended.any():
+        self.append_new_data(batch[is_appended])
+      inserted, updated = int(is_new.sum()), int(is_updated.sum())
+    return UpsertResult(inserted=inserted,
+                        updated=updated,
+                        unchanged=len(batch) - inserted - updated,
+                        duplicates=len(new_data) - len(batch))
+
+  def _upsert_long_data(self,
+                        batch: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Replace the stored values of the readings of a batch already held in the LONG layout.
+
+    A reading appended more than once is stored as several rows, averaged by the pivot. The \
+      first row takes the new value and the other copies are deleted, so the reading is held \
+      once and read back as upserted.
+
+    Args:
+        batch (pd.DataFrame): Tidy readings, without NaN or duplicated (profile id, datetime).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Whether each reading is new and whether it updated a value.
+    """
+    encoded = self._encode_long_data(batch)
+    keys = encoded[schema.DataSchema.DATE].to_numpy()
+    new_values = encoded[schema.DataSchema.VALUE].to_numpy()
+    dates = self._data[schema.DataSchema.DATE].to_numpy()
+    starts = np.zeros(len(batch), dtype=np.intp)
+    ends = np.zeros(len(batch), dtype=np.intp)
+    for profile_id, rows in batch.groupby(schema.DataSchema.ID,
+                                          sort=False).indices.items():
+      if profile_id not in self._id_offsets:
+        continue
+      start, end = self._id_offsets[profile_id]
+      id_dates = dates[start:end]
+      starts[rows] = start + id_dates.searchsorted(keys[rows], side='left')
+      ends[rows] = start + id_dates.searchsorted(keys[rows], side='right')
+
+    copies = ends - starts
+    is_new = copies == 0
+    is_updated = np.zeros(len(batch), dtype=bool)
+    # One entry per stored row of a matched reading, i.e. per copy.
+    copy_rows = np.repeat(np.arange(len(batch)), copies)
+    first_copies = np.cumsum(copies) - copies
+    copy_numbers = np.arange(len(copy_rows)) - np.repeat(first_copies, copies)
+    copy_positions = starts[copy_rows] + copy_numbers
+    values = self._data[schema.DataSchema.VALUE].to_numpy()
+    changed = values[copy_positions] != new_values[copy_rows]
+    values[copy_positions[changed]] = new_values[copy_rows[changed]]
+    is_updated[copy_rows[changed]] = True
+    if (copy_numbers > 0).any():
+      is_kept = np.ones(len(self._data), dtype=bool)
+      is_kept[copy_positions[copy_numbers > 0]] = False
+      self._data = self._data[is_kept].reset_index(drop=True)
+      self._build_id_offsets()
+    return is_new, is_updated
+
+  def _find_archived_data(
+      self, batch: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Look up readings of a batch in the opened Parquet site.
+
+    Args:
+        batch (pd.DataFrame): Tidy readings, without NaN or duplicated (profile id, datetime).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Whether each reading is saved and whether its value differs.
+    """
+    dates = pd.DatetimeIndex(batch[schema.DataSchema.DATE])
+    profile_ids = batch[schema.DataSchema.ID].to_numpy()
+    archived = self._read_archive(dates.min(), dates.max(),
+                                  list(dict.fromkeys(profile_ids.tolist())))
+    row_positions = archived.index.get_indexer(dates)
+    column_positions = archived.columns.get_indexer(profile_ids)
+    is_located = (row_positions >= 0) & (column_positions >= 0)
+    archived_values = archived.to_numpy(dtype=np.float64)
+    saved_values = np.full(len(batch), np.nan)
+    saved_values[is_located] = archived_values[row_positions[is_located],
+                                               column_positions[is_located]]
+    is_saved = ~np.isnan(saved_values)
+    # Compared in the stored precision, as for the readings held in memory.
+    saved_values = saved_values.astype(self.value_dtype)
+    new_values = batch[schema.DataSchema.VALUE].to_numpy(
+        dtype=self.value_dtype)
+    is_changed = is_saved & (saved_values != new_values)
+    return is_saved, is_changed
+
+  def _upsert_wide_data(self,
+                        batch: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Replace the stored values of the readings of a batch already held in the WIDE layout.
+
+    Args:
+        batch (pd.DataFrame): Tidy readings, without NaN or duplicated (profile id, datetime).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Whether each reading is new and whether it updated a value.
+    """
+    keys = pd.DatetimeIndex(batch[schema.DataSchema.DATE]).values
+    new_values = batch[schema.DataSchema.VALUE].to_numpy(dtype=np.float64)
+    index_values = self._wide_index.values
+    found = np.minimum(index_values.searchsorted(keys), len(index_values) - 1)
+    has_timestamp = (index_values[found] == keys) if len(index_values) else \
+      np.zeros(len(batch), dtype=bool)
+    is_new = np.ones(len(batch), dtype=bool)
+    is_updated = np.zeros(len(batch), dtype=bool)
+    for profile_id, rows in batch.groupby(schema.DataSchema.ID,
+                                          sort=False).indices.items():
+      values = self._wide_values.get(profile_id)
+      if values is None:
+        continue
+      rows = rows[has_timestamp[rows]]
+      stored = values[found[rows]]
+      rows, stored = rows[~np.isnan(stored)], stored[~np.isnan(stored)]
+      is_new[rows] = False
+      # Compared in the stored precision, so a float32 store is not updated by rounding.
+      changed = stored != new_values[rows].astype(values.dtype)
+      values[found[rows[changed]]] = new_values[rows[changed]]
+      is_updated[rows[changed]] = True
+    return is_new, is_updated
+
   def append_new_data(self, new_data: pd.DataFrame) -> None:
     """Append new data to the existing database.
     
+    The batch is buffered and merged into the stored data on the next read, or as soon \
+      as the buffer holds as many rows as the store (and at least append_buffer_rows), \
+      so ingesting many small batches costs amortised linear time.
+    
     Args:
         new_data (pd.DataFrame): A pandas dataframe to append to the existing database.
     """
-    self._data = pd.concat([self._data, new_data], axis=0)
-    self._data.reset_index(inplace=True, drop=True)
+    with self._measure('append_new_data') as stage:
+      stage.rows = len(new_data)
+      if self.storage_mode is enums.StorageMode.WIDE:
+        self._buffer_batch(
+            new_data.pivot_table(index=schema.DataSchema.DATE,
+                                 columns=schema.DataSchema.ID,
+                                 values=schema.DataSchema.VALUE))
+        return
+      self._update_time_bounds(new_data[schema.DataSchema.DATE])
+      self._buffer_batch(self._encode_long_data(new_data))
+
+  def _measure(self, stage: str) -> profiling.Stage | profiling.NullStage:
+    return profiling.measure(self.instrumentation, 'DataManager', self.name,
+                             stage)
+
+  def _buffer_batch(self, batch: pd.DataFrame) -> None:
+    """Add a batch to the append buffer and consolidate once the buffer has grown enough.
+
+    Args:
+        batch (pd.DataFrame): A batch in the layout of the current storage mode.
+    """
+    self._data_version += 1
+    self._pending_batches.append(batch)
+    self._pending_rows += len(batch)
+    stored_rows = len(self._wide_index) if self.storage_mode is \
+      enums.StorageMode.WIDE else len(self._data)
+    if self._pending_rows >= max(self.append_buffer_rows, stored_rows):
+      self._consolidate()
+
+  def _consolidate(self) -> None:
+    """Merge every buffered batch into the stored data in a single pass.
+    """
+    if not self._pending_batches:
+      return
+    with self._measure('consolidate') as stage:
+      stage.rows = self._pending_rows
+      pending_batches = self._pending_batches
+      self._pending_batches = []
+      self._pending_rows = 0
+      if self.storage_mode is enums.StorageMode.WIDE:
+        self._append_wide_data(pending_batches)
+        return
+      self._merge_long_data(pending_batches)
+      self._build_id_offsets()
+
+  def _merge_long_data(self, long_batches: list[pd.DataFrame]) -> None:
+    """Merge batches in the LONG layout into the data, sorted by (ID, Datetime).
+
+    Only the batches are sorted. Their rows are then inserted at their binary-searched \
+      positions, so the stored data is copied once rather than sorted again.
+
+    Args:
+        long_batches (list[pd.DataFrame]): Encoded batches, oldest first.
+    """
+    batch = pd.concat(long_batches, ignore_index=True).sort_values(
+        [schema.DataSchema.ID, schema.DataSchema.DATE],
+        kind='stable',
+        ignore_index=True)
+    ids = self._data[schema.DataSchema.ID].to_numpy()
+    dates = self._data[schema.DataSchema.DATE].to_numpy()
+    batch_ids = batch[schema.DataSchema.ID].to_numpy()
+    batch_dates = batch[schema.DataSchema.DATE].to_numpy()
+    unique_ids, id_starts = np.unique(batch_ids, return_index=True)
+    id_ends = np.append(id_starts[1:], len(batch))
+    positions = np.empty(len(batch), dtype=np.intp)
+    for profile_id, batch_start, batch_end in zip(unique_ids, id_starts,
+                                                  id_ends):
+      start = ids.searchsorted(profile_id, side='left')
+      end = ids.searchsorted(profile_id, side='right')
+      batch_rows = slice(batch_start, batch_end)
+      # After the stored readings of the same timestamps, as repeated appends are ordered.
+      positions[batch_rows] = start + dates[start:end].searchsorted(
+          batch_dates[batch_rows], side='right')
+
+    merged_columns = {}
+    for column in self._data.columns:
+      stored = self._data[column].to_numpy()
+      inserted = batch[column].to_numpy()
+      # The compact codes outgrow int16 once enough profiles are added.
+      stored = stored.astype(np.result_type(stored, inserted), copy=False)
+      merged_columns[column] = np.insert(stored, positions, inserted)
+    self._data = pd.DataFrame(merged_columns)
+
+  def _update_time_bounds(self, new_dates: pd.Series) -> None:
+    """Widen the stored time bounds with a batch of new timestamps.
+
+    Args:
+        new_dates (pd.Series): The timestamps of the batch that was appended.
+    """
+    if new_dates.empty:
+      return
+    batch_start, batch_end = new_dates.min(), new_dates.max()
+    start_time, end_time = self._time_bounds
+    self._time_bounds = (
+        batch_start if start_time is None else min(start_time, batch_start),
+        batch_end if end_time is None else max(end_time, batch_end))
+
+  def _build_id_offsets(self) -> None:
+    """Record the [start, end) row range of each profile id in the sorted data.
+    """
+    ids = self._data[schema.DataSchema.ID].to_numpy()
+    boundaries = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+    starts = np.concatenate(([0], boundaries)) if len(ids) else boundaries
+    ends = np.concatenate((boundaries, [len(ids)])) if len(ids) else boundaries
+    if self.compact:
+      ids = np.array(list(self._profile_codes), dtype=np.int64)[ids]
+    self._id_offsets = {
+        ids[start].item(): (int(start), int(end))
+        for start, end in zip(starts, ends)
+    }
+
+  def _encode_long_data(self, tidy_dataf: pd.DataFrame) -> pd.DataFrame:
+    """Convert tidy data to the dtypes stored in the LONG layout.
+
+    Args:
+        tidy_dataf (pd.DataFrame): A pandas dataframe with the (Datetime, ID, Value) columns.
+
+    Returns:
+        pd.DataFrame: The same rows with the compact timestamps and ids when compact, and the \
+          values in value_dtype.
+    """
+    values = tidy_dataf[schema.DataSchema.VALUE].to_numpy(
+        dtype=self.value_dtype)
+    if not self.compact:
+      if values.dtype == tidy_dataf[schema.DataSchema.VALUE].dtype:
+        return tidy_dataf
+      return tidy_dataf.assign(**{schema.DataSchema.VALUE: values})
+
+    nanoseconds = pd.DatetimeIndex(tidy_dataf[schema.DataSchema.DATE]).asi8
+    offsets, remainders = np.divmod(nanoseconds - COMPACT_EPOCH.value,
+                                    HALF_HOUR_NS)
+    if remainders.any():
+      raise ValueError(
+          'The compact layout only stores timestamps on the half hour.')
+    if len(offsets) and not (np.iinfo(np.int32).min <= offsets.min()
+                             and offsets.max() <= np.iinfo(np.int32).max):
+      raise ValueError('Timestamps out of the range of the compact layout.')
+
+    unique_ids, inverse = np.unique(
+        tidy_dataf[schema.DataSchema.ID].to_numpy(), return_inverse=True)
+    for profile_id in unique_ids:
+      self._profile_codes.setdefault(int(profile_id), len(self._profile_codes))
+    code_dtype = np.int16 if len(self._profile_codes) <= np.iinfo(
+        np.int16).max else np.int32
+    unique_codes = np.array(
+        [self._profile_codes[int(profile_id)] for profile_id in unique_ids],
+        dtype=code_dtype)
+    return pd.DataFrame({
+        schema.DataSchema.DATE: offsets.astype(np.int32),
+        schema.DataSchema.ID: unique_codes[inverse],
+        schema.DataSchema.VALUE: values
+    })
+
+  def _decode_long_data(self, stored_dataf: pd.DataFrame) -> pd.DataFrame:
+    """Convert rows of the LONG layout back to tidy data with float64 values.
+
+    Args:
+        stored_dataf (pd.DataFrame): Rows of the stored data.
+
+    Returns:
+        pd.DataFrame: The rows with datetime64 timestamps, int64 ids and float64 values.
+    """
+    values = stored_dataf[schema.DataSchema.VALUE].to_numpy(dtype=np.float64)
+    if not self.compact:
+      if values.dtype == stored_dataf[schema.DataSchema.VALUE].dtype:
+        return stored_dataf
+      return stored_dataf.assign(**{schema.DataSchema.VALUE: values})
+    offsets = stored_dataf[schema.DataSchema.DATE].to_numpy(dtype=np.int64)
+    dates = pd.to_datetime(COMPACT_EPOCH.value + offsets * HALF_HOUR_NS)
+    profile_ids = np.array(list(self._profile_codes), dtype=np.int64)
+    codes = stored_dataf[schema.DataSchema.ID].to_numpy()
+    return pd.DataFrame(
+        {
+            schema.DataSchema.DATE: dates,
+            schema.DataSchema.ID: profile_ids[codes],
+            schema.DataSchema.VALUE: values
+        },
+        index=stored_dataf.index)
+
+  def _append_wide_data(self, wide_batches: list[pd.DataFrame]) -> None:
+    """Merge wide dataframes (index=datetime, columns=profile ids) into the wide store.
+
+    Only the batch timestamps are sorted: the new ones are inserted at their binary-searched \
+      positions in the shared index, and every profile array is realigned onto it. Where a new \
+      reading lands on an existing timestamp the latest value wins.
+
+    Args:
+        wide_batches (list[pd.DataFrame]): Pandas dataframes with one column per profile id, oldest first.
+    """
+    batch_indexes = [pd.DatetimeIndex(batch.index) for batch in wide_batches]
+    batch_timestamps = np.unique(
+        np.concatenate([index.values for index in batch_indexes]))
+    index_values = self._wide_index.values
+    positions = index_values.searchsorted(batch_timestamps)
+    is_known = np.zeros(len(batch_timestamps), dtype=bool)
+    is_inside = positions < len(index_values)
+    is_known[is_inside] = index_values[
+        positions[is_inside]] == batch_timestamps[is_inside]
+    if not is_known.all():
+      new_positions = positions[~is_known]
+      merged_values = np.insert(index_values, new_positions,
+                                batch_timestamps[~is_known])
+      self._wide_index = pd.DatetimeIndex(merged_values,
+                                          name=schema.DataSchema.DATE)
+      for profile_id, values in self._wide_values.items():
+        self._wide_values[profile_id] = np.insert(values, new_positions,
+                                                  np.nan)
+
+    for batch, batch_index in zip(wide_batches, batch_indexes):
+      batch_positions = self._wide_index.searchsorted(batch_index)
+      for profile_id in batch.columns:
+        new_values = batch[profile_id].to_numpy(dtype=float)
+        has_value = ~np.isnan(new_values)
+        values = self._wide_values.get(profile_id)
+        if values is None:
+          values = np.full(len(self._wide_index),
+                           np.nan,
+                           dtype=self.value_dtype)
+          self._wide_values[profile_id] = values
+        values[batch_positions[has_value]] = new_values[has_value]
+
+  def _filter_wide_data(self, start_time: Optional[datetime],
+                        end_time: Optional[datetime],
+                        profile_ids: list[int]) -> pd.DataFrame:
+    """Slice the wide store by time and profile ids without any pivoting.
+
+    Args:
+        start_time (Optional[datetime]): Start time for the filter.
+        end_time (Optional[datetime]): End time for the filter.
+        profile_ids (list[int]): List of profile ids to return as columns.
+
+    Returns:
+        pd.DataFrame: A pandas dataframe with index=datetime and columns=profile ids.
+    """
+    start_pos, end_pos = 0, len(self._wide_index)
+    if start_time is not None:
+      start_pos = self._wide_index.searchsorted(start_time, side='left')
+    if end_time is not None:
+      end_pos = self._wide_index.searchsorted(end_time, side='right')
+    selected_ids = [
+        profile_id for profile_id in dict.fromkeys(profile_ids)
+        if profile_id in self._wide_values
+    ]
+    wide_dataf = pd.DataFrame(
+        {
+            profile_id: self._wide_values[profile_id][start_pos:end_pos]
+            for profile_id in selected_ids
+        },
+        index=self._wide_index[start_pos:end_pos],
+        columns=selected_ids,
+        dtype=float)
+    wide_dataf.columns.name = schema.DataSchema.ID
+    return wide_dataf.dropna(how='all')
 
   def filter_data(self,
                   start_time: Optional[datetime] = None,
                   end_time: Optional[datetime] = None,
-                  profile_ids: Optional[list[int]] = None) -> pd.DataFrame:
+                  profile_ids: Optional[list[int]] = None,
+                  wide: bool = False) -> pd.DataFrame:
     """Filter the data based on the start and end time and the profile ids.
 
     Args:
         start_time (Optional[datetime]): Start time for the filter.  
         end_time (Optional[datetime]): End time for the filter.  
         profile_ids (Optional[list[int]]): List of profile ids to filter the data.  
+        wide (bool): Return the data with index=datetime and columns=profile ids \
+          instead of the tidy (Datetime, ID, Value) format.
 
     Returns:
         pd.DataFrame: A pandas dataframe with the filtered data.
     """
-    if start_time is None:
-      start_time = self._data[schema.DataSchema.DATE].min()
-    if end_time is None:
-      end_time = self._data[schema.DataSchema.DATE].max()
-    if profile_ids is None:
-      profile_ids = self.all_profile_ids
-    filt = (self._data[schema.DataSchema.ID].isin(profile_ids)
-            & self._data[schema.DataSchema.DATE].between(
-                start_time, end_time, inclusive="both"))
-
-    return self._data.loc[filt].copy()
+    with self._measure('filter_data') as stage:
+      self._consolidate()
+      if profile_ids is None:
+        profile_ids = self.all_profile_ids
+      if self._archive is None:
+        dataf = self._filter_data(start_time, end_time, profile_ids, wide)
+      else:
+        # Readings held in memory take precedence over the saved ones.
+        dataf = self._filter_data(start_time, end_time, profile_ids, True)
+        archived = self._read_archive(start_time, end_time, profile_ids)
+        if dataf.empty:
+          dataf = archived
+        elif not archived.empty:
+          dataf = dataf.combine_first(archived)
+          dataf.columns.name = schema.DataSchema.ID
+        if not wide:
+          dataf = stack_wide_data(dataf)
+      stage.rows = len(dataf)
+    return dataf
+
+  def _filter_data(self, start_time: Optional[datetime],
+                   end_time: Optional[datetime], profile_ids: list[int],
+                   wide: bool) -> pd.DataFrame:
+    if self.storage_mode is enums.StorageMode.WIDE:
+      wide_dataf = self._filter_wide_data(start_time, end_time, profile_ids)
+      if wide:
+        return wide_dataf
+      return stack_wide_data(wide_dataf)
+
+    dates = self._data[schema.DataSchema.DATE].to_numpy()
+    start_key = None if start_time is None else self._get_date_key(start_time,
+                                                                   side='left')
+    end_key = None if end_time is None else self._get_date_key(end_time,
+                                                               side='right')
+    row_ranges = []
+    for profile_id in dict.fromkeys(profile_ids):
+      if profile_id not in self._id_offsets:
+        continue
+      start_pos, end_pos = self._id_offsets[profile_id]
+      id_dates = dates[start_pos:end_pos]
+      if start_key is not None:
+        start_pos += id_dates.searchsorted(start_key, side='left')
+      if end_key is not None:
+        end_pos -= len(id_dates) - id_dates.searchsorted(end_key, side='right')
+      row_ranges.append(np.arange(start_pos, end_pos))
+    row_positions = np.concatenate(row_ranges) if row_ranges else np.array(
+        [], dtype=np.int64)
+    # Taking the rows column by column, as iloc would cache an array of the whole RangeIndex.
+    filtered = self._decode_long_data(
+        pd.DataFrame(
+            {
+                column: self._data[column].to_numpy()[row_positions]
+                for column in self._data.columns
+            },
+            index=row_positions))
+
+    if wide:
+      with self._measure('pivot') as stage:
+        filtered = filtered.pivot_table(index=schema.DataSchema.DATE,
+                                        columns=schema.DataSchema.ID,
+                                        values=schema.DataSchema.VALUE)
+        stage.rows = len(filtered)
+    return filtered
+
+  def _get_date_key(self, timestamp: datetime, side: str) -> np.generic:
+    """Get the value a timestamp is compared with in the Datetime column of the LONG layout.
+
+    Args:
+        timestamp (datetime): The timestamp.
+        side (str): 'left' for a start time, rounding a compact offset up, 'right' for an end \
+          time, rounding it down.
+
+    Returns:
+        np.generic: The datetime64, or the half-hour offset when compact.
+    """
+    timestamp = pd.Timestamp(timestamp)
+    if not self.compact:
+      return timestamp.to_datetime64()
+    nanoseconds = timestamp.value - COMPACT_EPOCH.value
+    if side == 'left':
+      return np.int64(-(-nanoseconds // HALF_HOUR_NS))
+    return np.int64(nanoseconds // HALF_HOUR_NS)
+
+  def save(self, path: str | Path) -> Path:
+    """Save the data as Parquet, partitioned by site and month.
+
+    The readings are written in the wide layout, one file per calendar month with a \
+      Datetime column and one float column per profile id, under <path>/site=<name>/, \
+      replacing a previous save of the same site. The profile ids, names and time bounds \
+      are written to a catalogue file next to the partitions.
+
+    Args:
+        path (str | Path): The root folder of the dataset, shared by every site.
+
+    Returns:
+        Path: The folder of the site.
+    """
+    with self._measure('save') as stage:
+      wide_dataf = self.filter_data(wide=True)
+      stage.rows = len(wide_dataf)
+      site_folder = get_site_folder(path, self.name)
+      temporary_folder = site_folder.with_name(site_folder.name + '.tmp')
+      shutil.rmtree(temporary_folder, ignore_errors=True)
+      table = pa.table({
+          schema.DataSchema.DATE: wide_dataf.index.values,
+          'month': get_month_keys(wide_dataf.index),
+          **{
+              str(profile_id): wide_dataf[profile_id].to_numpy(dtype=float)
+              for profile_id in wide_dataf.columns
+          }
+      })
+      ds.write_dataset(table,
+                       temporary_folder,
+                       format='parquet',
+                       partitioning=MONTH_PARTITIONING,
+                       basename_template='part-{i}.parquet')
+      # write_dataset creates no folder for an empty table.
+      temporary_folder.mkdir(parents=True, exist_ok=True)
+      start_time, end_time = self.time_bounds
+      catalogue = {
+          'name': self.name,
+          'profile_ids':
+          [int(profile_id) for profile_id in wide_dataf.columns],
+          'profile_lookup': self._profile_lookup,
+          'start_time': None if start_time is None else start_time.isoformat(),
+          'end_time': None if end_time is None else end_time.isoformat(),
+      }
+      (temporary_folder / CATALOGUE_FILE).write_text(json.dumps(catalogue))
+      shutil.rmtree(site_folder, ignore_errors=True)
+      temporary_folder.rename(site_folder)
+    if self._archive_folder == site_folder:
+      # The files read by the opened dataset were replaced.
+      self._attach_archive(site_folder)
+    return site_folder
+
+  @classmethod
+  def open(cls,
+           path: str | Path,
+           name: str,
+           storage_mode: enums.StorageMode = enums.StorageMode.WIDE,
+           **kwargs) -> 'DataManager':
+    """Open a site saved with save, without reading its readings.
+
+    Only the catalogue and the list of partitions are read, filter_data then reads the month \
+      partitions overlapping its time range and the columns of its profile ids. New data can \
+      be loaded on top of the saved readings, taking precedence over them.
+
+    Args:
+        path (str | Path): The root folder of the dataset.
+        name (str): The name of the site, i.e. of the saved data manager.
+        storage_mode (enums.StorageMode): The layout of the data loaded after opening.
+        **kwargs: The other DataManager attributes.
+
+    Returns:
+        DataManager: A data manager reading from the saved site.
+    """
+    data_manager = cls(name, storage_mode, **kwargs)
+    data_manager._attach_archive(get_site_folder(path, name))
+    return data_manager
+
+  def _attach_archive(self, site_folder: Path) -> None:
+    """Read the catalogue of a saved site and discover its partitions.
+
+    Args:
+        site_folder (Path): The folder of the site.
+    """
+    catalogue = json.loads((site_folder / CATALOGUE_FILE).read_text())
+    self._data_version += 1
+    self._archive = ds.dataset(site_folder,
+                               format='parquet',
+                               partitioning=MONTH_PARTITIONING)
+    if schema.DataSchema.DATE not in self._archive.schema.names:
+      # An empty site is saved without any partition to read.
+      self._archive = None
+    self._archive_folder = site_folder
+    self._archive_ids = dict.fromkeys(catalogue['profile_ids'])
+    self._profile_lookup = catalogue['profile_lookup'] | self._profile_lookup
+    self._archive_bounds = tuple(None if bound is None else pd.Timestamp(bound)
+                                 for bound in (catalogue['start_time'],
+                                               catalogue['end_time']))
+
+  def save_snapshot(self, path: str | Path) -> Path:
+    """Save the readings held in memory as a binary snapshot, for open_snapshot to memory-map.
+
+    The snapshot folder holds three contiguous little-endian arrays, timestamps.bin, ids.bin \
+      and values.bin, in the dtypes stored in memory, with a JSON catalogue of their dtypes and \
+      shapes. In the LONG layout they are the stored (Datetime, ID, Value) columns, i.e. int64 \
+      nanoseconds and int64 ids, or int32 half-hour offsets and int16/int32 codes when compact. \
+      In the WIDE layout they are the shared index in int64 nanoseconds, the int64 profile ids \
+      and one row of values per profile id. The values are in value_dtype. The readings of an \
+      opened Parquet site are not part of the snapshot.
+
+    Args:
+        path (str | Path): The folder of the snapshot, replaced if it exists.
+
+    Returns:
+        Path: The folder of the snapshot.
+    """
+    with self._measure('save_snapshot') as stage:
+      self._consolidate()
+      if self.storage_mode is enums.StorageMode.WIDE:
+        timestamps = self._wide_index.values
+        ids = np.array(list(self._wide_values), dtype=np.int64)
+        values = np.empty((len(ids), len(timestamps)), dtype=self.value_dtype)
+        for row, profile_id in enumerate(self._wide_values):
+          values[row] = self._wide_values[profile_id]
+        start_time, end_time = None, None
+        if len(timestamps):
+          start_time, end_time = timestamps[0], timestamps[-1]
+      else:
+        timestamps = self._data[schema.DataSchema.DATE].to_numpy()
+        ids = self._data[schema.DataSchema.ID].to_numpy()
+        values = self._data[schema.DataSchema.VALUE].to_numpy()
+        start_time, end_time = self._time_bounds
+      if timestamps.dtype.kind == 'M':
+        timestamps = timestamps.view(np.int64)
+      arrays = {'timestamps': timestamps, 'ids': ids, 'values': values}
+      dtypes = {
+          array_name: array.dtype.newbyteorder('<')
+          for array_name, array in arrays.items()
+      }
+      stage.rows = arrays['values'].size
+
+      folder = Path(path)
+      temporary_folder = folder.with_name(folder.name + '.tmp')
+      shutil.rmtree(temporary_folder, ignore_errors=True)
+      temporary_folder.mkdir(parents=True)
+      for array_name, array in arrays.items():
+        np.ascontiguousarray(array, dtype=dtypes[array_name]).tofile(
+            temporary_folder / f'{array_name}.bin')
+      shapes = {
+          array_name: list(array.shape)
+          for array_name, array in arrays.items()
+      }
+      id_offsets = [[profile_id, start, end]
+                    for profile_id, (start, end) in self._id_offsets.items()]
+      start_time, end_time = (None if bound is None else
+                              pd.Timestamp(bound).isoformat()
+                              for bound in (start_time, end_time))
+      catalogue = {
+          'format_version': SNAPSHOT_FORMAT_VERSION,
+          'name': self.name,
+          'storage_mode': self.storage_mode.value,
+          'compact': self.compact,
+          'value_dtype': np.dtype(self.value_dtype).name,
+          'dtypes':
+          {array_name: dtype.str
+           for array_name, dtype in dtypes.items()},
+          'shapes': shapes,
+          'profile_codes': list(self._profile_codes),
+          'id_offsets': id_offsets,
+          'profile_lookup': self._profile_lookup,
+          'start_time': start_time,
+          'end_time': end_time,
+      }
+      (temporary_folder / SNAPSHOT_CATALOGUE_FILE).write_text(
+          json.dumps(catalogue))
+      shutil.rmtree(folder, ignore_errors=True)
+      temporary_folder.rename(folder)
+    return folder
+
+  @classmethod
+  def open_snapshot(cls, path: str | Path, **kwargs) -> 'DataManager':
+    """Memory-map a snapshot saved with save_snapshot.
+
+    The arrays are mapped copy-on-write rather than read, so opening takes about as long as \
+      reading the catalogue, pages are only loaded when read and every process mapping the same \
+      snapshot shares them through the page cache. New data can be loaded as usual, only the \
+      pages it modifies being copied into the process. compact and value_dtype default to \
+      those of the saved data manager: opening with others converts the arrays into the memory \
+      of the process, which then no longer shares them.
+
+    Args:
+        path (str | Path): The folder of the snapshot.
+        **kwargs: The DataManager attributes other than name and storage_mode, which are \
+          those of the saved data manager.
+
+    Returns:
+        DataManager: A data manager holding the readings of the snapshot.
+    """
+    folder = Path(path)
+    catalogue = json.loads((folder / SNAPSHOT_CATALOGUE_FILE).read_text())
+    if catalogue['format_version'] != SNAPSHOT_FORMAT_VERSION:
+      raise ValueError(
+          f"Unsupported snapshot format version {catalogue['format_version']}, "
+          f'expected {SNAPSHOT_FORMAT_VERSION}.')
+    kwargs = {
+        'compact': catalogue['compact'],
+        'value_dtype': np.dtype(catalogue['value_dtype']).type,
+        **kwargs
+    }
+    data_manager = cls(catalogue['name'],
+                       enums.StorageMode(catalogue['storage_mode']), **kwargs)
+    with data_manager._measure('open_snapshot') as stage:
+      data_manager._attach_snapshot(folder, catalogue)
+      stage.rows = int(np.prod(catalogue['shapes']['values']))
+    return data_manager
+
+  def _attach_snapshot(self, folder: Path, catalogue: dict) -> None:
+    """Replace the readings held in memory by the memory-mapped arrays of a snapshot.
+
+    Args:
+        folder (Path): The folder of the snapshot.
+        catalogue (dict): Its catalogue.
+    """
+    arrays = {}
+    for array_name in SNAPSHOT_ARRAYS:
+      dtype = np.dtype(catalogue['dtypes'][array_name])
+      shape = tuple(catalogue['shapes'][array_name])
+      if np.prod(shape) == 0:
+        # An empty file cannot be memory-mapped.
+        arrays[array_name] = np.empty(shape, dtype=dtype)
+      else:
+        arrays[array_name] = np.memmap(folder / f'{array_name}.bin',
+                                       dtype=dtype,
+                                       mode='c',
+                                       shape=shape)
+    self.create_empty_database()
+    # Only values in another precision are copied, as astype does not copy to the same dtype.
+    values = arrays['values'].astype(self.value_dtype, copy=False)
+    if self.storage_mode is enums.StorageMode.WIDE:
+      self._wide_index = pd.DatetimeIndex(
+          arrays['timestamps'].view('datetime64[ns]'),
+          name=schema.DataSchema.DATE)
+      self._wide_values = {
+          int(profile_id): values[row]
+          for row, profile_id in enumerate(arrays['ids'])
+      }
+    elif catalogue['compact'] == self.compact:
+      timestamps = arrays['timestamps']
+      if not self.compact:
+        timestamps = timestamps.view('datetime64[ns]')
+      self._data = pd.DataFrame(
+          {
+              schema.DataSchema.DATE: timestamps,
+              schema.DataSchema.ID: arrays['ids'],
+              schema.DataSchema.VALUE: values
+          },
+          copy=False)
+      self._profile_codes = {
+          profile_id: code
+          for code, profile_id in enumerate(catalogue['profile_codes'])
+      }
+      self._id_offsets = {
+          profile_id: (start, end)
+          for profile_id, start, end in catalogue['id_offsets']
+      }
+    else:
+      timestamps = arrays['timestamps'].astype(np.int64)
+      ids = arrays['ids']
+      if catalogue['compact']:
+        timestamps = COMPACT_EPOCH.value + timestamps * HALF_HOUR_NS
+        ids = np.array(catalogue['profile_codes'], dtype=np.int64)[ids]
+      self._data = self._encode_long_data(
+          pd.DataFrame({
+              schema.DataSchema.DATE:
+              timestamps.view('datetime64[ns]'),
+              schema.DataSchema.ID:
+              ids,
+              schema.DataSchema.VALUE:
+              values
+          }))
+      # The codes of a compact snapshot follow the order the ids were loaded in, not the ids.
+      self._data.sort_values([schema.DataSchema.ID, schema.DataSchema.DATE],
+                             inplace=True,
+                             kind='stable',
+                             ignore_index=True)
+      self._build_id_offsets()
+    if self.storage_mode is enums.StorageMode.LONG:
+      self._time_bounds = tuple(None if bound is None else pd.Timestamp(bound)
+                                for bound in (catalogue['start_time'],
+                                              catalogue['end_time']))
+    self._profile_lookup = dict(catalogue['profile_lookup'])
+
+  def _read_archive(self, start_time: Optional[datetime],
+                    end_time: Optional[datetime],
+                    profile_ids: list[int]) -> pd.DataFrame:
+    """Read the saved readings of a time range and of profile ids.
+
+    The month partitions outside the time range are skipped before any file is opened and \
+      only the columns of the profile ids are read from the others.
+
+    Args:
+        start_time (Optional[datetime]): Start time for the filter.
+        end_time (Optional[datetime]): End time for the filter.
+        profile_ids (list[int]): List of profile ids to return as columns.
+
+    Returns:
+        pd.DataFrame: A pandas dataframe with index=datetime and columns=profile ids.
+    """
+    with self._measure('read_archive') as stage:
+      selected_ids = [
+          profile_id for profile_id in dict.fromkeys(profile_ids)
+          if profile_id in self._archive_ids
+      ]
+      expression = ds.scalar(True)
+      if start_time is not None:
+        start_time = pd.Timestamp(start_time)
+        expression &= ds.field('month') >= get_month_keys(
+            pd.DatetimeIndex([start_time]))[0]
+        expression &= ds.field(schema.DataSchema.DATE) >= pa.scalar(
+            start_time.to_datetime64(), pa.timestamp('ns'))
+      if end_time is not None:
+        end_time = pd.Timestamp(end_time)
+        expression &= ds.field('month') <= get_month_keys(
+            pd.DatetimeIndex([end_time]))[0]
+        expression &= ds.field(schema.DataSchema.DATE) <= pa.scalar(
+            end_time.to_datetime64(), pa.timestamp('ns'))
+      table = self._archive.to_table(
+          columns=[schema.DataSchema.DATE] +
+          [str(profile_id) for profile_id in selected_ids],
+          filter=expression)
+      wide_dataf = table.to_pandas().set_index(schema.DataSchema.DATE)
+      wide_dataf.columns = pd.Index(selected_ids,
+                                    dtype=np.int64,
+                                    name=schema.DataSchema.ID)
+      if not wide_dataf.index.is_monotonic_increasing:
+        wide_dataf.sort_index(inplace=True)
+      wide_dataf = wide_dataf.dropna(how='all')
+      stage.rows = len(wide_dataf)
+    return wide_dataf
@@ -0,0 +1,92 @@
+import hashlib
+import io
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+# Points drawn per series, enough for the width of a 15 inch figure.
+MAX_PLOT_POINTS = 2_000
+# Series longer than this are drawn without markers.
+MARKER_MAX_POINTS = 100
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+  """Select the points of a series kept by the Largest-Triangle-Three-Buckets algorithm.
+
+  The first and last points are kept and one point per bucket in between, the one forming \
+    the largest triangle with the previously kept point and the mean of the next bucket, which \
+    keeps the peaks and troughs of the series.
+
+  Args:
+      x (np.ndarray): The increasing x values, as floats.
+      y (np.ndarray): The y values, without NaN.
+      n_out (int): The number of points to keep.
+
+  Returns:
+      np.ndarray: The sorted positions of the kept points.
+  """
+  n_points = len(x)
+  if n_out >= n_points or n_out < 3:
+    return np.arange(n_points)
+  edges = np.linspace(1, n_points - 1, n_out - 1).astype(np.int64)
+  selected = np.empty(n_out, dtype=np.int64)
+  selected[0], selected[-1] = 0, n_points - 1
+  previous = 0
+  for bucket in range(n_out - 2):
+    start, end = edges[bucket], edges[bucket + 1]
+    next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n_points
+    next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+    areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) -
+                   (x[previous] - x[start:end]) * (next_y - y[previous]))
+    previous = start + int(np.argmax(areas))
+    selected[bucket + 1] = previous
+  return selected
+
+
+def downsample_series(series: pd.Series,
+                      n_out: int = MAX_PLOT_POINTS) -> pd.Series:
+  """Downsample a datetime indexed series with LTTB, dropping the NaN first.
+
+  Args:
+      series (pd.Series): The series to plot.
+      n_out (int): The maximum number of points to keep.
+
+  Returns:
+      pd.Series: The kept points of the series.
+  """
+  series = series.dropna()
+  x = series.index.values.view(np.int64).astype(np.float64)
+  return series.iloc[lttb_indices(x, series.to_numpy(dtype=np.float64), n_out)]
+
+
+def fingerprint_dataf(dataf: pd.DataFrame) -> str:
+  """Hash every value, label and column name of a dataframe.
+
+  Args:
+      dataf (pd.DataFrame): The dataframe.
+
+  Returns:
+      str: The sha256 hex digest of the dataframe.
+  """
+  fingerprint = hashlib.sha256(
+      pd.util.hash_pandas_object(dataf, index=True).to_numpy().tobytes())
+  fingerprint.update(repr(list(dataf.columns)).encode())
+  return fingerprint.hexdigest()
+
+
+def figure_to_png(fig: plt.Figure) -> bytes:
+  """Render a figure to png and close it, releasing its memory.
+
+  Args:
+      fig (plt.Figure): The figure.
+
+  Returns:
+      bytes: The png image.
+  """
+  buffer = io.BytesIO()
+  try:
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+  finally:
+    plt.close(fig)
+  return buffer.getvalue()
@@ -2,17 +2,24 @@ import sys
 
 sys.path.insert(0, '..//')
 
+import hashlib
 from typing import Any
 
 import matplotlib.pyplot as plt
 import pandas as pd
+import streamlit as st
 
 from src.common import enums
 from src.data import metering, schema, source
+from src.frontend import charts
 from src.frontend.utils import (CUSTOMER_SITE, OutputSchema, PlotSchema,
                                 ReportSchema, compile_sl_data, prepare_dataf)
 from src.models import report, technology
 
+# Number of uploads and of (upload, capacity) results kept in the streamlit cache,
+# the least recently used entry being evicted first.
+CACHE_MAX_ENTRIES = 16
+
 
 def generate_annual_qi_data(report_obj: report.CHPQA_report) -> pd.DataFrame:
   """ Calculates the qualifying values for the CHP system on an annual basis.
@@ -35,7 +42,33 @@ def generate_qi_and_eff_data(report_obj: report.CHPQA_report) -> pd.DataFrame:
   Returns:
       pd.DataFrame: A pandas dataframe with the monthly qualifying values."""
   report_obj.resolution = enums.Resolution.MONTHLY
-  report_dataf = report_obj.calculate_qualifying_outputs()
+  return format_qi_and_eff_data(report_obj.calculate_qualifying_outputs())
+
+
+def generate_annual_and_monthly_data(
+    report_obj: report.CHPQA_report) -> tuple[pd.DataFrame, pd.DataFrame]:
+  """ Calculates the annual qualifying values and the monthly values for plotting
+    in a single pass, the annual sums are rolled up from the monthly ones.
+
+  Args:
+      report_obj (report.CHPQA_report): A CHPQA report object.
+
+  Returns:
+      tuple[pd.DataFrame, pd.DataFrame]: The annual qualifying values and the monthly values for plotting."""
+  results = report_obj.calculate_qualifying_outputs_by_resolution(
+      [enums.Resolution.MONTHLY, enums.Resolution.YEARLY])
+  return results[enums.Resolution.YEARLY], format_qi_and_eff_data(
+      results[enums.Resolution.MONTHLY])
+
+
+def format_qi_and_eff_data(report_dataf: pd.DataFrame) -> pd.DataFrame:
+  """ Selects and renames the qualifying values used for plotting.
+
+  Args:
+      report_dataf (pd.DataFrame): A calculate_qualifying_outputs pandas dataframe.
+
+  Returns:
+      pd.DataFrame: A pandas dataframe with the qualifying values for plotting."""
   output = pd.DataFrame(index=report_dataf.index)
   output[OutputSchema.n_power] = report_dataf[ReportSchema.n_power] * 100
   output[OutputSchema.n_heat] = report_dataf[ReportSchema.n_heat] * 100
@@ -45,6 +78,18 @@ def generate_qi_and_eff_data(report_obj: report.CHPQA_report) -> pd.DataFrame:
   return output
 
 
+def plot_series(ax: plt.Axes, series: pd.Series) -> None:
+  """ Plots a series, downsampled with LTTB when it is too long to be drawn point by point,
+    with markers only for short series such as monthly values.
+
+  Args:
+      ax (plt.Axes): The axes to plot on.
+      series (pd.Series): A datetime indexed series."""
+  series = charts.downsample_series(series)
+  ax.plot(series,
+          marker='o' if len(series) <= charts.MARKER_MAX_POINTS else None)
+
+
 def generate_qi_plot(result_dataf: pd.DataFrame) -> plt.Figure:
   """ Plots the monthly Quality Index for the CHP system.
   
@@ -54,7 +99,7 @@ def generate_qi_plot(result_dataf: pd.DataFrame) -> plt.Figure:
   Returns:
       matplotlib.figure.Figure: A matplotlib figure object."""
   fig, ax = plt.subplots(figsize=(15, 7))
-  ax.plot(result_dataf[OutputSchema.qi], marker='o')
+  plot_series(ax, result_dataf[OutputSchema.qi])
   ax.axhline(y=100, color='r', linestyle='--')
   ax.set_title(PlotSchema.qi_title)
   ax.set_ylabel(PlotSchema.qi_y_label)
@@ -73,7 +118,7 @@ def generate_h_eff_plot(result_dataf: pd.DataFrame) -> plt.Figure:
   Returns:
       matplotlib.figure.Figure: A matplotlib figure object."""
   fig, ax = plt.subplots(figsize=(15, 7))
-  ax.plot(result_dataf[OutputSchema.n_heat], marker='o')
+  plot_series(ax, result_dataf[OutputSchema.n_heat])
   ax.axhline(y=20, color='r', linestyle='--')
   ax.set_title(PlotSchema.h_eff_title)
   ax.set_ylabel(PlotSchema.h_eff_y_label)
@@ -92,7 +137,7 @@ def generate_p_eff_plot(result_dataf: pd.DataFrame) -> plt.Figure:
   Returns:
       matplotlib.figure.Figure: A matplotlib figure object."""
   fig, ax = plt.subplots(figsize=(15, 7))
-  ax.plot(result_dataf[OutputSchema.n_power], marker='o')
+  plot_series(ax, result_dataf[OutputSchema.n_power])
   ax.axhline(y=20, color='r', linestyle='--')
   ax.set_title(PlotSchema.p_eff_title)
   ax.set_ylabel(PlotSchema.p_eff_y_label)
@@ -102,6 +147,37 @@ def generate_p_eff_plot(result_dataf: pd.DataFrame) -> plt.Figure:
   return fig
 
 
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def render_cached_plots(data_fingerprint: str,
+                        _result_dataf: pd.DataFrame) -> list[bytes]:
+  """ Renders the Quality Index and efficiency plots to png once per data fingerprint,
+    closing every figure once rendered.
+
+  Args:
+      data_fingerprint (str): The fingerprint of the data, see charts.fingerprint_dataf.
+      _result_dataf (pd.DataFrame): A pandas dataframe with the qualifying values for plotting.
+
+  Returns:
+      list[bytes]: The png images of the Quality Index, heat and power efficiency plots."""
+  return [
+      charts.figure_to_png(generate_plot(_result_dataf)) for generate_plot in
+      [generate_qi_plot, generate_h_eff_plot, generate_p_eff_plot]
+  ]
+
+
+def render_plots(result_dataf: pd.DataFrame) -> list[bytes]:
+  """ Renders the Quality Index and efficiency plots to png, served from the cache
+    when the same data was already rendered.
+
+  Args:
+      result_dataf (pd.DataFrame): A pandas dataframe with the qualifying values for plotting.
+
+  Returns:
+      list[bytes]: The png images of the Quality Index, heat and power efficiency plots."""
+  return render_cached_plots(charts.fingerprint_dataf(result_dataf),
+                             result_dataf)
+
+
 def prep_bms_data(bms_uploadfile: Any) -> pd.DataFrame:
   """ Streamlit allows for data upload. Here we take the data and 
     prepare it for use in the simplified report.
@@ -190,19 +266,92 @@ def generate_chpqa_report(bms_uploadfile: Any,
   Returns:
       report.CHPQA_report: A CHPQA report object.
     """
-  bms_data = prep_bms_data(bms_uploadfile)
-  data_source = source.DataManager("Site data manager")
+  return create_chpqa_report(prep_bms_data(bms_uploadfile), max_capacity)
+
+
+def create_chpqa_report(bms_data: pd.DataFrame,
+                        max_capacity: float) -> report.CHPQA_report:
+  """ Creates the simplified CHPQA report object of already prepared data.
+
+  Args:
+      bms_data (pd.DataFrame): The prepared data, see prep_bms_data.
+      max_capacity (float): The maximum capacity of the CHP system.
+
+  Returns:
+      report.CHPQA_report: A CHPQA report object."""
+  data_source = source.DataManager("Site data manager", enums.StorageMode.WIDE)
   capacity_dict = create_capacity_dict(max_capacity)
   meter_id_dict = data_source.load_new_data(bms_data)
   list_units = create_system(capacity_dict, meter_id_dict)
-  report_obj = report.CHPQA_report("Test Site",
-                                   enums.SystemType.COMPLEX,
-                                   data_source,
-                                   list_units,
-                                   web_app=True)
+  report_obj = report.CHPQA_report("Test Site", enums.SystemType.COMPLEX,
+                                   data_source, list_units)
   return report_obj
 
 
+def hash_uploads(bms_uploadfile: list[Any]) -> str:
+  """ Hashes the names and contents of the uploaded files.
+
+  Args:
+      bms_uploadfile (list[Any]): The uploaded files.
+
+  Returns:
+      str: The sha256 hex digest of the uploads."""
+  upload_hash = hashlib.sha256()
+  for uploaded_file in bms_uploadfile:
+    upload_hash.update(uploaded_file.name.encode())
+    upload_hash.update(uploaded_file.getvalue())
+  return upload_hash.hexdigest()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_cached_bms_data(upload_hash: str,
+                         _bms_uploadfile: list[Any]) -> pd.DataFrame:
+  """ Prepares the uploaded data once per upload content, the files themselves are not hashed by streamlit.
+
+  Args:
+      upload_hash (str): The hash of the uploads, see hash_uploads.
+      _bms_uploadfile (list[Any]): The uploaded files.
+
+  Returns:
+      pd.DataFrame: A pandas dataframe with the prepared data."""
+  for uploaded_file in _bms_uploadfile:
+    uploaded_file.seek(0)
+  return prep_bms_data(_bms_uploadfile)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def generate_cached_results(
+    upload_hash: str, max_capacity: float,
+    _bms_uploadfile: list[Any]) -> tuple[pd.DataFrame, pd.DataFrame]:
+  """ Calculates the annual and monthly values once per upload content and capacity.
+
+  Args:
+      upload_hash (str): The hash of the uploads, see hash_uploads.
+      max_capacity (float): The maximum capacity of the CHP system.
+      _bms_uploadfile (list[Any]): The uploaded files.
+
+  Returns:
+      tuple[pd.DataFrame, pd.DataFrame]: The annual qualifying values and the monthly values for plotting."""
+  bms_data = load_cached_bms_data(upload_hash, _bms_uploadfile)
+  return generate_annual_and_monthly_data(
+      create_chpqa_report(bms_data, max_capacity))
+
+
+def generate_results(bms_uploadfile: list[Any],
+                     max_capacity: float) -> tuple[pd.DataFrame, pd.DataFrame]:
+  """ Calculates the annual and monthly values of the uploads, served from the cache
+    when the same files and capacity were already processed.
+
+  Args:
+      bms_uploadfile (list[Any]): The uploaded files.
+      max_capacity (float): The maximum capacity of the CHP system.
+
+  Returns:
+      tuple[pd.DataFrame, pd.DataFrame]: The annual qualifying values and the monthly values for plotting."""
+  return generate_cached_results(hash_uploads(bms_uploadfile), max_capacity,
+                                 bms_uploadfile)
+
+
 def calculate_qi_fuel(annual_data: pd.DataFrame) -> float:
   """ Calculates the annual fuel quality index.
 
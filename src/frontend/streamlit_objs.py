@@ -10,7 +10,6 @@ from streamlit.delta_generator import DeltaGenerator
 from utils import TextSchema, verify_login
 
 from src.frontend import streamlit_content as sc
-from src.models import report
 
 
 def description_box() -> DeltaGenerator:
@@ -67,9 +66,8 @@ def plot_box(monthly_data: pd.DataFrame) -> DeltaGenerator:
 
   plot_container = st.container(border=True)
   plot_container.subheader(TextSchema.plot_subheader)
-  plot_container.pyplot(fig=sc.generate_qi_plot(monthly_data))
-  plot_container.pyplot(fig=sc.generate_h_eff_plot(monthly_data))
-  plot_container.pyplot(fig=sc.generate_p_eff_plot(monthly_data))
+  for plot_png in sc.render_plots(monthly_data):
+    plot_container.image(plot_png, use_column_width=True)
   return plot_container
 
 
@@ -98,7 +96,7 @@ def logged_in_content():
   """
 
   description_box()
-  report_obj: Optional[report.CHPQA_report] = None
+  results: Optional[tuple[pd.DataFrame, pd.DataFrame]] = None
   with st.sidebar:
     st.subheader(TextSchema.user_docs)
     bms_uploadfile = st.file_uploader(TextSchema.upload_docs,
@@ -111,10 +109,9 @@ def logged_in_content():
       process_btn = st.button(TextSchema.process)
       if process_btn:
         with st.spinner(TextSchema.processing):
-          report_obj = sc.generate_chpqa_report(bms_uploadfile, max_capacity)
-  if report_obj is not None:
-    annual_data = sc.generate_annual_qi_data(report_obj)
+          results = sc.generate_results(bms_uploadfile, max_capacity)
+  if results is not None:
+    annual_data, monthly_data = results
     qi_score = annual_data['QI'][0]
-    monthly_data = sc.generate_qi_and_eff_data(report_obj)
     qi_score_box(qi_score, max_capacity, monthly_data, annual_data)
     plot_box(monthly_data)
@@ -1,13 +1,22 @@
+import hashlib
 import os
-from typing import Any
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
 
+import jwt
 import pandas as pd
 import requests
 import streamlit as st
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 load_dotenv()
 CUSTOMER_SITE = "Your Site"
+BACKEND_URL = os.getenv('BACKEND_URL', 'http://127.0.0.1:8000')
+# Seconds before its expiry at which an access token is no longer reused.
+TOKEN_EXPIRY_MARGIN = 30
 
 SM3_TO_MWH = (39.3 / 3.6) / 1000
 
@@ -103,6 +112,159 @@ def prepare_dataf(dataf: pd.DataFrame) -> pd.DataFrame:
   return dataf
 
 
+@dataclass
+class BackendClient:
+  """ HTTP client of the FastAPI backend, kept once per streamlit session by get_backend_client.
+    Connections are kept alive in a pooled requests.Session and the access token is reused until \
+    shortly before it expires.
+
+  Attributes:
+    base_url (str): The url of the backend.
+    pool_size (int): Number of keep-alive connections kept to the backend.
+    timeout (float): Seconds before a request is abandoned.
+    session (requests.Session): The pooled session.
+
+  Methods:
+    login: Get an access token for the credentials, reusing the current one if still valid.
+    request: Send an authenticated request to the backend.
+    verify: Check the access token with the backend.
+    submit_report: Queue a CHPQA report job on the backend.
+    get_report: Get the state of a report job.
+  """
+  base_url: str = BACKEND_URL
+  pool_size: int = 10
+  timeout: float = 30
+  session: requests.Session = field(init=False, repr=False)
+  _access_token: Optional[str] = field(init=False, default=None, repr=False)
+  _token_expiry: float = field(init=False, default=0.0, repr=False)
+  _credentials_hash: Optional[str] = field(init=False,
+                                           default=None,
+                                           repr=False)
+
+  def __post_init__(self):
+    self.session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1,
+                          pool_maxsize=self.pool_size,
+                          max_retries=Retry(total=3,
+                                            backoff_factor=0.2,
+                                            allowed_methods=['GET']))
+    self.session.mount(self.base_url, adapter)
+
+  @staticmethod
+  def _hash_credentials(email: str, password: str) -> str:
+    return hashlib.sha256(f'{email}\0{password}'.encode()).hexdigest()
+
+  def _has_valid_token(self) -> bool:
+    return self._access_token is not None and time.time(
+    ) < self._token_expiry - TOKEN_EXPIRY_MARGIN
+
+  def login(self, email: str, password: str) -> bool:
+    """ Get an access token for the credentials, reusing the current one if it was issued \
+        for the same credentials and has not expired.
+
+    Args:
+        email (str): The users email.
+        password (str): The users password.
+
+    Returns:
+        bool: True if an access token is available.
+    """
+    credentials_hash = self._hash_credentials(email, password)
+    if credentials_hash == self._credentials_hash and self._has_valid_token():
+      return True
+    self._access_token, self._credentials_hash = None, None
+    response = self.session.get(f'{self.base_url}/streamlit/login',
+                                params={
+                                    "username": email,
+                                    "password": password
+                                },
+                                timeout=self.timeout)
+    response.raise_for_status()
+    access_token = response.json()
+    try:
+      payload = jwt.decode(access_token, options={"verify_signature": False})
+    except jwt.exceptions.DecodeError:
+      # The backend answers the error message instead of a token.
+      return False
+    self._access_token = access_token
+    self._token_expiry = float(payload.get('exp', 0))
+    self._credentials_hash = credentials_hash
+    return self._has_valid_token()
+
+  def request(self, method: str, path: str, **kwargs) -> requests.Response:
+    """ Send a request to the backend with the access token, over the pooled connections.
+        The token is dropped if the backend no longer accepts it.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The path of the endpoint, e.g. /reports.
+        **kwargs: Passed to requests.Session.request.
+
+    Returns:
+        requests.Response: The response.
+    """
+    headers = kwargs.pop('headers', {})
+    if self._access_token is not None:
+      headers['Authorization'] = f'Bearer {self._access_token}'
+    kwargs.setdefault('timeout', self.timeout)
+    response = self.session.request(method,
+                                    f'{self.base_url}{path}',
+                                    headers=headers,
+                                    **kwargs)
+    if response.status_code in (401, 403):
+      self._access_token, self._credentials_hash = None, None
+    return response
+
+  def verify(self) -> bool:
+    """ Check the access token with the backend.
+
+    Returns:
+        bool: True if the backend accepts the token.
+    """
+    return self._has_valid_token() and self.request(
+        'GET', '/streamlit/verify').status_code == 200
+
+  def submit_report(self, report_request: dict[str, Any]) -> str:
+    """ Queue a CHPQA report job on the backend.
+
+    Args:
+        report_request (dict[str, Any]): The body of the POST /reports request.
+
+    Returns:
+        str: The id of the job.
+    """
+    response = self.request('POST', '/reports', json=report_request)
+    response.raise_for_status()
+    return response.json()['job_id']
+
+  def get_report(self, job_id: str, wait: float = 0) -> dict[str, Any]:
+    """ Get the state of a report job, and its results once done.
+
+    Args:
+        job_id (str): The id of the job.
+        wait (float): Seconds the backend waits for the job to finish before answering.
+
+    Returns:
+        dict[str, Any]: The job status.
+    """
+    response = self.request('GET',
+                            f'/reports/{job_id}',
+                            params={'wait': wait},
+                            timeout=self.timeout + wait)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_backend_client() -> BackendClient:
+  """ Get the backend client of the streamlit session, creating it on first use.
+
+  Returns:
+      BackendClient: The client of the session."""
+  if 'backend_client' not in st.session_state:
+    st.session_state['backend_client'] = BackendClient()
+  return st.session_state['backend_client']
+
+
 def verify_login(email: str, password: str) -> bool:
   """ Uses requests to query the FastAPI backend to verify the \
         users credentials. If the credentials are correct it \
@@ -117,18 +279,8 @@ def verify_login(email: str, password: str) -> bool:
       """
   verify = False
   try:
-    print(os.getenv('AUTH0_DOMAIN_QUOTED'))
-    token = requests.get("http://127.0.0.1:8000/streamlit/login",
-                         params={
-                             "username": email,
-                             "password": password
-                         })
-    print(token)
-    access_token = 'Bearer ' + token.text.replace('"', '')
-    access = requests.get("http://127.0.0.1:8000/streamlit/verify",
-                          headers={"Authorization": access_token})
-    if access.status_code == 200:
-      verify = True
+    client = get_backend_client()
+    verify = client.login(email, password) and client.verify()
   except Exception as e:
     st.error(e)
   return verify
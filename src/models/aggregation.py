@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.common import enums
+
+NS_PER_DAY = 86_400 * 10**9
+# Length in nanoseconds of the resolutions whose buckets have a fixed length.
+FIXED_BUCKET_NS: dict[enums.Resolution, int] = {
+    enums.Resolution.HALFHOURLY: 1_800 * 10**9,
+    enums.Resolution.HOURLY: 3_600 * 10**9,
+    enums.Resolution.DAILY: NS_PER_DAY,
+}
+# Months since 1970-01 of the last month of bucket 0, and bucket length in months,
+# for the resolutions bucketed by calendar month.
+MONTH_BUCKETS: dict[enums.Resolution, tuple[int, int]] = {
+    enums.Resolution.MONTHLY: (0, 1),
+    enums.Resolution.QUARTERLY: (2, 3),
+    enums.Resolution.YEARLY: (11, 12),
+    enums.Resolution.SCHEMEYEAR: (11, 12),
+}
+
+
+def bucket_codes(timestamps: np.ndarray,
+                 resolution: enums.Resolution) -> np.ndarray:
+  """Get the integer bucket of each timestamp, consecutive buckets having consecutive codes.
+
+  Buckets match pandas resample: fixed length buckets are labelled by their start, weeks end \
+    on Sunday and calendar buckets are labelled by their last day.
+
+  Args:
+      timestamps (np.ndarray): A datetime64[ns] array.
+      resolution (enums.Resolution): The resolution of the buckets.
+
+  Returns:
+      np.ndarray: An int64 array of bucket codes.
+  """
+  nanoseconds = timestamps.astype('datetime64[ns]').view(np.int64)
+  if resolution in FIXED_BUCKET_NS:
+    return nanoseconds // FIXED_BUCKET_NS[resolution]
+  if resolution is enums.Resolution.WEEKLY:
+    # 1970-01-01 is a Thursday, shift by 3 days so that weeks run Monday to Sunday.
+    return (nanoseconds // NS_PER_DAY + 3) // 7
+  last_month, months_per_bucket = MONTH_BUCKETS[resolution]
+  months = timestamps.astype('datetime64[M]').view(np.int64)
+  return (months - last_month - 1 + months_per_bucket) // months_per_bucket
+
+
+def bucket_labels(codes: np.ndarray,
+                  resolution: enums.Resolution) -> pd.DatetimeIndex:
+  """Get the pandas resample label of each bucket code.
+
+  Args:
+      codes (np.ndarray): An int64 array of bucket codes.
+      resolution (enums.Resolution): The resolution of the buckets.
+
+  Returns:
+      pd.DatetimeIndex: The label of each bucket.
+  """
+  if resolution in FIXED_BUCKET_NS:
+    labels = (codes * FIXED_BUCKET_NS[resolution]).astype('datetime64[ns]')
+  elif resolution is enums.Resolution.WEEKLY:
+    labels = (codes * 7 + 3).astype('datetime64[D]')
+  else:
+    last_month, months_per_bucket = MONTH_BUCKETS[resolution]
+    next_month = (codes * months_per_bucket + last_month +
+                  1).astype('datetime64[M]')
+    labels = next_month.astype('datetime64[D]') - np.timedelta64(1, 'D')
+  return pd.DatetimeIndex(labels.astype('datetime64[ns]'))
+
+
+@dataclass
+class TimeBuckets:
+  """Bucket codes of a DatetimeIndex at one resolution, computed once and reused for every sum.
+
+  Attributes:
+    index (pd.DatetimeIndex): The index the codes were computed from.
+    resolution (enums.Resolution): The resolution of the buckets.
+    order (np.ndarray): Row order that sorts the index, None if it is already sorted.
+    starts (np.ndarray): First row, in sorted order, of every non-empty bucket.
+    positions (np.ndarray): Output row of every non-empty bucket.
+    labels (pd.DatetimeIndex): Label of every bucket from the first to the last.
+
+  Methods:
+    from_index: Compute the buckets of a DatetimeIndex.
+    matches: Check whether the buckets were computed from a given index.
+    sum: Sum every column of a 2-D array per bucket.
+  """
+  index: pd.DatetimeIndex
+  resolution: enums.Resolution
+  order: np.ndarray
+  starts: np.ndarray
+  positions: np.ndarray
+  labels: pd.DatetimeIndex
+
+  @classmethod
+  def from_index(cls, index: pd.DatetimeIndex,
+                 resolution: enums.Resolution) -> 'TimeBuckets':
+    """Compute the buckets of a DatetimeIndex.
+
+    Args:
+        index (pd.DatetimeIndex): The timestamps to bucket.
+        resolution (enums.Resolution): The resolution of the buckets.
+
+    Returns:
+        TimeBuckets: The buckets of the index.
+    """
+    codes = bucket_codes(index.values, resolution)
+    order = None
+    if not index.is_monotonic_increasing:
+      order = np.argsort(codes, kind='stable')
+      codes = codes[order]
+    if len(codes) == 0:
+      empty = np.zeros(0, dtype=np.int64)
+      return cls(index, resolution, order, empty, empty,
+                 pd.DatetimeIndex([], name=index.name))
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+    labels = bucket_labels(np.arange(codes[0], codes[-1] + 1), resolution)
+    return cls(
+        index, resolution, order, starts, codes[starts] - codes[0],
+        pd.DatetimeIndex(labels, freq=resolution.value, name=index.name))
+
+  def matches(self, index: pd.DatetimeIndex) -> bool:
+    """Check whether the buckets were computed from a given index.
+
+    Args:
+        index (pd.DatetimeIndex): The index to compare with.
+
+    Returns:
+        bool: True if the index holds the same timestamps.
+    """
+    return index is self.index or index.equals(self.index)
+
+  def sum(self, values: np.ndarray) -> np.ndarray:
+    """Sum every column of a 2-D array per bucket in a single reduceat pass, NaN counting as 0.
+
+    Args:
+        values (np.ndarray): A (rows of the index, columns) array.
+
+    Returns:
+        np.ndarray: A (buckets, columns) float64 array, 0 for empty buckets.
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+    if self.order is not None:
+      values = values[self.order]
+    sums = np.zeros((len(self.labels), values.shape[1]))
+    if len(self.starts):
+      sums[self.positions] = np.add.reduceat(values, self.starts, axis=0)
+    return sums
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.common import enums
+from src.data import coefficients, schema, source
+
+from . import aggregation, quality_index, report
+
+# The carriers, in the order they are passed to the quality index kernel.
+PORTFOLIO_CARRIERS: list[tuple[enums.EnergyCarrier, enums.Destination]] = [
+    (enums.EnergyCarrier.NATURALGAS, enums.Destination.INPUT),
+    (enums.EnergyCarrier.ELECTRICITY, enums.Destination.OUTPUT),
+    (enums.EnergyCarrier.HEATING, enums.Destination.OUTPUT),
+]
+
+
+@dataclass
+class CHPQA_portfolio:
+  """
+  Calculates the Quality Index of many CHP sites as one batched computation.
+  Every site is described by a CHPQA_report, only its site name, units and data source are used.
+
+  Attributes:
+    list_sites (list[report.CHPQA_report]): The sites of the portfolio.
+    resolution (enums.Resolution): The resolution of the results.
+
+  Methods:
+    get_site_totals: Get the (site, period) arrays of total gas, power and heat.
+    calculate_qualifying_outputs: Calculates the qualifying outputs of every site.
+  """
+
+  list_sites: list[report.CHPQA_report]
+  resolution: enums.Resolution = enums.Resolution.MONTHLY
+
+  def _get_data_source_totals(
+      self, data_source: source.DataManager, site_positions: list[int]
+  ) -> tuple[pd.DatetimeIndex, dict[tuple[int, int], np.ndarray]]:
+    """
+    Aggregate every meter of the sites sharing a data source in a single pass.
+
+    Args:
+        data_source (source.DataManager): The shared data source.
+        site_positions (list[int]): Positions in list_sites of the sites using it.
+
+    Returns:
+        tuple[pd.DatetimeIndex, dict[tuple[int, int], np.ndarray]]: The period labels and, \
+          per (site position, carrier position), the totals with NaN outside the periods holding readings.
+    """
+    meter_ids = {
+        (position, carrier_position):
+        self.list_sites[position].get_meter_ids(energy_carrier, destination)
+        for position in site_positions
+        for carrier_position, (energy_carrier,
+                               destination) in enumerate(PORTFOLIO_CARRIERS)
+    }
+    all_ids = list(
+        dict.fromkeys(profile_id for list_ids in meter_ids.values()
+                      for profile_id in list_ids))
+    wide_dataf = data_source.filter_data(profile_ids=all_ids, wide=True)
+    buckets = aggregation.TimeBuckets.from_index(wide_dataf.index,
+                                                 self.resolution)
+    values = wide_dataf.to_numpy()
+    sums = buckets.sum(values)
+    readings = buckets.sum(~np.isnan(values))
+    column_positions = {
+        profile_id: position
+        for position, profile_id in enumerate(wide_dataf.columns)
+    }
+
+    totals = {}
+    for key, list_ids in meter_ids.items():
+      columns = [
+          column_positions[profile_id] for profile_id in list_ids
+          if profile_id in column_positions
+      ]
+      total = np.full(len(buckets.labels), np.nan)
+      has_readings = np.flatnonzero(readings[:, columns].sum(axis=1))
+      if len(has_readings):
+        first, last = has_readings[0], has_readings[-1] + 1
+        total[first:last] = sums[first:last, columns].sum(axis=1)
+      totals[key] = total
+    return buckets.labels, totals
+
+  def get_site_totals(self) -> tuple[pd.DatetimeIndex, list[np.ndarray]]:
+    """
+    Get the (site, period) arrays of total gas, power and heat.
+    Sites sharing a data source are filtered and aggregated together.
+
+    Returns:
+        tuple[pd.DatetimeIndex, list[np.ndarray]]: The period labels and the gas, power and heat arrays, \
+          NaN where a site has no readings.
+    """
+    sites_by_source: dict[int, list[int]] = {}
+    for position, site in enumerate(self.list_sites):
+      sites_by_source.setdefault(id(site.data_source), []).append(position)
+
+    source_results = [
+        self._get_data_source_totals(
+            self.list_sites[site_positions[0]].data_source, site_positions)
+        for site_positions in sites_by_source.values()
+    ]
+    periods = pd.DatetimeIndex([], name=schema.portfolioSchema.period)
+    for labels, _ in source_results:
+      periods = periods.union(labels)
+    periods.name = schema.portfolioSchema.period
+
+    site_totals = [
+        np.full((len(self.list_sites), len(periods)), np.nan)
+        for _ in PORTFOLIO_CARRIERS
+    ]
+    for labels, totals in source_results:
+      period_positions = periods.get_indexer(labels)
+      for (position, carrier_position), total in totals.items():
+        site_totals[carrier_position][position, period_positions] = total
+    return periods, site_totals
+
+  def calculate_qualifying_outputs(self) -> pd.DataFrame:
+    """
+    Calculates the qualifying outputs of every site, X and Y being looked up per site.
+
+    Returns:
+        pd.DataFrame: A pandas dataframe indexed by (site name, period) with the \
+          columns of report.CHPQA_report.calculate_qualifying_outputs.
+    """
+    periods, (total_gas, total_power, total_heat) = self.get_site_totals()
+    capacities = np.array(
+        [site.get_max_capacity() for site in self.list_sites], dtype=float)
+    x_coeffs, y_coeffs = coefficients.load_x_y_table().lookup(capacities)
+    arrays = quality_index.calculate_qualifying_arrays(total_gas, total_power,
+                                                       total_heat,
+                                                       x_coeffs[:, None],
+                                                       y_coeffs[:, None])
+
+    has_data = ~(np.isnan(total_gas) & np.isnan(total_power)
+                 & np.isnan(total_heat))
+    site_positions, period_positions = np.nonzero(has_data)
+    site_names = np.array([site.site_name for site in self.list_sites],
+                          dtype=object)
+    index = pd.MultiIndex.from_arrays(
+        [site_names[site_positions], periods[period_positions]],
+        names=[schema.portfolioSchema.site, schema.portfolioSchema.period])
+    return pd.DataFrame(
+        {column: values[has_data]
+         for column, values in arrays.items()},
+        index=index)
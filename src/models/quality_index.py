@@ -0,0 +1,82 @@
+from typing import Union
+
+import numpy as np
+
+from src.data import schema
+
+N_POWER_THRESHOLD = 0.2
+QI_THRESHOLD = 100
+
+
+def calculate_qualifying_arrays(
+    total_gas: np.ndarray,
+    total_power: np.ndarray,
+    total_heat: np.ndarray,
+    x_coeff: Union[float, np.ndarray],
+    y_coeff: Union[float, np.ndarray],
+    n_power_threshold: float = N_POWER_THRESHOLD,
+    qi_threshold: float = QI_THRESHOLD) -> dict[str, np.ndarray]:
+  """Calculate the efficiencies, Quality Index and qualifying fuel and power in a single pass.
+
+  The totals may have any shape, X and Y are broadcast against them so that, for example, \
+    (sites, periods) totals can be combined with (sites, 1) coefficients. Every output is \
+    preallocated and filled in place, applying the thresholds with np.where style masks.
+
+  Args:
+      total_gas (np.ndarray): Total input fuel per period.
+      total_power (np.ndarray): Total electricity generated per period.
+      total_heat (np.ndarray): Total heat generated per period.
+      x_coeff (Union[float, np.ndarray]): X coefficient of the Quality Index.
+      y_coeff (Union[float, np.ndarray]): Y coefficient of the Quality Index.
+      n_power_threshold (float): Power efficiency under which only part of the fuel qualifies.
+      qi_threshold (float): Quality Index under which only part of the power qualifies.
+
+  Returns:
+      dict[str, np.ndarray]: The arrays keyed by their schema.qualifyingSchema column name.
+  """
+  total_gas, total_power, total_heat = np.broadcast_arrays(
+      np.asarray(total_gas, dtype=np.float64),
+      np.asarray(total_power, dtype=np.float64),
+      np.asarray(total_heat, dtype=np.float64))
+  shape = total_gas.shape
+  n_power = np.empty(shape)
+  n_heat = np.empty(shape)
+  qi_val = np.empty(shape)
+  qi_fuel = np.empty(shape)
+  qi_power = np.empty(shape)
+  n_heat_new = np.full(shape, np.nan)
+  heat_power_ratio = np.full(shape, np.nan)
+  scratch = np.empty(shape)
+
+  with np.errstate(divide='ignore', invalid='ignore'):
+    np.divide(total_power, total_gas, out=n_power)
+    np.divide(total_heat, total_gas, out=n_heat)
+    np.multiply(x_coeff, n_power, out=qi_val)
+    np.multiply(y_coeff, n_heat, out=scratch)
+    np.add(qi_val, scratch, out=qi_val)
+
+    np.copyto(qi_fuel, total_gas)
+    low_power = ~(n_power >= n_power_threshold)
+    np.multiply(n_power, total_gas, out=scratch)
+    np.divide(scratch, n_power_threshold, out=qi_fuel, where=low_power)
+
+    np.copyto(qi_power, total_power)
+    low_qi = ~(qi_val >= qi_threshold)
+    np.multiply(x_coeff, n_power, out=scratch)
+    np.subtract(qi_threshold, scratch, out=scratch)
+    np.divide(scratch, y_coeff, out=n_heat_new, where=low_qi)
+    np.divide(n_heat_new, n_power, out=heat_power_ratio, where=low_qi)
+    np.divide(total_heat, heat_power_ratio, out=qi_power, where=low_qi)
+
+  return {
+      schema.qualifyingSchema.n_power: n_power,
+      schema.qualifyingSchema.n_heat: n_heat,
+      schema.qualifyingSchema.qi_val: qi_val,
+      schema.qualifyingSchema.Total_gas: total_gas,
+      schema.qualifyingSchema.qi_fuel: qi_fuel,
+      schema.qualifyingSchema.CHP_elec: total_power,
+      schema.qualifyingSchema.Total_heat: total_heat,
+      schema.qualifyingSchema.qi_power: qi_power,
+      schema.qualifyingSchema.n_heat_new: n_heat_new,
+      schema.qualifyingSchema.heat_power_ratio: heat_power_ratio,
+  }
@@ -2,16 +2,51 @@ import sys
 
 sys.path.insert(0, '..//')
 
-from dataclasses import dataclass
-from pathlib import Path
-from typing import Any
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
 
 import pandas as pd
 
-from src.common import enums
-from src.data import schema, source
-
-from . import technology
+from src.common import enums, profiling
+from src.data import coefficients, schema, source
+
+from . import aggregation, quality_index, technology
+
+# Coarser resolutions whose periods are exact unions of the periods of the key resolution,
+# so that their sums can be rolled up from the key's sums instead of the raw data.
+ROLLUP_TARGETS: dict[enums.Resolution, set[enums.Resolution]] = {
+    enums.Resolution.HALFHOURLY: {
+        enums.Resolution.HOURLY, enums.Resolution.DAILY,
+        enums.Resolution.WEEKLY, enums.Resolution.MONTHLY,
+        enums.Resolution.QUARTERLY, enums.Resolution.YEARLY,
+        enums.Resolution.SCHEMEYEAR
+    },
+    enums.Resolution.HOURLY: {
+        enums.Resolution.DAILY, enums.Resolution.WEEKLY,
+        enums.Resolution.MONTHLY, enums.Resolution.QUARTERLY,
+        enums.Resolution.YEARLY, enums.Resolution.SCHEMEYEAR
+    },
+    enums.Resolution.DAILY: {
+        enums.Resolution.WEEKLY, enums.Resolution.MONTHLY,
+        enums.Resolution.QUARTERLY, enums.Resolution.YEARLY,
+        enums.Resolution.SCHEMEYEAR
+    },
+    enums.Resolution.MONTHLY: {
+        enums.Resolution.QUARTERLY, enums.Resolution.YEARLY,
+        enums.Resolution.SCHEMEYEAR
+    },
+    enums.Resolution.QUARTERLY:
+    {enums.Resolution.YEARLY, enums.Resolution.SCHEMEYEAR},
+}
+
+# Resolutions from the finest to the coarsest grain.
+RESOLUTION_ORDER: list[enums.Resolution] = [
+    enums.Resolution.HALFHOURLY, enums.Resolution.HOURLY,
+    enums.Resolution.DAILY, enums.Resolution.WEEKLY, enums.Resolution.MONTHLY,
+    enums.Resolution.QUARTERLY, enums.Resolution.YEARLY,
+    enums.Resolution.SCHEMEYEAR
+]
 
 
 @dataclass
@@ -26,19 +61,31 @@ class CHPQA_report:
     list_all_units (list[technology.Technology]): A list of all the units.
     number_years_on_scheme (int): The number of years on the scheme.
     resolution (enums.Resolution): The resolution of the data.
+    start_time (Optional[datetime]): Start of the reported period, None for the start of the data.
+    end_time (Optional[datetime]): End of the reported period, None for the end of the data.
+    instrumentation (Optional[profiling.Instrumentation]): Records the time, rows and memory \
+      of every stage when set, the records of a calculation being attached to its result's attrs.
+    cache_hits (int): Number of aggregated totals served from the cache.
+    cache_misses (int): Number of aggregated totals computed from the data source.
 
   Methods:
     get_total_output: Get the total output of a given energy carrier.
     get_total_input: Get the total input of a given energy carrier.
+    get_meter_ids: Get the ids of the meters measuring an energy carrier.
     get_data_and_pivot: Get the data and pivot it.
+    get_aggregated_total: Get the total of an energy carrier at the report resolution, memoised.
+    get_time_buckets: Get the bucket codes of an index at the report resolution, memoised.
+    clear_cache: Empty the aggregated totals cache.
     calculate_power_efficiency: Calculate the power efficiency.
     calculate_heat_efficiency: Calculate the heat efficiency.
     calculate_mechanical_efficiency: Calculate the mechanical efficiency.
     get_max_capacity: Get the maximum capacity of the CHP plant.
     get_X_Y_vals: Get the X and Y values for the CHP plant based on the maximum output.
+    calculate_qualifying_arrays: Calculates every quality index and qualifying value in a single pass.
     calculate_quality_index: Calculates the quality index based on the heat and power efficiencies.
     calculate_qualifying_fuel: Calculates the qualifying fuel based on the quality index.
     calculate_qualifying_outputs: Calculates the qualifying outputs based on the quality index.
+    calculate_qualifying_outputs_by_resolution: Calculates the qualifying outputs for several resolutions in one pass.
   """
 
   site_name: str
@@ -47,7 +94,25 @@ class CHPQA_report:
   list_all_units: list[technology.Technology]
   number_years_on_scheme: int = 0
   resolution: enums.Resolution = enums.Resolution.HALFHOURLY
-  web_app: bool = False
+  start_time: Optional[datetime] = None
+  end_time: Optional[datetime] = None
+  instrumentation: Optional[profiling.Instrumentation] = field(default=None,
+                                                               repr=False)
+  cache_hits: int = field(init=False, default=0)
+  cache_misses: int = field(init=False, default=0)
+  _totals_cache: dict[tuple[enums.EnergyCarrier, enums.Destination,
+                            enums.Resolution],
+                      pd.Series] = field(init=False,
+                                         default_factory=dict,
+                                         repr=False)
+  _buckets_cache: dict[enums.Resolution,
+                       aggregation.TimeBuckets] = field(init=False,
+                                                        default_factory=dict,
+                                                        repr=False)
+  _cache_state: Optional[tuple[int, Optional[datetime],
+                               Optional[datetime]]] = field(init=False,
+                                                            default=None,
+                                                            repr=False)
 
   def get_total_output(self,
                        energy_carrier: enums.EnergyCarrier) -> pd.DataFrame:
@@ -60,12 +125,8 @@ class CHPQA_report:
     Returns:
         pd.DataFrame: A pandas dataframe of ids.
     """
-    list_ids = []
-    for unit in self.list_all_units:
-      for output in unit.technology_outputs:
-        if output.energy_carrier is energy_carrier:
-          list_ids.append(output.id)
-    return self.get_data_and_pivot(list_ids)
+    return self.get_data_and_pivot(
+        self.get_meter_ids(energy_carrier, enums.Destination.OUTPUT))
 
   def get_total_input(self,
                       energy_carrier: enums.EnergyCarrier) -> pd.DataFrame:
@@ -78,11 +139,31 @@ class CHPQA_report:
     Returns:
         self.get_data_and_pivot(list_ids) (pd.DataFrame): A pandas dataframe.
     """
+    return self.get_data_and_pivot(
+        self.get_meter_ids(energy_carrier, enums.Destination.INPUT))
+
+  def get_meter_ids(self, energy_carrier: enums.EnergyCarrier,
+                    destination: enums.Destination) -> list[int]:
+    """
+    Get the ids of the meters measuring an energy carrier.
+
+    Args:
+        energy_carrier (enums.EnergyCarrier): The energy carrier.
+        destination (enums.Destination): INPUT for the units' input meters, OUTPUT for their output meters.
+
+    Returns:
+        list[int]: A list of ids.
+    """
     list_ids = []
     for unit in self.list_all_units:
-      if unit.technology_input.energy_carrier is energy_carrier:
-        list_ids.append(unit.technology_input.id)
-    return self.get_data_and_pivot(list_ids)
+      if destination is enums.Destination.INPUT:
+        if unit.technology_input.energy_carrier is energy_carrier:
+          list_ids.append(unit.technology_input.id)
+      else:
+        for output in unit.technology_outputs:
+          if output.energy_carrier is energy_carrier:
+            list_ids.append(output.id)
+    return list_ids
 
   def get_data_and_pivot(self, list_ids: list[int]) -> pd.DataFrame:
     """
@@ -94,10 +175,103 @@ class CHPQA_report:
     Returns:
         pd.DataFrame: A pandas dataframe.
     """
-    dataf = self.data_source.filter_data(profile_ids=list_ids)
-    return dataf.pivot_table(index=schema.DataSchema.DATE,
-                             columns=schema.DataSchema.ID,
-                             values=schema.DataSchema.VALUE)
+    with self._measure('get_data_and_pivot') as stage:
+      dataf = self.data_source.filter_data(self.start_time,
+                                           self.end_time,
+                                           profile_ids=list_ids,
+                                           wide=True)
+      stage.rows = len(dataf)
+    return dataf
+
+  def _measure(self, stage: str) -> profiling.Stage | profiling.NullStage:
+    return profiling.measure(self.instrumentation, 'CHPQA_report',
+                             self.site_name, stage)
+
+  def clear_cache(self) -> None:
+    """
+    Empty the aggregated totals cache.
+    """
+    self._totals_cache.clear()
+    self._buckets_cache.clear()
+    self._cache_state = self._get_cache_state()
+
+  def _get_cache_state(
+      self) -> tuple[int, Optional[datetime], Optional[datetime]]:
+    """
+    Get what the cached totals depend on besides the resolution.
+
+    Returns:
+        tuple[int, Optional[datetime], Optional[datetime]]: The data version and the reported period.
+    """
+    return self.data_source.data_version, self.start_time, self.end_time
+
+  def get_aggregated_total(self, energy_carrier: enums.EnergyCarrier,
+                           destination: enums.Destination) -> pd.Series:
+    """
+    Get the total of an energy carrier, summed over all its meters and resampled to the report resolution.
+    Results are memoised per (energy carrier, destination, resolution) and dropped when the data source
+    or the reported period changes.
+    When a finer total that nests into the report resolution is cached it is rolled up instead of
+    reading the data source again.
+
+    Args:
+        energy_carrier (enums.EnergyCarrier): The energy carrier.
+        destination (enums.Destination): INPUT for the units' input meters, OUTPUT for their output meters.
+
+    Returns:
+        pd.Series: A pandas series of the total at the report resolution.
+    """
+    if self._cache_state != self._get_cache_state():
+      self.clear_cache()
+    key = (energy_carrier, destination, self.resolution)
+    if key in self._totals_cache:
+      self.cache_hits += 1
+      return self._totals_cache[key]
+    self.cache_misses += 1
+    for base_resolution in RESOLUTION_ORDER:
+      base_total = self._totals_cache.get(
+          (energy_carrier, destination, base_resolution))
+      if base_total is not None and self.resolution in ROLLUP_TARGETS.get(
+          base_resolution, set()):
+        with self._measure('rollup') as stage:
+          buckets = aggregation.TimeBuckets.from_index(base_total.index,
+                                                       self.resolution)
+          total = pd.Series(buckets.sum(base_total.to_numpy()[:, None])[:, 0],
+                            index=buckets.labels)
+          stage.rows = len(total)
+        break
+    else:
+      if destination is enums.Destination.INPUT:
+        dataf = self.get_total_input(energy_carrier)
+      else:
+        dataf = self.get_total_output(energy_carrier)
+      buckets = self.get_time_buckets(dataf.index)
+      with self._measure('resample') as stage:
+        total = pd.Series(buckets.sum(dataf.to_numpy()).sum(axis=1),
+                          index=buckets.labels)
+        stage.rows = len(total)
+    self._totals_cache[key] = total
+    return total
+
+  def get_time_buckets(self,
+                       index: pd.DatetimeIndex) -> aggregation.TimeBuckets:
+    """
+    Get the bucket codes of an index at the report resolution.
+    The codes are reused for every carrier sharing the same timestamps until the data source changes.
+
+    Args:
+        index (pd.DatetimeIndex): The timestamps to bucket.
+
+    Returns:
+        aggregation.TimeBuckets: The buckets of the index.
+    """
+    buckets = self._buckets_cache.get(self.resolution)
+    if buckets is None or not buckets.matches(index):
+      with self._measure('get_time_buckets') as stage:
+        buckets = aggregation.TimeBuckets.from_index(index, self.resolution)
+        stage.rows = len(index)
+      self._buckets_cache[self.resolution] = buckets
+    return buckets
 
   def calculate_power_efficiency(self) -> pd.DataFrame:
     """
@@ -106,12 +280,11 @@ class CHPQA_report:
     Returns:
         pd.DataFrame: A pandas dataframe.
     """
-    resolution_key = self.resolution.value
-    total_gas = self.get_total_input(
-        enums.EnergyCarrier.NATURALGAS).resample(resolution_key).sum()
-    total_power = self.get_total_output(
-        enums.EnergyCarrier.ELECTRICITY).resample(resolution_key).sum()
-    dataf = pd.concat([total_power.sum(axis=1), total_gas.sum(axis=1)], axis=1)
+    total_gas = self.get_aggregated_total(enums.EnergyCarrier.NATURALGAS,
+                                          enums.Destination.INPUT)
+    total_power = self.get_aggregated_total(enums.EnergyCarrier.ELECTRICITY,
+                                            enums.Destination.OUTPUT)
+    dataf = pd.concat([total_power, total_gas], axis=1)
     dataf.columns = [
         enums.EnergyCarrier.ELECTRICITY.name,
         enums.EnergyCarrier.NATURALGAS.name
@@ -126,12 +299,11 @@ class CHPQA_report:
     Returns:
         pd.DataFrame: A pandas dataframe.
     """
-    resolution_key = self.resolution.value
-    total_gas = self.get_total_input(
-        enums.EnergyCarrier.NATURALGAS).resample(resolution_key).sum()
-    total_heat = self.get_total_output(
-        enums.EnergyCarrier.HEATING).resample(resolution_key).sum()
-    dataf = pd.concat([total_heat.sum(axis=1), total_gas.sum(axis=1)], axis=1)
+    total_gas = self.get_aggregated_total(enums.EnergyCarrier.NATURALGAS,
+                                          enums.Destination.INPUT)
+    total_heat = self.get_aggregated_total(enums.EnergyCarrier.HEATING,
+                                           enums.Destination.OUTPUT)
+    dataf = pd.concat([total_heat, total_gas], axis=1)
     dataf.columns = [
         enums.EnergyCarrier.HEATING.name, enums.EnergyCarrier.NATURALGAS.name
     ]
@@ -164,33 +336,42 @@ class CHPQA_report:
     Get the X and Y values for the CHP plant based on the maximum output.
 
     Returns:
-        pd.DataFrame: A pandas dataframe made of the x and y values for the sized system installed.
-    """
-    sheet_path = Path(r"..//src/data/x_y_coeff_vals - Sheet1.csv")
-    if self.web_app:
-      sheet_path = Path(r"..//CHPQA/src/data/x_y_coeff_vals - Sheet1.csv")
-    table = pd.read_csv(sheet_path)
-    max_capacity_val = self.get_max_capacity()
-    key: int = 0
-    if max_capacity_val <= 1:
-      key = 1
-    elif max_capacity_val > 1 and max_capacity_val <= 10:
-      key = 10
-    elif max_capacity_val > 10 and max_capacity_val <= 25:
-      key = 25
-    elif max_capacity_val > 25 and max_capacity_val <= 50:
-      key = 50
-    elif max_capacity_val > 50 and max_capacity_val <= 100:
-      key = 100
-    elif max_capacity_val > 100 and max_capacity_val <= 200:
-      key = 200
-    elif max_capacity_val > 200 and max_capacity_val <= 500:
-      key = 500
-    elif max_capacity_val > 500:
-      key = 501
-    row_data = table[table['key_col'] == key]
-    return row_data[schema.xyvalSchema.X_coef].values[0], row_data[
-        schema.xyvalSchema.Y_coef].values[0]
+        tuple[Any, Any]: The x and y values for the sized system installed.
+    """
+    return coefficients.load_x_y_table().lookup(self.get_max_capacity())
+
+  def calculate_qualifying_arrays(self) -> pd.DataFrame:
+    """
+    Calculates every quality index and qualifying value with the fused quality_index kernel.
+    With instrumentation the records of the call are attached to attrs[profiling.SUMMARY_ATTRS_KEY].
+
+    Returns:
+        pd.DataFrame: A pandas dataframe with one column per schema.qualifyingSchema value.
+    """
+    first_record = 0 if self.instrumentation is None else len(
+        self.instrumentation.records)
+    with self._measure('calculate_qualifying_arrays') as stage:
+      X, Y = self.get_X_Y_vals()
+      totals = pd.concat([
+          self.get_aggregated_total(enums.EnergyCarrier.NATURALGAS,
+                                    enums.Destination.INPUT),
+          self.get_aggregated_total(enums.EnergyCarrier.ELECTRICITY,
+                                    enums.Destination.OUTPUT),
+          self.get_aggregated_total(enums.EnergyCarrier.HEATING,
+                                    enums.Destination.OUTPUT)
+      ],
+                         axis=1)
+      with self._measure('quality_index') as kernel_stage:
+        arrays = quality_index.calculate_qualifying_arrays(
+            totals.iloc[:, 0].to_numpy(), totals.iloc[:, 1].to_numpy(),
+            totals.iloc[:, 2].to_numpy(), X, Y)
+        kernel_stage.rows = len(totals)
+      result = pd.DataFrame(arrays, index=totals.index)
+      stage.rows = len(result)
+    if self.instrumentation is not None:
+      result.attrs[profiling.SUMMARY_ATTRS_KEY] = self.instrumentation.summary(
+          first_record)
+    return result
 
   def calculate_quality_index(self) -> pd.DataFrame:
     """
@@ -199,14 +380,10 @@ class CHPQA_report:
     Returns:
         pd.DataFrame: A pandas dataframe containing all relevant data (n_power, n_heat & QI val).
     """
-    X, Y = self.get_X_Y_vals()
-    n_power = self.calculate_power_efficiency()
-    n_heat = self.calculate_heat_efficiency()
-    dataf = pd.concat([n_power, n_heat], axis=1)
-    dataf.columns = [schema.CHPQASchema.n_power, schema.CHPQASchema.n_heat]
-    dataf[schema.CHPQASchema.qi_val] = X * dataf[
-        schema.CHPQASchema.n_power] + Y * dataf[schema.CHPQASchema.n_heat]
-    return dataf
+    return self.calculate_qualifying_arrays()[[
+        schema.CHPQASchema.n_power, schema.CHPQASchema.n_heat,
+        schema.CHPQASchema.qi_val
+    ]]
 
   def calculate_qualifying_fuel(self) -> pd.DataFrame:
     """
@@ -215,21 +392,11 @@ class CHPQA_report:
     Returns:
         pd.DataFrame: A pandas dataframe containing calculate_quality_index and qualifying input fuel.
     """
-    n_power_threshold = 0.2
-    resolution_key = self.resolution.value
-    dataf = self.calculate_quality_index()
-    total_gas = self.get_total_input(
-        enums.EnergyCarrier.NATURALGAS).resample(resolution_key).sum()
-
-    filt = dataf[schema.qualifyingSchema.n_power] >= n_power_threshold
-    dataf[schema.qualifyingSchema.Total_gas] = total_gas.sum(axis=1)
-    dataf[schema.qualifyingSchema.qi_fuel] = dataf[
-        schema.qualifyingSchema.Total_gas]
-    dataf.loc[~filt, schema.qualifyingSchema.qi_fuel] = (
-        (dataf.loc[~filt, schema.qualifyingSchema.n_power] *
-         dataf.loc[~filt, schema.qualifyingSchema.Total_gas]) /
-        n_power_threshold).values
-    return dataf
+    return self.calculate_qualifying_arrays()[[
+        schema.qualifyingSchema.n_power, schema.qualifyingSchema.n_heat,
+        schema.qualifyingSchema.qi_val, schema.qualifyingSchema.Total_gas,
+        schema.qualifyingSchema.qi_fuel
+    ]]
 
   def calculate_qualifying_outputs(self) -> pd.DataFrame:
     """
@@ -238,26 +405,28 @@ class CHPQA_report:
     Returns:
         pd.DataFrame: A pandas dataframe containing calculate_quality_fuel outputs and qualifying output energy.
     """
-    qi_threshold = 100
-    resolution_key = self.resolution.value
-    X, Y = self.get_X_Y_vals()
-    dataf = self.calculate_qualifying_fuel()
-    filt_2 = dataf[schema.qualifyingSchema.qi_val] >= qi_threshold
-    total_power = self.get_total_output(
-        enums.EnergyCarrier.ELECTRICITY).resample(resolution_key).sum()
-    total_heat = self.get_total_output(
-        enums.EnergyCarrier.HEATING).resample(resolution_key).sum()
-    dataf[schema.qualifyingSchema.CHP_elec] = total_power.sum(axis=1)
-    dataf[schema.qualifyingSchema.Total_heat] = total_heat.sum(axis=1)
-    dataf[schema.qualifyingSchema.qi_power] = dataf[
-        schema.qualifyingSchema.CHP_elec]
-    dataf.loc[~filt_2, schema.qualifyingSchema.n_heat_new] = (
-        qi_threshold -
-        (X * dataf.loc[~filt_2, schema.qualifyingSchema.n_power])) / Y
-    dataf.loc[~filt_2, schema.qualifyingSchema.heat_power_ratio] = dataf.loc[
-        ~filt_2, schema.qualifyingSchema.n_heat_new] / dataf.loc[
-            ~filt_2, schema.qualifyingSchema.n_power]
-    dataf.loc[~filt_2, schema.qualifyingSchema.qi_power] = dataf.loc[
-        ~filt_2, schema.qualifyingSchema.Total_heat] / dataf.loc[
-            ~filt_2, schema.qualifyingSchema.heat_power_ratio]
-    return dataf
+    return self.calculate_qualifying_arrays()
+
+  def calculate_qualifying_outputs_by_resolution(
+      self, resolutions: list[enums.Resolution]
+  ) -> dict[enums.Resolution, pd.DataFrame]:
+    """
+    Calculates the qualifying outputs for several resolutions in one pass.
+    The raw data is aggregated once to the finest requested resolution and the coarser
+    resolutions are rolled up from those sums, as every QI input is an additive total.
+
+    Args:
+        resolutions (list[enums.Resolution]): The resolutions to calculate.
+
+    Returns:
+        dict[enums.Resolution, pd.DataFrame]: The calculate_qualifying_outputs dataframe for each resolution.
+    """
+    original_resolution = self.resolution
+    results: dict[enums.Resolution, pd.DataFrame] = {}
+    try:
+      for resolution in sorted(set(resolutions), key=RESOLUTION_ORDER.index):
+        self.resolution = resolution
+        results[resolution] = self.calculate_qualifying_outputs()
+    finally:
+      self.resolution = original_resolution
+    return {resolution: results[resolution] for resolution in resolutions}
@@ -0,0 +1,135 @@
+import dataclasses
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from src.common import enums
+from src.data import source
+
+from . import report, technology
+
+
+@dataclass(frozen=True)
+class ReportJob:
+  """An independent CHPQA report to run in a worker process.
+
+  Only the path of the site data is sent to the worker, which reads it once and reuses it for \
+    every job on the same path. Meters are matched to the data by name, so the units can be \
+    defined in any process.
+
+  Attributes:
+    site_name (str): The name of the site.
+    data_path (Path): csv or parquet file with index=datetime and column=[name of each meter].
+    list_all_units (list[technology.Technology]): The units of the site.
+    resolution (enums.Resolution): The resolution of the report.
+    scheme_year (Optional[int]): Calendar year of the scheme year, None for all the data.
+    type_of_system (enums.SystemType): The type of system.
+  """
+  site_name: str
+  data_path: Path
+  list_all_units: list[technology.Technology]
+  resolution: enums.Resolution = enums.Resolution.MONTHLY
+  scheme_year: Optional[int] = None
+  type_of_system: enums.SystemType = enums.SystemType.COMPLEX
+
+
+def scheme_year_bounds(scheme_year: int) -> tuple[pd.Timestamp, pd.Timestamp]:
+  """Get the first and last instant of a scheme year, CHPQA scheme years being calendar years.
+
+  Args:
+      scheme_year (int): Calendar year of the scheme year.
+
+  Returns:
+      tuple[pd.Timestamp, pd.Timestamp]: The start and end of the scheme year, both inclusive.
+  """
+  return (pd.Timestamp(scheme_year, 1, 1),
+          pd.Timestamp(scheme_year + 1, 1, 1) - pd.Timedelta(1, 'ns'))
+
+
+@lru_cache(maxsize=8)
+def load_site_data(
+    data_path: Path) -> tuple[source.DataManager, dict[str, int]]:
+  """Read a site data file into a wide DataManager, once per process and path.
+
+  Args:
+      data_path (Path): csv or parquet file with index=datetime and column=[name of each meter].
+
+  Returns:
+      tuple[source.DataManager, dict[str, int]]: The data manager and the mapping of the meter names to the profile ids.
+  """
+  if data_path.suffix == '.parquet':
+    dataf = pd.read_parquet(data_path)
+  else:
+    dataf = pd.read_csv(data_path, index_col=0, parse_dates=True)
+  data_source = source.DataManager(data_path.stem, enums.StorageMode.WIDE)
+  meter_id_dict = data_source.load_new_data(dataf)
+  return data_source, meter_id_dict
+
+
+def run_job(job: ReportJob) -> pd.DataFrame:
+  """Run a single report job in the current process.
+
+  Args:
+      job (ReportJob): The job to run.
+
+  Returns:
+      pd.DataFrame: The calculate_qualifying_outputs dataframe of the job.
+  """
+  data_source, meter_id_dict = load_site_data(Path(job.data_path))
+  list_units = [
+      dataclasses.replace(unit,
+                          technology_input=dataclasses.replace(
+                              unit.technology_input,
+                              id=meter_id_dict[unit.technology_input.name]),
+                          technology_outputs=[
+                              dataclasses.replace(meter,
+                                                  id=meter_id_dict[meter.name])
+                              for meter in unit.technology_outputs
+                          ]) for unit in job.list_all_units
+  ]
+  start_time, end_time = (None, None) if job.scheme_year is None else \
+    scheme_year_bounds(job.scheme_year)
+  report_obj = report.CHPQA_report(job.site_name,
+                                   job.type_of_system,
+                                   data_source,
+                                   list_units,
+                                   resolution=job.resolution,
+                                   start_time=start_time,
+                                   end_time=end_time)
+  return report_obj.calculate_qualifying_outputs()
+
+
+def _run_chunk(jobs: list[ReportJob]) -> list[tuple[ReportJob, pd.DataFrame]]:
+  return [(job, run_job(job)) for job in jobs]
+
+
+def run_reports(
+    jobs: list[ReportJob],
+    max_workers: Optional[int] = None,
+    chunk_size: int = 1) -> Iterator[tuple[ReportJob, pd.DataFrame]]:
+  """Run report jobs over a process pool, yielding the results in completion order.
+
+  Jobs are grouped by data path before being chunked so that a worker reads each site \
+    file as few times as possible.
+
+  Args:
+      jobs (list[ReportJob]): The jobs to run.
+      max_workers (Optional[int]): Number of worker processes, None for the number of CPUs.
+      chunk_size (int): Number of jobs sent to a worker at once.
+
+  Yields:
+      tuple[ReportJob, pd.DataFrame]: A job and its calculate_qualifying_outputs dataframe.
+  """
+  sorted_jobs = sorted(jobs, key=lambda job: str(job.data_path))
+  chunks = [
+      sorted_jobs[position:position + chunk_size]
+      for position in range(0, len(sorted_jobs), chunk_size)
+  ]
+  with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    futures = [executor.submit(_run_chunk, chunk) for chunk in chunks]
+    for future in as_completed(futures):
+      yield from future.result()
@@ -0,0 +1,173 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.common import enums
+
+from . import aggregation, portfolio, quality_index, report
+
+
+@dataclass
+class QIAccumulator:
+  """
+  Keeps running gas, power and heat totals of a site per open period, updated one reading at a time.
+  The last value of every (meter, timestamp) is kept so that late or corrected readings are applied
+  as the delta to the value they replace. Only the site's units are used, not its data source.
+
+  Attributes:
+    site (report.CHPQA_report): The site, defining the meters and the X and Y coefficients.
+    resolutions (list[enums.Resolution]): The resolutions of the periods to keep totals for.
+    reading_count (int): Number of (meter, timestamp) readings held.
+
+  Methods:
+    add_reading: Add or correct a single reading.
+    add_readings: Add or correct every reading of a dataframe.
+    get_totals: Get the gas, power and heat totals per period.
+    snapshot: Calculates the qualifying outputs of every period from the running totals.
+  """
+
+  site: report.CHPQA_report
+  resolutions: list[enums.Resolution] = field(
+      default_factory=lambda:
+      [enums.Resolution.MONTHLY, enums.Resolution.SCHEMEYEAR])
+  _carrier_positions: dict[int, list[int]] = field(init=False, repr=False)
+  _readings: dict[tuple[int, int], float] = field(init=False,
+                                                  default_factory=dict,
+                                                  repr=False)
+  _totals: dict[enums.Resolution, dict[int, np.ndarray]] = field(init=False,
+                                                                 repr=False)
+
+  def __post_init__(self):
+    self._carrier_positions = {}
+    for carrier_position, (energy_carrier, destination) in enumerate(
+        portfolio.PORTFOLIO_CARRIERS):
+      for meter_id in self.site.get_meter_ids(energy_carrier, destination):
+        self._carrier_positions.setdefault(meter_id,
+                                           []).append(carrier_position)
+    self._totals = {resolution: {} for resolution in self.resolutions}
+
+  @property
+  def reading_count(self) -> int:
+    """Get the number of (meter, timestamp) readings held."""
+    return len(self._readings)
+
+  def add_reading(self, meter_id: int, timestamp: datetime,
+                  value: float) -> float:
+    """
+    Add a reading, or correct it if the meter already has one at that timestamp.
+    Readings of meters that are not part of the site are ignored, NaN counts as 0.
+
+    Args:
+        meter_id (int): The id of the meter.
+        timestamp (datetime): The timestamp of the reading.
+        value (float): The reading.
+
+    Returns:
+        float: The change applied to the totals.
+    """
+    carrier_positions = self._carrier_positions.get(meter_id)
+    if carrier_positions is None:
+      return 0.0
+    nanoseconds = np.array([pd.Timestamp(timestamp).asm8],
+                           dtype='datetime64[ns]')
+    codes = [
+        int(aggregation.bucket_codes(nanoseconds, resolution)[0])
+        for resolution in self.resolutions
+    ]
+    return self._apply_reading(meter_id, carrier_positions,
+                               int(nanoseconds.view(np.int64)[0]), value,
+                               codes)
+
+  def add_readings(self, dataf: pd.DataFrame) -> None:
+    """
+    Add or correct every reading of a dataframe, NaN cells being skipped.
+    The periods of the index are computed once for all the meters.
+
+    Args:
+        dataf (pd.DataFrame): A dataframe with index=datetime and column=[meter id].
+    """
+    nanoseconds = dataf.index.values.astype('datetime64[ns]')
+    codes = list(
+        zip(*[
+            aggregation.bucket_codes(nanoseconds, resolution).tolist()
+            for resolution in self.resolutions
+        ]))
+    keys = nanoseconds.view(np.int64).tolist()
+    for meter_id, readings in dataf.items():
+      carrier_positions = self._carrier_positions.get(meter_id)
+      if carrier_positions is None:
+        continue
+      for position in np.flatnonzero(readings.notna().to_numpy()):
+        self._apply_reading(meter_id, carrier_positions, keys[position],
+                            readings.iat[position], codes[position])
+
+  def _apply_reading(self, meter_id: int, carrier_positions: list[int],
+                     key: int, value: float, codes: list[int]) -> float:
+    """
+    Apply the change of a reading to the totals of its periods.
+
+    Args:
+        meter_id (int): The id of the meter.
+        carrier_positions (list[int]): Positions in portfolio.PORTFOLIO_CARRIERS measured by the meter.
+        key (int): The timestamp of the reading in nanoseconds.
+        value (float): The reading.
+        codes (list[int]): The period of the reading for each resolution.
+
+    Returns:
+        float: The change applied to the totals.
+    """
+    value = 0.0 if np.isnan(value) else float(value)
+    delta = value - self._readings.get((meter_id, key), 0.0)
+    self._readings[(meter_id, key)] = value
+    for resolution, code in zip(self.resolutions, codes):
+      totals = self._totals[resolution]
+      if code not in totals:
+        totals[code] = np.zeros(len(portfolio.PORTFOLIO_CARRIERS))
+      for carrier_position in carrier_positions:
+        totals[code][carrier_position] += delta
+    return delta
+
+  def get_totals(self, resolution: enums.Resolution) -> pd.DataFrame:
+    """
+    Get the gas, power and heat totals per period.
+
+    Args:
+        resolution (enums.Resolution): One of the accumulator's resolutions.
+
+    Returns:
+        pd.DataFrame: A pandas dataframe indexed by the period labels with one column per carrier.
+    """
+    totals = self._totals[resolution]
+    codes = np.array(sorted(totals), dtype=np.int64)
+    values = np.array([totals[code] for code in codes
+                       ]).reshape(len(codes),
+                                  len(portfolio.PORTFOLIO_CARRIERS))
+    return pd.DataFrame(
+        values,
+        index=aggregation.bucket_labels(codes, resolution),
+        columns=[
+            energy_carrier.name
+            for energy_carrier, _ in portfolio.PORTFOLIO_CARRIERS
+        ])
+
+  def snapshot(
+      self,
+      resolution: enums.Resolution = enums.Resolution.SCHEMEYEAR
+  ) -> pd.DataFrame:
+    """
+    Calculates the qualifying outputs of every period from the running totals.
+
+    Args:
+        resolution (enums.Resolution): One of the accumulator's resolutions.
+
+    Returns:
+        pd.DataFrame: A pandas dataframe with the columns of report.CHPQA_report.calculate_qualifying_outputs.
+    """
+    totals = self.get_totals(resolution)
+    total_gas, total_power, total_heat = totals.to_numpy().T
+    X, Y = self.site.get_X_Y_vals()
+    arrays = quality_index.calculate_qualifying_arrays(total_gas, total_power,
+                                                       total_heat, X, Y)
+    return pd.DataFrame(arrays, index=totals.index)
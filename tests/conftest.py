@@ -0,0 +1,9 @@
+"""Shared fixtures: a small seeded synthetic site, see benchmarks/synthetic.py."""
+import pytest
+
+from benchmarks import synthetic
+
+
+@pytest.fixture(scope='session')
+def site() -> synthetic.SyntheticSite:
+  return synthetic.generate_site(0, number_of_chps=2, number_of_boilers=1)
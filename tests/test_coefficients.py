@@ -0,0 +1,40 @@
+"""Checks the bisection band lookup against the row scan it replaced."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data import coefficients, schema
+
+# The inclusive upper bounds of the bands of the if/elif ladder, also their key_col.
+BAND_EDGES = [1, 10, 25, 50, 100, 200, 500]
+
+
+def scan_x_y_vals(max_capacity_val: float) -> tuple[float, float]:
+  table = pd.read_csv(coefficients.X_Y_SHEET_PATH)
+  key = 501
+  for upper_bound in BAND_EDGES:
+    if max_capacity_val <= upper_bound:
+      key = upper_bound
+      break
+  row_data = table[table[schema.xyvalSchema.key] == key]
+  return row_data[schema.xyvalSchema.X_coef].values[0], row_data[
+      schema.xyvalSchema.Y_coef].values[0]
+
+
+CAPACITIES = [-1, 0, 0.5] + [
+    edge + offset for edge in BAND_EDGES for offset in (-1e-9, 0, 1e-9)
+] + [501, 1e6]
+
+
+@pytest.mark.parametrize('capacity', CAPACITIES)
+def test_lookup_matches_row_scan(capacity):
+  assert coefficients.load_x_y_table().lookup(capacity) == scan_x_y_vals(
+      capacity)
+
+
+def test_lookup_of_an_array_matches_scalar_lookups():
+  table = coefficients.load_x_y_table()
+  X, Y = table.lookup(np.array(CAPACITIES))
+  expected = [scan_x_y_vals(capacity) for capacity in CAPACITIES]
+  np.testing.assert_array_equal(X, [x for x, _ in expected])
+  np.testing.assert_array_equal(Y, [y for _, y in expected])
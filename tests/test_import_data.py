@@ -0,0 +1,109 @@
+"""Checks the reading of the raw BMS exports and their column mapping transform."""
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.data import import_data, schema
+
+RAW_DATAF = pd.DataFrame({
+    'From Timestamp':
+    ['2023-01-01 00:30', '2023-01-01 00:00', '2023-01-01 01:00'],
+    'elec day': [100.0, np.nan, np.nan],
+    'elec night': [np.nan, 200.0, np.nan],
+    'chp heat': [1.0, np.nan, 3.0],
+    'chp gas': [np.nan, 20.0, 30.0],
+    'boiler heat': [0.5, 0.5, np.nan],
+    'boiler gas': [5.0, 5.0, np.nan],
+})
+
+COLUMN_MAPPING = import_data.build_column_mapping([
+    import_data.UnitColumns('CHP', ['chp gas'], ['chp heat'],
+                            ['elec day', 'elec night']),
+    import_data.UnitColumns('Boiler_1', ['boiler gas'], ['boiler heat']),
+])
+
+
+def transform() -> pd.DataFrame:
+  return import_data.transform_raw_dataf(RAW_DATAF, COLUMN_MAPPING)
+
+
+def test_columns_follow_the_output_schema():
+  assert list(transform().columns) == [
+      schema.outputSchema.CHP_elec, schema.outputSchema.CHP_heat_total,
+      schema.outputSchema.CHP_heat, schema.outputSchema.CHP_gas,
+      schema.outputSchema.Boiler_1_heat, schema.outputSchema.Boiler_1_gas,
+      schema.outputSchema.Total_heat, schema.outputSchema.Total_gas
+  ]
+
+
+def test_missing_readings_stay_missing_outside_the_totals():
+  chpqa = transform()
+  assert chpqa.index.is_monotonic_increasing
+  np.testing.assert_allclose(chpqa[schema.outputSchema.CHP_elec],
+                             [0.2, 0.1, np.nan])
+  np.testing.assert_allclose(chpqa[schema.outputSchema.CHP_heat],
+                             [np.nan, 1.0, 3.0])
+  np.testing.assert_allclose(
+      chpqa[schema.outputSchema.Boiler_1_gas] / import_data.SM3_TO_MWH,
+      [5.0, 5.0, np.nan])
+  np.testing.assert_allclose(chpqa[schema.outputSchema.Total_heat],
+                             [0.5, 1.5, 3.0])
+  np.testing.assert_allclose(
+      chpqa[schema.outputSchema.Total_gas] / import_data.SM3_TO_MWH,
+      [25.0, 5.0, 30.0])
+
+
+@pytest.fixture
+def export_folder(tmp_path) -> Path:
+  """A folder of four exports of a day each, named out of chronological order."""
+  index = pd.date_range('2023-01-01', periods=4 * 48, freq='30min')
+  values = np.random.default_rng(0).random((len(index), 6))
+  raw_dataf = pd.DataFrame(values, columns=RAW_DATAF.columns[1:])
+  raw_dataf.insert(0, 'From Timestamp', index.strftime('%Y-%m-%d %H:%M'))
+  for day, file_name in enumerate(['d', 'b', 'a', 'c']):
+    day_dataf = raw_dataf.iloc[day * 48:(day + 1) * 48]
+    day_dataf.to_csv(tmp_path / f'{file_name}.csv', index=False)
+  return tmp_path
+
+
+def test_threaded_compile_keeps_folder_order(export_folder):
+  files = [
+      import_data.read_data(file_path)
+      for file_path in export_folder.glob('*.csv')
+  ]
+  expected = pd.concat(files, ignore_index=True)
+  assert_frame_equal(import_data.compile_data(export_folder), expected)
+  assert_frame_equal(import_data.compile_data(export_folder, max_workers=4),
+                     expected)
+
+
+def test_pyarrow_converts_timestamp_columns(export_folder):
+  file_path = export_folder / 'a.csv'
+  dataf = import_data.read_data(file_path,
+                                parse_dates=['From Timestamp'],
+                                engine='pyarrow')
+  assert pd.api.types.is_datetime64_dtype(dataf['From Timestamp'])
+  assert_frame_equal(
+      dataf, import_data.read_data(file_path, parse_dates=['From Timestamp']))
+
+
+def test_pyarrow_rejects_chunksize(export_folder):
+  with pytest.raises(ValueError):
+    import_data.read_data(export_folder / 'a.csv',
+                          engine='pyarrow',
+                          chunksize=10)
+
+
+def test_chunked_transform_matches_a_full_read(export_folder):
+  transform_blocks = partial(import_data.transform_raw_dataf,
+                             column_mapping=COLUMN_MAPPING)
+  chunked = import_data.compile_data(export_folder,
+                                     chunksize=30,
+                                     transform=transform_blocks,
+                                     max_workers=4)
+  assert_frame_equal(chunked.sort_index(),
+                     transform_blocks(import_data.compile_data(export_folder)))
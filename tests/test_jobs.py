@@ -0,0 +1,79 @@
+"""Checks the report job manager through worker deaths and shutdowns."""
+import asyncio
+import json
+import os
+import signal
+import time
+
+import pytest
+from fastapi.exceptions import RequestValidationError
+
+from src.backend import jobs
+from src.common import enums
+
+PERIODS = 7 * 48
+
+
+@pytest.fixture(scope='module')
+def report_request(site) -> dict:
+  dataf = site.dataf.iloc[:PERIODS]
+  units = [{
+      'name':
+      unit.name,
+      'technology_type':
+      unit.technology_type.name,
+      'input_meter': {
+          'name': unit.gas_meter,
+          'energy_carrier': enums.EnergyCarrier.NATURALGAS.name
+      },
+      'output_meters': [{
+          'name': meter_name,
+          'energy_carrier': energy_carrier.name
+      } for energy_carrier, meter_name in unit.output_meters.items()],
+      'electrical_capacity':
+      unit.capacity
+  } for unit in site.list_units]
+  body = json.dumps({
+      'site_name':
+      site.site_name,
+      'units':
+      units,
+      'timestamps': [timestamp.isoformat() for timestamp in dataf.index],
+      'readings': {column: dataf[column].tolist()
+                   for column in dataf.columns}
+  })
+  return jobs.parse_report_request(body.encode())
+
+
+def test_invalid_body_is_a_validation_error():
+  with pytest.raises(RequestValidationError) as error:
+    jobs.parse_report_request(b'{"site_name": "site", "units": []}')
+  assert all(details['loc'][0] == 'body' for details in error.value.errors())
+
+
+def test_dead_worker_fails_its_jobs_and_the_pool_is_replaced(report_request):
+  job_manager = jobs.ReportJobManager(max_workers=1)
+  try:
+    # A long task holds the only worker, so the report job is queued behind it.
+    job_manager._get_executor().submit(time.sleep, 60)
+    lost_job_id = job_manager.submit(report_request)
+    for process in job_manager._executor._processes.values():
+      os.kill(process.pid, signal.SIGKILL)
+    lost_status = asyncio.run(job_manager.get_status(lost_job_id, wait=30))
+    assert lost_status.status == 'failed'
+
+    job_id = job_manager.submit(report_request)
+    job_status = asyncio.run(job_manager.get_status(job_id, wait=60))
+    assert job_status.status == 'done'
+    assert job_manager.pending_count == 0
+  finally:
+    job_manager.shutdown()
+
+
+def test_jobs_cancelled_by_shutdown_report_their_status(report_request):
+  job_manager = jobs.ReportJobManager(max_workers=1, max_pending_jobs=8)
+  job_manager._get_executor().submit(time.sleep, 1)
+  job_ids = [job_manager.submit(report_request) for _ in range(4)]
+  job_manager.shutdown()
+  job_status = asyncio.run(job_manager.get_status(job_ids[-1], wait=1))
+  assert job_status.status == 'cancelled'
@@ -0,0 +1,42 @@
+"""Checks the portfolio engine against a loop of per-site reports."""
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from benchmarks import synthetic
+from src.common import enums
+from src.data import schema, source
+from src.models import portfolio, report
+
+
+@pytest.fixture(scope='module')
+def list_sites() -> list[report.CHPQA_report]:
+  """Four sites, the first three sharing a data source and the third holding half a year."""
+  sites = synthetic.generate_sites(4, number_of_chps=2, number_of_boilers=1)
+  sites[2].dataf = sites[2].dataf.iloc[len(sites[2].dataf) // 2:]
+  shared_source = source.DataManager('shared', enums.StorageMode.WIDE)
+  last_source = source.DataManager(sites[3].site_name)
+  return [site.create_report(shared_source)
+          for site in sites[:3]] + [sites[3].create_report(last_source)]
+
+
+@pytest.mark.parametrize('resolution', [
+    enums.Resolution.DAILY, enums.Resolution.MONTHLY, enums.Resolution.YEARLY
+],
+                         ids=lambda res: res.name)
+def test_portfolio_matches_per_site_reports(list_sites, resolution):
+  expected = {}
+  for site in list_sites:
+    site_report = report.CHPQA_report(site.site_name,
+                                      site.type_of_system,
+                                      site.data_source,
+                                      site.list_all_units,
+                                      resolution=resolution)
+    expected[site.site_name] = site_report.calculate_qualifying_outputs()
+  expected = pd.concat(
+      expected,
+      names=[schema.portfolioSchema.site, schema.portfolioSchema.period])
+  assert_frame_equal(portfolio.CHPQA_portfolio(
+      list_sites, resolution).calculate_qualifying_outputs(),
+                     expected,
+                     rtol=1e-9)
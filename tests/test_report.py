@@ -0,0 +1,106 @@
+"""Checks the memoised carrier totals of CHPQA_report and the totals rolled up from them."""
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.common import enums, profiling
+from src.data import source
+from src.models import report
+
+# The gas input, electricity output and heat output totals of the quality index.
+NUMBER_OF_TOTALS = 3
+
+
+def get_cache_counts(report_obj: report.CHPQA_report) -> tuple[int, int]:
+  return report_obj.cache_hits, report_obj.cache_misses
+
+
+@pytest.fixture
+def report_obj(site) -> report.CHPQA_report:
+  return site.create_report(source.DataManager(site.site_name),
+                            enums.Resolution.MONTHLY)
+
+
+def test_repeated_calculation_hits_the_cache(report_obj):
+  expected = report_obj.calculate_qualifying_outputs()
+  assert get_cache_counts(report_obj) == (0, NUMBER_OF_TOTALS)
+  assert_frame_equal(report_obj.calculate_qualifying_outputs(), expected)
+  assert get_cache_counts(report_obj) == (NUMBER_OF_TOTALS, NUMBER_OF_TOTALS)
+
+
+def test_new_data_invalidates_the_cache(report_obj, site):
+  before = report_obj.calculate_qualifying_outputs()
+  report_obj.data_source.load_new_data(site.dataf.iloc[:48] * 2)
+  after = report_obj.calculate_qualifying_outputs()
+  assert report_obj.cache_misses == 2 * NUMBER_OF_TOTALS
+  assert not after.iloc[0].equals(before.iloc[0])
+  assert_frame_equal(
+      after,
+      report.CHPQA_report(
+          report_obj.site_name,
+          report_obj.type_of_system,
+          report_obj.data_source,
+          report_obj.list_all_units,
+          resolution=report_obj.resolution).calculate_qualifying_outputs())
+
+
+def test_reported_period_invalidates_the_cache(report_obj):
+  report_obj.calculate_qualifying_outputs()
+  report_obj.start_time = pd.Timestamp('2021-07-01')
+  assert report_obj.calculate_qualifying_outputs().index[0] == pd.Timestamp(
+      '2021-07-31')
+  report_obj.end_time = pd.Timestamp('2021-09-30 23:30')
+  assert report_obj.calculate_qualifying_outputs().index[-1] == pd.Timestamp(
+      '2021-09-30')
+  assert report_obj.cache_misses == 3 * NUMBER_OF_TOTALS
+
+
+def test_clear_cache_empties_it(report_obj):
+  report_obj.calculate_qualifying_outputs()
+  report_obj.clear_cache()
+  report_obj.calculate_qualifying_outputs()
+  assert get_cache_counts(report_obj) == (0, 2 * NUMBER_OF_TOTALS)
+
+
+def test_resolutions_in_one_pass_match_separate_reports(site):
+  data_source = source.DataManager(site.site_name)
+  report_obj = site.create_report(data_source)
+  results = report_obj.calculate_qualifying_outputs_by_resolution(
+      list(enums.Resolution))
+  assert report_obj.resolution is enums.Resolution.MONTHLY
+  for resolution, result in results.items():
+    separate_report = report.CHPQA_report(report_obj.site_name,
+                                          report_obj.type_of_system,
+                                          data_source,
+                                          report_obj.list_all_units,
+                                          resolution=resolution)
+    # Rolled up sums only differ from the direct ones by the order of the additions.
+    assert_frame_equal(result,
+                       separate_report.calculate_qualifying_outputs(),
+                       rtol=1e-9)
+
+
+def test_weekly_totals_are_not_rolled_up(site):
+  report_obj = site.create_report(source.DataManager(site.site_name))
+  report_obj.instrumentation = profiling.Instrumentation()
+  report_obj.calculate_qualifying_outputs_by_resolution([
+      enums.Resolution.WEEKLY, enums.Resolution.MONTHLY,
+      enums.Resolution.YEARLY
+  ])
+  stages = [record.stage for record in report_obj.instrumentation.records]
+  # Weeks straddle months, so months are read again and years rolled up from the months.
+  assert stages.count('resample') == 2 * NUMBER_OF_TOTALS
+  assert stages.count('rollup') == NUMBER_OF_TOTALS
+
+
+def test_scheme_years_are_calendar_years(site):
+  report_obj = site.create_report(source.DataManager(site.site_name))
+  results = report_obj.calculate_qualifying_outputs_by_resolution(
+      [enums.Resolution.YEARLY, enums.Resolution.SCHEMEYEAR])
+  assert_frame_equal(results[enums.Resolution.SCHEMEYEAR],
+                     results[enums.Resolution.YEARLY],
+                     check_freq=False)
+  assert list(results[enums.Resolution.SCHEMEYEAR].index) == [
+      pd.Timestamp('2021-12-31'),
+      pd.Timestamp('2022-12-31')
+  ]
@@ -0,0 +1,56 @@
+"""Checks that the process-pool runner returns the reports of an in-process run."""
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from benchmarks import synthetic
+from src.common import enums
+from src.models import runner
+
+SCHEME_YEARS = [None, 2021, 2022]
+RESOLUTIONS = [enums.Resolution.MONTHLY, enums.Resolution.DAILY]
+
+
+@pytest.fixture(scope='module')
+def jobs(tmp_path_factory) -> list[runner.ReportJob]:
+  folder = tmp_path_factory.mktemp('sites')
+  list_jobs = []
+  for site, suffix in zip(synthetic.generate_sites(2, number_of_years=2),
+                          ['.csv', '.parquet']):
+    data_path = folder / f'{site.site_name}{suffix}'
+    if suffix == '.csv':
+      site.dataf.to_csv(data_path)
+    else:
+      site.dataf.to_parquet(data_path)
+    # The ids are remapped by meter name in the workers.
+    list_units = site.create_units(dict.fromkeys(site.dataf.columns, 0))
+    list_jobs += [
+        runner.ReportJob(site.site_name, data_path, list_units, resolution,
+                         scheme_year) for scheme_year in SCHEME_YEARS
+        for resolution in RESOLUTIONS
+    ]
+  return list_jobs
+
+
+def get_job_key(job: runner.ReportJob) -> tuple:
+  return job.site_name, job.resolution, job.scheme_year
+
+
+def test_pool_results_match_in_process_jobs(jobs):
+  results = {
+      get_job_key(job): result
+      for job, result in runner.run_reports(jobs, max_workers=2, chunk_size=2)
+  }
+  assert sorted(results, key=str) == sorted(map(get_job_key, jobs), key=str)
+  for job in jobs:
+    assert_frame_equal(results[get_job_key(job)], runner.run_job(job))
+
+
+def test_scheme_year_jobs_report_the_calendar_year(jobs):
+  job = next(job for job in jobs if job.scheme_year == 2022
+             and job.resolution is enums.Resolution.MONTHLY)
+  assert runner.scheme_year_bounds(2022) == (
+      pd.Timestamp('2022-01-01'),
+      pd.Timestamp('2022-12-31 23:59:59.999999999'))
+  assert list(runner.run_job(job).index) == list(
+      pd.date_range('2022-01-31', '2022-12-31', freq='M'))
@@ -0,0 +1,159 @@
+"""Checks the LONG and WIDE layouts of DataManager against plain pandas baselines."""
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.common import enums
+from src.data import schema, source
+
+
+@pytest.fixture(scope='module')
+def tidy_data(site) -> pd.DataFrame:
+  """The readings of the site in the (Datetime, ID, Value) format, ids by name."""
+  return source.DataManager(site.site_name).transform_new_data(
+      site.dataf, {name: source.get_profile_id(name)
+                   for name in site.dataf})
+
+
+def pivot_table(tidy_dataf: pd.DataFrame) -> pd.DataFrame:
+  return tidy_dataf.pivot_table(index=schema.DataSchema.DATE,
+                                columns=schema.DataSchema.ID,
+                                values=schema.DataSchema.VALUE)
+
+
+@pytest.mark.parametrize('storage_mode',
+                         list(enums.StorageMode),
+                         ids=lambda mode: mode.value)
+def test_wide_data_matches_the_pivot_table(site, tidy_data, storage_mode):
+  data_source = source.DataManager(site.site_name, storage_mode)
+  data_source.load_new_data(site.dataf)
+  assert_frame_equal(data_source.filter_data(wide=True),
+                     pivot_table(tidy_data),
+                     check_like=True,
+                     check_column_type=False,
+                     check_freq=False)
+
+
+@pytest.mark.parametrize('storage_mode',
+                         list(enums.StorageMode),
+                         ids=lambda mode: mode.value)
+def test_data_loaded_in_parts_matches_the_pivot_table(site, tidy_data,
+                                                      storage_mode):
+  # New timestamps and new meters realign the profiles of the WIDE layout.
+  half = len(site.dataf) // 2
+  meters = list(site.dataf.columns)
+  data_source = source.DataManager(site.site_name, storage_mode)
+  data_source.load_new_data(site.dataf.iloc[half:][meters[:2]])
+  data_source.load_new_data(site.dataf[meters[2:]])
+  data_source.load_new_data(site.dataf.iloc[:half][meters[:2]])
+  assert_frame_equal(data_source.filter_data(wide=True),
+                     pivot_table(tidy_data),
+                     check_like=True,
+                     check_column_type=False,
+                     check_freq=False)
+
+
+WINDOWS = [
+    (None, None),
+    ('2021-06-03 10:10', '2021-06-05 10:00'),
+    (None, '2021-05-01'),
+    ('2022-03-31 23:30', None),
+    ('2030-01-01', None),
+    ('2021-06-05', '2021-06-03'),
+]
+LAYOUTS = {
+    'long': {
+        'storage_mode': enums.StorageMode.LONG
+    },
+    'long compact': {
+        'storage_mode': enums.StorageMode.LONG,
+        'compact': True
+    },
+    'wide': {
+        'storage_mode': enums.StorageMode.WIDE
+    },
+}
+
+
+@pytest.fixture(scope='module', params=list(LAYOUTS))
+def loaded_source(request, site) -> source.DataManager:
+  data_source = source.DataManager(site.site_name, **LAYOUTS[request.param])
+  data_source.load_new_data(site.dataf)
+  return data_source
+
+
+@pytest.mark.parametrize('window', WINDOWS, ids=str)
+@pytest.mark.parametrize('subset', ['all', 'two', 'repeated', 'unknown'])
+def test_filter_matches_a_boolean_mask(loaded_source, tidy_data, window,
+                                       subset):
+  profile_ids = list(loaded_source.profile_lookup.values())
+  profile_ids = {
+      'all': None,
+      'two': profile_ids[1:3],
+      'repeated': profile_ids[:1] * 2,
+      'unknown': [12345]
+  }[subset]
+  start_time, end_time = (None if bound is None else pd.Timestamp(bound)
+                          for bound in window)
+  is_kept = pd.Series(True, index=tidy_data.index)
+  if start_time is not None:
+    is_kept &= tidy_data[schema.DataSchema.DATE] >= start_time
+  if end_time is not None:
+    is_kept &= tidy_data[schema.DataSchema.DATE] <= end_time
+  if profile_ids is not None:
+    is_kept &= tidy_data[schema.DataSchema.ID].isin(profile_ids)
+  key = [schema.DataSchema.ID, schema.DataSchema.DATE]
+  assert_frame_equal(loaded_source.filter_data(
+      start_time, end_time, profile_ids).sort_values(key, ignore_index=True),
+                     tidy_data[is_kept].sort_values(key, ignore_index=True),
+                     check_dtype=False)
+
+
+PERIODS_PER_DAY = 48
+
+
+def split_in_days(dataf: pd.DataFrame,
+                  number_of_days: int) -> list[pd.DataFrame]:
+  return [
+      dataf.iloc[day * PERIODS_PER_DAY:(day + 1) * PERIODS_PER_DAY]
+      for day in range(number_of_days)
+  ]
+
+
+@pytest.mark.parametrize('layout', list(LAYOUTS))
+def test_small_appends_with_reads_match_a_single_load(site, layout):
+  single_source = source.DataManager(site.site_name, **LAYOUTS[layout])
+  single_source.load_new_data(site.dataf)
+  data_source = source.DataManager(site.site_name, **LAYOUTS[layout])
+  days = split_in_days(site.dataf, len(site.dataf) // PERIODS_PER_DAY)
+  for day_number, day in enumerate(days):
+    data_source.load_new_data(day)
+    if day_number % 50 == 0:
+      data_source.filter_data(day.index[0], day.index[-1])
+  key = [schema.DataSchema.ID, schema.DataSchema.DATE]
+  assert_frame_equal(
+      data_source.filter_data().sort_values(key, ignore_index=True),
+      single_source.filter_data().sort_values(key, ignore_index=True))
+  assert_frame_equal(data_source.filter_data(wide=True),
+                     single_source.filter_data(wide=True))
+  assert data_source.time_bounds == single_source.time_bounds
+
+
+@pytest.mark.parametrize('layout', list(LAYOUTS))
+def test_appends_are_buffered_until_the_threshold(site, layout):
+  append_buffer_rows = 1000
+  data_source = source.DataManager(site.site_name,
+                                   append_buffer_rows=append_buffer_rows,
+                                   **LAYOUTS[layout])
+  is_wide = data_source.storage_mode is enums.StorageMode.WIDE
+  stored_rows = pending_rows = 0
+  for day in split_in_days(site.dataf, 60):
+    data_source.load_new_data(day)
+    # The LONG layout buffers one row per reading, the WIDE one per timestamp.
+    pending_rows += len(day) if is_wide else int(day.count().sum())
+    # Consolidated once the buffer holds as many rows as the store, and at least the threshold.
+    if pending_rows >= max(append_buffer_rows, stored_rows):
+      stored_rows, pending_rows = stored_rows + pending_rows, 0
+    assert data_source._pending_rows == pending_rows
+  data_source.filter_data()
+  assert data_source._pending_rows == 0
@@ -0,0 +1,94 @@
+"""Checks that a site saved as month-partitioned Parquet opens to the same readings."""
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.common import enums
+from src.data import schema, source
+from src.models import report
+
+SITE_NAME = 'site 0/a'
+MONTH = (pd.Timestamp('2022-02-01'), pd.Timestamp('2022-02-28 23:30'))
+
+
+def sort_long_data(dataf: pd.DataFrame) -> pd.DataFrame:
+  return dataf.sort_values([schema.DataSchema.ID, schema.DataSchema.DATE],
+                           ignore_index=True)
+
+
+def assert_readings_equal(data_source: source.DataManager,
+                          expected: pd.DataFrame) -> None:
+  assert_frame_equal(data_source.filter_data(wide=True),
+                     expected,
+                     check_like=True,
+                     check_names=False,
+                     check_column_type=False,
+                     check_freq=False)
+
+
+@pytest.fixture(params=list(enums.StorageMode), ids=lambda mode: mode.value)
+def saved_site(request, site, tmp_path) -> tuple[source.DataManager, Path]:
+  data_source = source.DataManager(SITE_NAME, request.param)
+  data_source.load_new_data(site.dataf)
+  data_source.save(tmp_path)
+  return data_source, tmp_path
+
+
+def test_opened_site_has_the_saved_readings(saved_site):
+  data_source, folder = saved_site
+  opened_source = source.DataManager.open(folder, SITE_NAME,
+                                          data_source.storage_mode)
+  assert opened_source.profile_lookup == data_source.profile_lookup
+  assert opened_source.time_bounds == data_source.time_bounds
+  assert sorted(opened_source.all_profile_ids) == sorted(
+      data_source.all_profile_ids)
+  assert_readings_equal(opened_source, data_source.filter_data(wide=True))
+
+
+def test_opened_site_filters_a_month_of_a_few_meters(saved_site):
+  data_source, folder = saved_site
+  opened_source = source.DataManager.open(folder, SITE_NAME)
+  profile_ids = list(data_source.profile_lookup.values())[:2]
+  assert_frame_equal(
+      sort_long_data(opened_source.filter_data(*MONTH, profile_ids)),
+      sort_long_data(data_source.filter_data(*MONTH, profile_ids)),
+      check_dtype=False)
+
+
+def test_report_of_an_opened_site_matches(saved_site, site):
+  data_source, folder = saved_site
+  expected = site.create_report(
+      data_source, enums.Resolution.MONTHLY).calculate_qualifying_outputs()
+  opened_source = source.DataManager.open(folder, SITE_NAME)
+  report_obj = report.CHPQA_report(site.site_name,
+                                   enums.SystemType.COMPLEX,
+                                   opened_source,
+                                   site.create_units(
+                                       opened_source.profile_lookup),
+                                   resolution=enums.Resolution.MONTHLY)
+  assert_frame_equal(report_obj.calculate_qualifying_outputs(), expected)
+
+
+def test_new_readings_take_precedence_over_the_archive(saved_site, site):
+  data_source, folder = saved_site
+  opened_source = source.DataManager.open(folder, SITE_NAME)
+  opened_source.load_new_data(site.dataf.iloc[:48] * 2)
+  expected = site.dataf.rename(columns=data_source.profile_lookup)
+  expected.iloc[:48] *= 2
+  assert_readings_equal(opened_source, expected)
+  # Saving over its own archive keeps every reading.
+  opened_source.save(folder)
+  assert_readings_equal(source.DataManager.open(folder, SITE_NAME), expected)
+
+
+@pytest.mark.parametrize('storage_mode',
+                         list(enums.StorageMode),
+                         ids=lambda mode: mode.value)
+def test_empty_site(storage_mode, tmp_path):
+  source.DataManager(SITE_NAME, storage_mode).save(tmp_path)
+  opened_source = source.DataManager.open(tmp_path, SITE_NAME, storage_mode)
+  assert opened_source.filter_data().empty
+  assert opened_source.all_profile_ids == []
+  assert opened_source.time_bounds == (None, None)
@@ -0,0 +1,46 @@
+"""Checks that profile ids are stable across processes and never silently shared."""
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from src.data import source
+
+PROFILE_NAMES = ['CHP_gas', 'CHP_electricity', 'CHP_heat', 'Boiler_1_heat']
+
+
+def get_ids_in_process(hash_seed: str) -> str:
+  code = ('from src.data import source; '
+          f'print([source.get_profile_id(name) for name in {PROFILE_NAMES}])')
+  return subprocess.run([sys.executable, '-c', code],
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                        env=os.environ | {
+                            'PYTHONHASHSEED': hash_seed
+                        }).stdout
+
+
+def test_ids_do_not_depend_on_the_hash_seed():
+  assert get_ids_in_process('1') == get_ids_in_process('2')
+
+
+def test_ids_are_exact_as_float64():
+  for profile_name in PROFILE_NAMES:
+    profile_id = source.get_profile_id(profile_name)
+    assert 0 <= profile_id < 2**53
+    assert int(float(profile_id)) == profile_id
+
+
+def test_colliding_names_raise(monkeypatch):
+  index = pd.DatetimeIndex(['2023-01-01'])
+  data_source = source.DataManager('site')
+  data_source.load_new_data(pd.DataFrame({'CHP_gas': [1.0]}, index=index))
+  monkeypatch.setattr(source, 'get_profile_id', lambda profile_name: 0)
+  with pytest.raises(ValueError, match='same id'):
+    data_source.load_new_data(
+        pd.DataFrame([[1.0, 1.0]],
+                     index=index,
+                     columns=['CHP_heat', 'Boiler_1_heat']))
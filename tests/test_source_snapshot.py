@@ -0,0 +1,113 @@
+"""Checks that a memory-mapped snapshot opens to the readings it was saved from."""
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.common import enums
+from src.data import source
+
+LAYOUTS: dict[str, dict[str, Any]] = {
+    'long': {
+        'storage_mode': enums.StorageMode.LONG
+    },
+    'long compact': {
+        'storage_mode': enums.StorageMode.LONG,
+        'compact': True
+    },
+    'long compact float32': {
+        'storage_mode': enums.StorageMode.LONG,
+        'compact': True,
+        'value_dtype': np.float32
+    },
+    'wide': {
+        'storage_mode': enums.StorageMode.WIDE
+    },
+    'wide float32': {
+        'storage_mode': enums.StorageMode.WIDE,
+        'value_dtype': np.float32
+    },
+}
+
+
+def is_memory_mapped(array: np.ndarray) -> bool:
+  while array is not None:
+    if isinstance(array, np.memmap):
+      return True
+    array = array.base
+  return False
+
+
+@pytest.fixture(params=list(LAYOUTS))
+def snapshot(request, site, tmp_path) -> tuple[source.DataManager, Path]:
+  data_source = source.DataManager(site.site_name, **LAYOUTS[request.param])
+  data_source.load_new_data(site.dataf)
+  return data_source, data_source.save_snapshot(tmp_path / 'snapshot')
+
+
+def test_opened_snapshot_has_the_saved_readings(snapshot):
+  data_source, folder = snapshot
+  opened_source = source.DataManager.open_snapshot(folder)
+  assert opened_source.storage_mode is data_source.storage_mode
+  assert opened_source.profile_lookup == data_source.profile_lookup
+  assert opened_source.time_bounds == data_source.time_bounds
+  assert_frame_equal(opened_source.filter_data(),
+                     data_source.filter_data(),
+                     check_dtype=False)
+
+
+def test_new_readings_do_not_change_the_snapshot_files(snapshot, site):
+  data_source, folder = snapshot
+  saved_readings = data_source.filter_data(wide=True)
+  opened_source = source.DataManager.open_snapshot(folder)
+  corrected = site.dataf.iloc[:48] * 2
+  opened_source.load_new_data(corrected)
+  data_source.load_new_data(corrected)
+  assert_frame_equal(opened_source.filter_data(wide=True),
+                     data_source.filter_data(wide=True),
+                     check_column_type=False)
+  # The mapped files are opened copy on write.
+  assert_frame_equal(
+      source.DataManager.open_snapshot(folder).filter_data(wide=True),
+      saved_readings,
+      check_column_type=False)
+
+
+@pytest.mark.parametrize('storage_mode', list(enums.StorageMode))
+def test_empty_snapshot(storage_mode, tmp_path):
+  folder = source.DataManager('empty', storage_mode).save_snapshot(tmp_path)
+  opened_source = source.DataManager.open_snapshot(folder)
+  assert opened_source.filter_data().empty
+  assert opened_source.time_bounds == (None, None)
+
+
+def test_opened_snapshot_stays_memory_mapped(snapshot):
+  data_source, folder = snapshot
+  opened_source = source.DataManager.open_snapshot(folder)
+  assert opened_source.compact == data_source.compact
+  assert opened_source.value_dtype == data_source.value_dtype
+  if opened_source.storage_mode is enums.StorageMode.WIDE:
+    arrays = list(opened_source._wide_values.values())
+  else:
+    arrays = [column.to_numpy() for _, column in opened_source._data.items()]
+  assert arrays and all(is_memory_mapped(array) for array in arrays)
+
+
+@pytest.mark.parametrize('layout', list(LAYOUTS))
+def test_snapshot_opens_in_another_layout(snapshot, layout):
+  data_source, folder = snapshot
+  # The storage mode is the saved one whatever the layout opened.
+  options = {'compact': False, 'value_dtype': np.float64, **LAYOUTS[layout]}
+  del options['storage_mode']
+  opened_source = source.DataManager.open_snapshot(folder, **options)
+  # The binary search filter relies on the rows being sorted again.
+  for profile_ids in [None, list(data_source.profile_lookup.values())[1:]]:
+    expected = data_source.filter_data(profile_ids=profile_ids, wide=True)
+    # Compared in the opened precision.
+    assert_frame_equal(opened_source.filter_data(profile_ids=profile_ids,
+                                                 wide=True),
+                       expected.astype(opened_source.value_dtype).astype(
+                           np.float64),
+                       check_column_type=False)
@@ -0,0 +1,136 @@
+"""Checks the counts and stored readings of upserting an overlapping export."""
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.common import enums
+from src.data import schema, source
+
+PERIODS_PER_WEEK = 7 * 48
+LAYOUTS: dict[str, dict[str, Any]] = {
+    'long': {
+        'storage_mode': enums.StorageMode.LONG
+    },
+    'long compact float32': {
+        'storage_mode': enums.StorageMode.LONG,
+        'compact': True,
+        'value_dtype': np.float32
+    },
+    'wide': {
+        'storage_mode': enums.StorageMode.WIDE
+    },
+    'wide float32': {
+        'storage_mode': enums.StorageMode.WIDE,
+        'value_dtype': np.float32
+    },
+}
+
+
+@pytest.fixture(params=list(LAYOUTS))
+def layout(request) -> dict[str, Any]:
+  return LAYOUTS[request.param]
+
+
+@pytest.fixture
+def month(site):
+  """The first four weeks of the site, an export re-sending the last two of them plus one.
+
+  The first day of the export is corrected, the readings of its first meter being scaled.
+  """
+  stored = site.dataf.iloc[:4 * PERIODS_PER_WEEK]
+  export = site.dataf.iloc[2 * PERIODS_PER_WEEK:5 * PERIODS_PER_WEEK].copy()
+  export.iloc[:48, 0] *= 1.5
+  expected = site.dataf.iloc[:5 * PERIODS_PER_WEEK].copy()
+  expected.iloc[2 * PERIODS_PER_WEEK:2 * PERIODS_PER_WEEK + 48, 0] *= 1.5
+  return stored, export, expected
+
+
+def assert_readings_equal(data_source: source.DataManager, expected) -> None:
+  # Compared in the stored precision, float32 layouts rounding the readings.
+  assert_frame_equal(
+      data_source.filter_data(wide=True).astype(np.float64),
+      expected.rename(columns=data_source.profile_lookup).astype(
+          data_source.value_dtype).astype(np.float64),
+      check_like=True,
+      check_names=False,
+      check_column_type=False,
+      check_freq=False)
+
+
+def test_upsert_counts_and_replaces_the_readings(site, month, layout):
+  stored, export, expected = month
+  data_source = source.DataManager(site.site_name, **layout)
+  data_source.load_new_data(stored)
+  data_version = data_source.data_version
+  result = data_source.upsert_new_data(export)
+
+  number_of_meters = len(export.columns)
+  assert result == source.UpsertResult(
+      inserted=PERIODS_PER_WEEK * number_of_meters,
+      updated=48,
+      unchanged=2 * PERIODS_PER_WEEK * number_of_meters - 48,
+      duplicates=0)
+  assert data_source.data_version != data_version
+  assert_readings_equal(data_source, expected)
+  # Re-sending the export changes nothing, and the report cache is kept.
+  data_version = data_source.data_version
+  result = data_source.upsert_new_data(export)
+  assert (result.inserted, result.updated) == (0, 0)
+  assert data_source.data_version == data_version
+
+
+def test_upsert_keeps_the_last_duplicated_reading(site, layout):
+  data_source = source.DataManager(site.site_name, **layout)
+  data_source.load_new_data(site.dataf.iloc[:48])
+  tidy = data_source.transform_new_data(site.dataf.iloc[:2],
+                                        data_source.profile_lookup)
+  resent = tidy.assign(
+      **{schema.DataSchema.VALUE: tidy[schema.DataSchema.VALUE] + 1})
+  result = data_source.upsert_data(pd.concat([tidy, resent]))
+
+  assert result == source.UpsertResult(inserted=0,
+                                       updated=len(tidy),
+                                       unchanged=0,
+                                       duplicates=len(tidy))
+  expected = site.dataf.iloc[:48].copy()
+  expected.iloc[:2] += 1
+  assert_readings_equal(data_source, expected)
+
+
+def test_upsert_looks_up_the_opened_archive(site, month, layout, tmp_path):
+  stored, export, expected = month
+  saved_source = source.DataManager(site.site_name, **layout)
+  saved_source.load_new_data(stored)
+  saved_source.save(tmp_path)
+  data_source = source.DataManager.open(tmp_path, site.site_name, **layout)
+  result = data_source.upsert_new_data(export)
+
+  number_of_meters = len(export.columns)
+  assert result == source.UpsertResult(
+      inserted=PERIODS_PER_WEEK * number_of_meters,
+      updated=48,
+      unchanged=2 * PERIODS_PER_WEEK * number_of_meters - 48,
+      duplicates=0)
+  assert_readings_equal(data_source, expected)
+  # Saving over its own archive stores every reading once.
+  data_source.save(tmp_path)
+  assert_readings_equal(
+      source.DataManager.open(tmp_path, site.site_name, **layout), expected)
+
+
+def test_upsert_replaces_every_copy_of_an_appended_reading(site, layout):
+  day = site.dataf.iloc[:48]
+  data_source = source.DataManager(site.site_name, **layout)
+  data_source.load_new_data(day)
+  data_source.load_new_data(day + 1)
+  result = data_source.upsert_new_data(day * 2)
+
+  assert result == source.UpsertResult(inserted=0,
+                                       updated=day.size,
+                                       unchanged=0,
+                                       duplicates=0)
+  assert_readings_equal(data_source, day * 2)
+  assert len(data_source.filter_data()) == day.size
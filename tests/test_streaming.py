@@ -0,0 +1,64 @@
+"""Checks the streaming quality index accumulator against the report of the same readings."""
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.common import enums
+from src.data import source
+from src.models import report, streaming
+
+RESOLUTIONS = [enums.Resolution.MONTHLY, enums.Resolution.SCHEMEYEAR]
+
+
+def get_report_outputs(site, dataf: pd.DataFrame,
+                       resolution: enums.Resolution) -> pd.DataFrame:
+  data_source = source.DataManager(site.site_name)
+  profile_lookup = data_source.load_new_data(dataf)
+  report_obj = report.CHPQA_report(site.site_name,
+                                   enums.SystemType.COMPLEX,
+                                   data_source,
+                                   site.create_units(profile_lookup),
+                                   resolution=resolution)
+  return report_obj.calculate_qualifying_outputs()
+
+
+@pytest.fixture
+def accumulator(site) -> streaming.QIAccumulator:
+  report_obj = site.create_report(source.DataManager(site.site_name))
+  qi_accumulator = streaming.QIAccumulator(report_obj, RESOLUTIONS)
+  qi_accumulator.add_readings(
+      site.dataf.rename(columns=report_obj.data_source.profile_lookup))
+  return qi_accumulator
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS, ids=lambda res: res.name)
+def test_snapshot_matches_the_report(site, accumulator, resolution):
+  assert_frame_equal(accumulator.snapshot(resolution),
+                     get_report_outputs(site, site.dataf, resolution),
+                     rtol=1e-9,
+                     check_freq=False,
+                     check_names=False)
+
+
+def test_corrected_reading_replaces_the_old_value(site, accumulator):
+  profile_lookup = accumulator.site.data_source.profile_lookup
+  meter_name = site.list_units[0].gas_meter
+  timestamp = site.dataf.index[100]
+  old_value = site.dataf.at[timestamp, meter_name]
+  reading_count = accumulator.reading_count
+
+  delta = accumulator.add_reading(profile_lookup[meter_name], timestamp,
+                                  old_value + 5)
+  assert delta == pytest.approx(5)
+  # Sending the same correction again changes nothing.
+  assert accumulator.add_reading(profile_lookup[meter_name], timestamp,
+                                 old_value + 5) == 0
+  assert accumulator.reading_count == reading_count
+  corrected = site.dataf.copy()
+  corrected.at[timestamp, meter_name] = old_value + 5
+  for resolution in RESOLUTIONS:
+    assert_frame_equal(accumulator.snapshot(resolution),
+                       get_report_outputs(site, corrected, resolution),
+                       rtol=1e-9,
+                       check_freq=False,
+                       check_names=False)
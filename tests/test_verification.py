@@ -0,0 +1,93 @@
+"""Checks the JWKS signing key and verified token caches against a fake clock."""
+from types import SimpleNamespace
+
+import jwt
+import pytest
+
+from src.backend import verification
+
+
+class FakeJWKSClient:
+  """Serves a signing key for each of its key ids."""
+
+  def __init__(self, key_ids: list[str]):
+    self.key_ids = key_ids
+
+  def get_signing_keys(self, refresh: bool = False) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(key_id=key_id, key=f'key {key_id}')
+        for key_id in self.key_ids
+    ]
+
+
+@pytest.fixture
+def clock(monkeypatch) -> SimpleNamespace:
+  """A clock of the verification module, moved forward by setting now."""
+  fake_clock = SimpleNamespace(now=1_000_000.0)
+  monkeypatch.setattr(
+      verification, 'time',
+      SimpleNamespace(monotonic=lambda: fake_clock.now,
+                      time=lambda: fake_clock.now))
+  return fake_clock
+
+
+def test_signing_keys_are_fetched_again_after_the_ttl(clock):
+  jwks_cache = verification.JWKSCache(FakeJWKSClient(['a']), ttl=300)
+  assert jwks_cache.get_signing_key('a') == 'key a'
+  clock.now += 299
+  jwks_cache.get_signing_key('a')
+  assert jwks_cache.fetch_count == 1
+  clock.now += 1
+  jwks_cache.get_signing_key('a')
+  assert jwks_cache.fetch_count == 2
+
+
+def test_unknown_key_ids_fetch_at_most_once_per_interval(clock):
+  jwks_client = FakeJWKSClient(['a'])
+  jwks_cache = verification.JWKSCache(jwks_client,
+                                      ttl=300,
+                                      min_refresh_interval=10)
+  jwks_cache.get_signing_key('a')
+  with pytest.raises(jwt.exceptions.PyJWKClientError):
+    jwks_cache.get_signing_key('b')
+  assert jwks_cache.fetch_count == 1
+
+  # The key is rotated, but not fetched before the interval is over.
+  jwks_client.key_ids = ['a', 'b']
+  clock.now += 9
+  for _ in range(3):
+    with pytest.raises(jwt.exceptions.PyJWKClientError):
+      jwks_cache.get_signing_key('b')
+  assert jwks_cache.fetch_count == 1
+  clock.now += 1
+  assert jwks_cache.get_signing_key('b') == 'key b'
+  assert jwks_cache.fetch_count == 2
+
+
+def test_tokens_are_served_until_they_expire(clock):
+  token_cache = verification.VerifiedTokenCache()
+  token_cache.put('token', {'sub': 'user', 'exp': clock.now + 60})
+  assert token_cache.get('token') == {'sub': 'user', 'exp': clock.now + 60}
+  clock.now += 59
+  assert token_cache.get('token') is not None
+  clock.now += 1
+  assert token_cache.get('token') is None
+  assert (token_cache.hits, token_cache.misses) == (2, 1)
+
+
+def test_least_recently_used_token_is_evicted(clock):
+  token_cache = verification.VerifiedTokenCache(max_size=2)
+  for token in ['a', 'b']:
+    token_cache.put(token, {'exp': clock.now + 60})
+  token_cache.get('a')
+  token_cache.put('c', {'exp': clock.now + 60})
+  assert token_cache.get('b') is None
+  assert token_cache.get('a') is not None
+  assert token_cache.get('c') is not None
+
+
+def test_tokens_without_exp_are_not_cached(clock):
+  token_cache = verification.VerifiedTokenCache()
+  token_cache.put('token', {'sub': 'user'})
+  assert token_cache.get('token') is None
+  assert token_cache.misses == 1